@@ -0,0 +1,293 @@
+import multiprocessing
+import pickle
+import signal
+import threading
+import time
+import types
+
+from session import AcquisitionSession
+from shmring import FAILED, FINISHED, IDLE, RUNNING, RingReader, ShmRing
+
+
+# Seconds the child waits for a command between polls while running
+CHILD_POLL_S = 0.02
+# stats() is called every GUI tick; ask the child at most this often
+CHILD_STATS_S = 0.5
+
+
+class AcquisitionProcessError(RuntimeError):
+    pass
+
+
+def _portable(exc):
+    # Driver exceptions do not always survive pickling; send a plain copy
+    try:
+        pickle.loads(pickle.dumps(exc))
+        return exc
+    except Exception:
+        return AcquisitionProcessError(f"{type(exc).__name__}: {exc}")
+
+
+def _run_child(conn, ring_name, backend_name, tc_module, ai_module, options):
+    # Child process: an ordinary session (DAQ readers, calibration, derived
+    # channels, log writer) whose calibrated and derived blocks are also
+    # copied into the ring.
+    # Commands arrive on `conn` as (name, args) and are answered with
+    # ("ok", result) or ("error", exception), after any ("progress", text).
+    # Ctrl+C reaches the whole process group; only the parent handles it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = ShmRing.attach(ring_name, writable=True)
+    session = AcquisitionSession(backend_name, tc_module, ai_module, **options)
+    session.ring = ring
+
+    def progress(text):
+        conn.send(("progress", text))
+
+    def connect():
+        session.connect(progress)
+        return session.backend.name if session.backend is not None else "Replay"
+
+    def start(tc_rate, ai_rate):
+        session.start(tc_rate, ai_rate, progress)
+        ring.set_state(RUNNING)
+        return {
+            "group_rates": dict(session.group_rates),
+            "buffer_plan": dict(session.buffer_plan),
+            "timebase": dict(vars(session.timebase)),
+        }
+
+    def stop():
+        session.stop()
+        ring.set_state(IDLE)
+        return session.stats()
+
+    def open_log(mode, directory, flush_policy, run_info, catalog_file):
+        session.flush_policy = flush_policy
+        session.run_info = run_info
+        session.catalog_file = catalog_file
+        return session.open_log(mode, directory)
+
+    def close_log():
+        session.close_log()
+        error = session.catalog_error
+        return session.last_run_id, f"{type(error).__name__}: {error}" if error is not None else None
+
+    commands = {
+        "connect": connect,
+        "start": start,
+        "stop": stop,
+        "open_log": open_log,
+        "close_log": close_log,
+        "set_calibration": session.set_calibration,
+        "stats": session.stats,
+    }
+    try:
+        while True:
+            try:
+                if conn.poll(CHILD_POLL_S if session.running else 0.5):
+                    name, args = conn.recv()
+                    if name == "quit":
+                        break
+                    try:
+                        result = commands[name](*args)
+                    except Exception as exc:
+                        conn.send(("error", _portable(exc)))
+                    else:
+                        conn.send(("ok", result))
+            except (EOFError, OSError):
+                # The GUI went away without saying goodbye
+                break
+            if session.running and ring.state == RUNNING:
+                try:
+                    session.poll()
+                    if session.replay_finished():
+                        session.poll()
+                        ring.set_state(FINISHED)
+                except Exception as exc:
+                    ring.set_state(FAILED, f"{type(exc).__name__}: {exc}")
+                    session.stop()
+    finally:
+        session.disconnect()
+        session.ring = None
+        ring.close()
+        conn.close()
+
+
+class ProcessSession(AcquisitionSession):
+    # AcquisitionSession whose DAQ readers, calibration, derived channels
+    # and log writer run in a child process, so nothing the GUI does can
+    # delay a DAQ read. The child copies every block with its calibrated
+    # values, and every derived block, into a shared-memory ring; here
+    # poll() reads the ring (zero-copy) and only does the bookkeeping,
+    # capture and telemetry. Blocks returned by poll() are read-only views
+    # that stay valid until the next poll().
+    def __init__(self, backend_name, tc_module, ai_module, derived=None, replay=None, ring_slots=256, **kwargs):
+        super().__init__(backend_name, tc_module, ai_module, derived=derived, replay=replay, **kwargs)
+        self.derived_config = dict(derived or {})
+        self.ring_slots = ring_slots
+        self.shared_ring = None
+        self.ring_reader = None
+        self.process = None
+        self.child_stats = None
+        self._child_stats_at = 0.0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self):
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def ring_name(self):
+        return self.shared_ring.name if self.shared_ring is not None else None
+
+    def _call(self, name, *args, progress=None):
+        with self._lock:
+            if self._conn is None:
+                raise AcquisitionProcessError("The acquisition process is not running")
+            self._conn.send((name, args))
+            while True:
+                while not self._conn.poll(0.5):
+                    if not self.process.is_alive():
+                        raise AcquisitionProcessError(f"The acquisition process exited (code {self.process.exitcode})")
+                kind, payload = self._conn.recv()
+                if kind == "progress":
+                    if progress is not None:
+                        progress(payload)
+                    continue
+                if kind == "error":
+                    raise payload
+                return payload
+
+    def connect(self, progress=None):
+        if self.connected:
+            return
+        if progress is not None:
+            progress("Starting acquisition process")
+        self.shared_ring = ShmRing.create(self.groups, n_slots=self.ring_slots)
+        options = {
+            "tc_type": self.tc_type,
+            "calibration": self.calibration,
+            "channel_map": self.channel_map,
+            "derived": self.derived_config,
+            "replay": self.replay.path if self.replay is not None else None,
+            "replay_speed": self.replay_speed,
+        }
+        # spawn: the same start method on Windows and Linux, and the child
+        # does not inherit the Tk interpreter or any DAQmx handles
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_run_child,
+            args=(child_conn, self.shared_ring.name, self.backend_name, self.tc_module, self.ai_module, options),
+            name="acquisition",
+            daemon=True,
+        )
+        try:
+            self.process.start()
+            child_conn.close()
+            backend = self._call("connect", progress=progress)
+        except Exception:
+            self._shutdown_process()
+            raise
+        self.backend = types.SimpleNamespace(name=backend, simulated=backend == "Simulated")
+
+    def _start_acquisition(self, tc_rate, ai_rate, progress):
+        # Position the reader before the child starts writing
+        self.ring_reader = RingReader(self.shared_ring)
+        info = self._call("start", tc_rate, ai_rate, progress=progress)
+        self.group_rates = info["group_rates"]
+        self.buffer_plan = info["buffer_plan"]
+        # perf_counter is system-wide, so the child's t0 holds here too
+        vars(self.timebase).update(info["timebase"])
+        self._start_readers()
+
+    def _make_readers(self):
+        return []
+
+    def poll(self):
+        if self.shared_ring.state == FAILED:
+            raise AcquisitionProcessError(self.shared_ring.error)
+        if not self.process.is_alive():
+            raise AcquisitionProcessError(f"The acquisition process exited (code {self.process.exitcode})")
+        return self._consume(self.ring_reader.read())
+
+    def _consume(self, blocks):
+        # The child has calibrated the blocks and run the derived channels
+        return self._deliver([(block, block.cal) for block in blocks])
+
+    def replay_finished(self):
+        return (self.replay is not None and self.running and self.shared_ring.state == FINISHED
+                and self.ring_reader.caught_up())
+
+    def stop(self):
+        if not self.running:
+            return
+        try:
+            self.child_stats = self._call("stop")
+            self._consume(self.ring_reader.read())
+        except Exception:
+            pass
+        super().stop()
+
+    def open_log(self, mode, directory):
+        self.last_run_id = None
+        self.catalog_error = None
+        return self._call("open_log", mode, directory, self.flush_policy, dict(self.run_info), self.catalog_file)
+
+    def close_log(self):
+        # The child catalogs the run when it closes the log
+        if self.connected:
+            self.last_run_id, error = self._call("close_log")
+            self.catalog_error = AcquisitionProcessError(error) if error else None
+            self.child_stats = self._call("stats")
+            self.last_log_rows = self.child_stats["rows_written"]
+
+    def set_calibration(self, calibration):
+        super().set_calibration(calibration)
+        if self.connected:
+            self._call("set_calibration", calibration)
+
+    def stats(self):
+        stats = super().stats()
+        now = time.monotonic()
+        if self.running and self.connected and now - self._child_stats_at >= CHILD_STATS_S:
+            self.child_stats = self._call("stats")
+            self._child_stats_at = now
+        child = self.child_stats
+        if child is not None:
+            stats["readers"] = child["readers"]
+            stats["dropped_blocks"] += child["dropped_blocks"]
+            stats["rows_written"] = child["rows_written"]
+            stats["log_dropped_items"] = child["log_dropped_items"]
+            stats["log_backlog"] = child["log_backlog"]
+            stats["log_max_items"] = child["log_max_items"]
+        if self.ring_reader is not None:
+            stats["ring"] = self.ring_reader.stats.as_dict()
+        return stats
+
+    def disconnect(self):
+        self.stop()
+        self.stop_telemetry()
+        self._shutdown_process()
+
+    def _shutdown_process(self):
+        if self.process is not None:
+            try:
+                self._conn.send(("quit", ()))
+            except (OSError, ValueError):
+                pass
+            # The child stops its tasks and closes its log before exiting
+            self.process.join(timeout=10.0)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=2.0)
+            self.process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self.ring_reader = None
+        if self.shared_ring is not None:
+            self.shared_ring.close()
+            self.shared_ring.unlink()
+            self.shared_ring = None
@@ -0,0 +1,268 @@
+import collections
+import math
+import threading
+import time
+
+import numpy as np
+
+from daqbackend import OVERFLOW_ERROR, TIMEOUT_ERROR, error_code
+
+
+class SampleBlock:
+    # One buffered read: data is (channels x samples), start_index counts
+    # samples since the task was started and t_offset is the task's start
+    # time on the run timebase. Software-timed sources (serial) pass their
+    # own per-sample timestamps in `t`; rate is then only nominal. `cal` is
+    # set by the session once the block has been calibrated.
+    __slots__ = ("group", "data", "start_index", "rate", "t_offset", "t", "cal")
+
+    def __init__(self, group, data, start_index, rate, t_offset=0.0, t=None):
+        self.group = group
+        self.data = data
+        self.start_index = start_index
+        self.rate = rate
+        self.t_offset = t_offset
+        self.t = t
+        self.cal = None
+
+    @property
+    def n_samples(self):
+        return self.data.shape[1]
+
+    def times(self):
+        # Seconds on the run timebase, from the sample clock
+        if self.t is not None:
+            return self.t
+        return self.t_offset + (self.start_index + np.arange(self.data.shape[1])) / self.rate
+
+    def last_time(self):
+        if self.t is not None:
+            return float(self.t[-1])
+        return self.t_offset + (self.start_index + self.data.shape[1] - 1) / self.rate
+
+    def latest(self):
+        return self.data[:, -1].tolist()
+
+
+class BlockQueue:
+    # Bounded, lock-free under the GIL (deque append/popleft are atomic).
+    # When the consumer falls too far behind, the oldest blocks are dropped
+    # and counted instead of blocking the reader threads.
+    def __init__(self, maxlen=1024):
+        self._blocks = collections.deque(maxlen=maxlen)
+        self.dropped = 0
+
+    def put(self, block):
+        if len(self._blocks) >= self._blocks.maxlen:
+            self.dropped += 1
+        self._blocks.append(block)
+
+    def __len__(self):
+        return len(self._blocks)
+
+    @property
+    def maxlen(self):
+        return self._blocks.maxlen
+
+    def drain(self):
+        blocks = []
+        while True:
+            try:
+                blocks.append(self._blocks.popleft())
+            except IndexError:
+                return blocks
+
+    def clear(self):
+        self._blocks.clear()
+        self.dropped = 0
+
+
+# Rate assumed when sizing history for a group whose rate is unknown, e.g.
+# a replayed group missing from the recording or its derived group
+FALLBACK_RATE = 1000.0
+
+
+class RingBuffer:
+    # Fixed-size history for one channel group: a shared time axis plus one
+    # row per channel. Writes are vectorised slices, never per-sample loops.
+    def __init__(self, n_channels, capacity):
+        self.capacity = max(2, int(capacity))
+        self.times = np.full(self.capacity, np.nan)
+        self.data = np.full((n_channels, self.capacity), np.nan)
+        self.pos = 0
+        self.count = 0
+
+    def extend(self, t, block):
+        n = len(t)
+        if n >= self.capacity:
+            t = t[-self.capacity:]
+            block = block[:, -self.capacity:]
+            n = self.capacity
+        first = min(n, self.capacity - self.pos)
+        self.times[self.pos:self.pos + first] = t[:first]
+        self.data[:, self.pos:self.pos + first] = block[:, :first]
+        rest = n - first
+        if rest:
+            self.times[:rest] = t[first:]
+            self.data[:, :rest] = block[:, first:]
+        self.pos = (self.pos + n) % self.capacity
+        self.count = min(self.capacity, self.count + n)
+
+    def last_time(self):
+        if self.count == 0:
+            return None
+        return self.times[(self.pos - 1) % self.capacity]
+
+    def window(self, t_start):
+        # Chronological (times, data) of samples with t >= t_start. The ring
+        # is two sorted runs, [pos:] then [:pos]; each is searched on its
+        # own so only the requested span is touched (and copied only when
+        # it wraps), not the whole history. Unwrapped results are views.
+        if self.count < self.capacity:
+            first = np.searchsorted(self.times[:self.count], t_start, side="left")
+            return self.times[first:self.count], self.data[:, first:self.count]
+        pos = self.pos
+        if pos == 0 or t_start > self.times[self.capacity - 1]:
+            # Starts in the newer run (or the ring has not wrapped)
+            first = np.searchsorted(self.times[:pos or self.capacity], t_start, side="left")
+            end = pos or self.capacity
+            return self.times[first:end], self.data[:, first:end]
+        first = pos + np.searchsorted(self.times[pos:], t_start, side="left")
+        times = np.concatenate([self.times[first:], self.times[:pos]])
+        data = np.concatenate([self.data[:, first:], self.data[:, :pos]], axis=1)
+        return times, data
+
+
+def normalize_block(data, expected_channels):
+    # Normalize NI-DAQmx return shapes to a (channels x samples) float array.
+    if isinstance(data, (list, tuple)):
+        if data and isinstance(data[0], (list, tuple)):
+            block = np.asarray(data, dtype=np.float64)
+        else:
+            block = np.asarray(data, dtype=np.float64).reshape(1, -1)
+    else:
+        block = np.asarray([[data]], dtype=np.float64)
+
+    if block.shape[0] < expected_channels:
+        pad = np.full((expected_channels - block.shape[0], block.shape[1]), np.nan)
+        block = np.vstack([block, pad])
+    elif block.shape[0] > expected_channels:
+        block = block[:expected_channels]
+    return block
+
+
+def plan_buffer(rate, n_channels, consumer_latency, chunk_period=0.1, min_seconds=2.0, max_bytes=64 * 1024 * 1024):
+    # -> (buffer_samples, chunk_samples) per channel. The DAQ buffer covers
+    # several times the worst consumer stall seen so far (never less than
+    # min_seconds), capped so the whole task stays within max_bytes.
+    rate = float(rate)
+    chunk = max(1, int(round(rate * chunk_period)))
+    seconds = max(min_seconds, 4.0 * float(consumer_latency))
+    buffer = max(2 * chunk, int(math.ceil(rate * seconds)))
+    cap = max(2 * chunk, max_bytes // (8 * max(1, n_channels)))
+    return min(buffer, cap), chunk
+
+
+class ReaderStats:
+    def __init__(self):
+        self.samples_read = 0
+        self.reads = 0
+        self.backlog = 0
+        self.max_backlog = 0
+        self.max_read_latency = 0.0
+        self.max_unread_interval = 0.0
+        self.overflows = 0
+        self.timeouts = 0
+        self.lost_samples = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class TaskReader(threading.Thread):
+    # Drains one DAQmx task with blocking buffered reads so acquisition never
+    # depends on how often the Tk event loop gets around to polling. Each read
+    # takes at least one chunk and, when a backlog has built up, everything
+    # available (up to the buffer size), so the backlog cannot keep growing.
+    def __init__(self, group, task, n_channels, rate, out_queue, chunk=None, buffer_size=None,
+                 t_offset=0.0, clock=None, recover_overflow=True):
+        super().__init__(name=f"{group}-reader", daemon=True)
+        self.group = group
+        self.task = task
+        self.n_channels = n_channels
+        self.rate = float(rate)
+        self.t_offset = t_offset
+        self.out_queue = out_queue
+        self.chunk = chunk or max(1, int(round(self.rate * 0.1)))
+        self.max_read = max(self.chunk, buffer_size or self.chunk * 20)
+        self.timeout = max(1.0, 4.0 * self.chunk / self.rate)
+        self.clock = clock
+        self.recover_overflow = recover_overflow
+        self.samples_read = 0
+        self.stats = ReaderStats()
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _available(self):
+        try:
+            return int(self.task.in_stream.avail_samp_per_chan)
+        except Exception:
+            return 0
+
+    def _restart_after_overflow(self):
+        # Restart on the task's own clock; a start trigger from the master
+        # task will not fire again mid-run. The sample index is resynced from
+        # elapsed time, so the lost span shows up as a gap downstream.
+        self.task.stop()
+        try:
+            self.task.triggers.start_trigger.disable_start_trig()
+        except Exception:
+            pass
+        self.task.start()
+        if self.clock is not None:
+            index = int(round((self.clock() - self.t_offset) * self.rate))
+            if index > self.samples_read:
+                self.stats.lost_samples += index - self.samples_read
+                self.samples_read = index
+
+    def run(self):
+        stats = self.stats
+        last_return = time.perf_counter()
+        while not self._stop_event.is_set():
+            n = self.chunk
+            if stats.backlog > n:
+                n = min(stats.backlog, self.max_read)
+            t_call = time.perf_counter()
+            stats.max_unread_interval = max(stats.max_unread_interval, t_call - last_return)
+            try:
+                data = self.task.read(number_of_samples_per_channel=n, timeout=self.timeout)
+            except Exception as exc:
+                last_return = time.perf_counter()
+                if self._stop_event.is_set():
+                    break
+                code = error_code(exc)
+                if code == TIMEOUT_ERROR:
+                    stats.timeouts += 1
+                    continue
+                if code == OVERFLOW_ERROR and self.recover_overflow:
+                    stats.overflows += 1
+                    try:
+                        self._restart_after_overflow()
+                        continue
+                    except Exception as restart_exc:
+                        exc = restart_exc
+                self.error = exc
+                break
+            last_return = time.perf_counter()
+            stats.max_read_latency = max(stats.max_read_latency, last_return - t_call)
+
+            block = normalize_block(data, self.n_channels)
+            self.out_queue.put(SampleBlock(self.group, block, self.samples_read, self.rate, self.t_offset))
+            self.samples_read += block.shape[1]
+            stats.samples_read += block.shape[1]
+            stats.reads += 1
+            stats.backlog = self._available()
+            stats.max_backlog = max(stats.max_backlog, stats.backlog)
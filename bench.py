@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from acquisition import SampleBlock, normalize_block
+from calibration import CalibrationEngine, default_calibration
+from channelmap import ChannelMap, ModuleSpec
+from datalog import AsyncLogWriter, BinaryLogger, CsvLogger, FlushPolicy
+from session import AcquisitionSession
+
+
+# Reproducible benchmarks of the acquisition-to-disk pipeline on the
+# simulated DAQ, so they run headless on any PC. Results are written as
+# JSON; pass an earlier file as --baseline to see what changed.
+
+BENCH_VERSION = 1
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Metrics where a smaller number is better; everything else is a rate
+LOWER_IS_BETTER = ("latency", "_ms", "_us", "cpu", "rss", "growth", "lost", "overflows", "dropped")
+# Flag changes larger than this against the baseline; timings below
+# MIN_TIMING_MS are timer noise and never flagged
+REGRESSION_THRESHOLD = 0.10
+MIN_TIMING_MS = 1.0
+
+PROFILES = {
+    # Throughput seconds per sink, live-run seconds, seconds per max-rate step
+    "quick": {"throughput_s": 1.0, "live_s": 5.0, "step_s": 2.0},
+    "full": {"throughput_s": 5.0, "live_s": 60.0, "step_s": 5.0},
+}
+MAX_RATE_STEPS = (1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000, 1000000, 2000000)
+
+
+def bench_channel_map(n_tc, n_ai):
+    modules = []
+    if n_tc:
+        modules.append(ModuleSpec("tc", "thermocouple", range(n_tc)))
+    if n_ai:
+        modules.append(ModuleSpec("ai", "voltage", range(n_ai)))
+    return ChannelMap(modules)
+
+
+def rss_mb():
+    # Resident set size of this process; Linux /proc, else peak RSS
+    try:
+        with open("/proc/self/statm", "r") as handle:
+            pages = int(handle.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def percentiles(values):
+    values = np.asarray(values, dtype=np.float64) * 1000.0
+    if len(values) == 0:
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "max_ms": float(values.max()), "count": len(values)}
+
+
+def bench_throughput(seconds, n_channels=4, block_samples=1000, directory="."):
+    # Samples/s through normalize_block -> calibration -> log writer, with
+    # nidaqmx-style nested lists as input. The log writer is the threaded
+    # AsyncLogWriter with a short queue, so a slow sink throttles the loop
+    # instead of piling up; its close() (everything on disk) is timed too.
+    rng = np.random.default_rng(0)
+    inputs = [rng.normal(1.0, 0.1, (n_channels, block_samples)).tolist() for _ in range(8)]
+    names = [f"AI{i}" for i in range(n_channels)]
+    groups = [("ai", names)]
+    engine = CalibrationEngine(default_calibration(names), groups)
+
+    sinks = {
+        "none": None,
+        "csv_full_rate": lambda path: (lambda part: CsvLogger(path + ".csv", groups, mode="Full rate")),
+        "binary": lambda path: (lambda part: BinaryLogger(path, groups, {"ai": 1000.0})),
+    }
+    results = {}
+    for name, make_sink in sinks.items():
+        writer = None
+        if make_sink is not None:
+            writer = AsyncLogWriter(
+                make_sink(os.path.join(directory, f"throughput_{name}")),
+                policy=FlushPolicy(),
+                max_items=16,
+                when_full="block",
+                put_timeout=60.0,
+            )
+        stages = {"normalize": 0.0, "calibrate": 0.0, "log": 0.0}
+        n_blocks = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            t0 = time.perf_counter()
+            block = normalize_block(inputs[n_blocks % len(inputs)], n_channels)
+            t1 = time.perf_counter()
+            cal = engine.apply("ai", block)
+            t2 = time.perf_counter()
+            if writer is not None:
+                writer.write_block(SampleBlock("ai", block, n_blocks * block_samples, 1000.0), cal if writer.calibrated else None)
+            t3 = time.perf_counter()
+            stages["normalize"] += t1 - t0
+            stages["calibrate"] += t2 - t1
+            stages["log"] += t3 - t2
+            n_blocks += 1
+        t_close = time.perf_counter()
+        if writer is not None:
+            writer.close()
+        elapsed = time.perf_counter() - started
+        samples = n_blocks * block_samples
+        results[name] = {
+            "samples_per_s": samples / elapsed,
+            "values_per_s": samples * n_channels / elapsed,
+            "stage_us_per_block": {stage: total / n_blocks * 1e6 for stage, total in stages.items()},
+            "close_ms": (time.perf_counter() - t_close) * 1000.0,
+            "log_dropped_items": writer.dropped_items if writer is not None else 0,
+        }
+    return results
+
+
+def bench_live(seconds, ai_rate=1000.0, tc_rate=10.0, n_tc=3, n_ai=4, log_mode="Binary",
+               poll_interval=0.1, directory="."):
+    # A real session on the simulated DAQ, polled like the headless loop.
+    # Reports poll() latency and tick jitter percentiles, CPU time per
+    # channel-kHz of acquired data and resident memory over the run.
+    session = AcquisitionSession("Simulated", "SimTC", "SimAI", channel_map=bench_channel_map(n_tc, n_ai))
+    session.connect()
+    latencies, intervals, memory = [], [], []
+    try:
+        session.start(tc_rate, ai_rate)
+        if log_mode:
+            session.open_log(log_mode, directory)
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        last_tick = started
+        next_memory = started
+        while True:
+            time.sleep(poll_interval)
+            t_call = time.perf_counter()
+            intervals.append(t_call - last_tick)
+            last_tick = t_call
+            session.poll()
+            latencies.append(time.perf_counter() - t_call)
+            if t_call >= next_memory:
+                memory.append((t_call - started, rss_mb()))
+                next_memory += 1.0
+            if t_call - started >= seconds:
+                break
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+    finally:
+        session.stop()
+        stats = session.stats()
+        session.disconnect()
+
+    channel_khz = (n_tc * tc_rate + n_ai * ai_rate) / 1000.0
+    cpu_percent = 100.0 * cpu / elapsed
+    t_mem = np.array([m[0] for m in memory])
+    rss = np.array([m[1] for m in memory])
+    # Growth from a line through the second half, after buffers warm up
+    half = t_mem >= t_mem[-1] / 2.0 if len(t_mem) else t_mem
+    growth = float(np.polyfit(t_mem[half], rss[half], 1)[0] * 60.0) if half.sum() >= 3 else 0.0
+    readers = stats["readers"]
+    return {
+        "seconds": elapsed,
+        "ai_rate": ai_rate,
+        "tc_rate": tc_rate,
+        "channels": {"tc": n_tc, "ai": n_ai},
+        "log_mode": log_mode,
+        "samples": stats["samples"],
+        "poll_latency": percentiles(latencies),
+        "tick_interval": percentiles(intervals),
+        "cpu_percent": cpu_percent,
+        "cpu_percent_per_channel_khz": cpu_percent / channel_khz if channel_khz else None,
+        "rss_start_mb": float(rss[0]) if len(rss) else None,
+        "rss_end_mb": float(rss[-1]) if len(rss) else None,
+        "rss_max_mb": float(rss.max()) if len(rss) else None,
+        "rss_growth_mb_per_min": growth,
+        "lost_samples": sum(stats["gap_samples"].values()) + sum(r["lost_samples"] for r in readers.values()),
+        "overflows": sum(r["overflows"] for r in readers.values()),
+        "dropped_blocks": stats["dropped_blocks"],
+        "rows_written": stats["rows_written"],
+    }
+
+
+def bench_max_rate(step_seconds, n_ai=4, log_mode="Binary", directory=".", steps=MAX_RATE_STEPS):
+    # Raises the AI rate until a run loses data (buffer overflow, dropped
+    # blocks or gaps) or the pipeline falls behind the sample clock.
+    results = []
+    best = None
+    for rate in steps:
+        run = bench_live(step_seconds, ai_rate=rate, n_tc=0, n_ai=n_ai, log_mode=log_mode,
+                         poll_interval=0.05, directory=directory)
+        expected = rate * run["seconds"]
+        kept_up = run["samples"].get("ai", 0) >= 0.9 * expected
+        ok = kept_up and not run["lost_samples"] and not run["overflows"] and not run["dropped_blocks"]
+        results.append({
+            "ai_rate": rate,
+            "ok": ok,
+            "samples": run["samples"].get("ai", 0),
+            "expected_samples": int(expected),
+            "overflows": run["overflows"],
+            "lost_samples": run["lost_samples"],
+            "dropped_blocks": run["dropped_blocks"],
+            "poll_p99_ms": run["poll_latency"].get("p99_ms"),
+            "cpu_percent": run["cpu_percent"],
+        })
+        if not ok:
+            break
+        best = rate
+    return {"max_ai_rate": best, "channels": n_ai, "log_mode": log_mode, "steps": results}
+
+
+def flatten(data, prefix=""):
+    out = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            out.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        out[prefix[:-1]] = float(data)
+    return out
+
+
+def compare(results, baseline):
+    # -> lines for every metric present in both, worse-by-threshold marked
+    new = flatten(results)
+    old = flatten(baseline)
+    lines = []
+    for key in sorted(set(new) & set(old)):
+        if key.endswith((".count", ".seconds")) or ".steps." in key or not old[key]:
+            continue
+        change = (new[key] - old[key]) / abs(old[key])
+        lower_better = any(part in key for part in LOWER_IS_BETTER)
+        worse = change > REGRESSION_THRESHOLD if lower_better else change < -REGRESSION_THRESHOLD
+        if key.endswith("_ms") and max(new[key], old[key]) < MIN_TIMING_MS:
+            worse = False
+        mark = "  <-- regression" if worse else ""
+        lines.append(f"{key}: {old[key]:.4g} -> {new[key]:.4g} ({change * 100.0:+.1f}%){mark}")
+    return lines
+
+
+def host_info():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(options):
+    profile = PROFILES[options.profile]
+    only = set(options.only.split(",")) if options.only else {"throughput", "live", "max_rate"}
+    report = {
+        "version": BENCH_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "profile": options.profile,
+        "host": host_info(),
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="daq_bench_") as directory:
+        if "throughput" in only:
+            print("throughput ...", flush=True)
+            report["results"]["throughput"] = bench_throughput(profile["throughput_s"], directory=directory)
+        if "live" in only:
+            print(f"live run ({profile['live_s']:g} s) ...", flush=True)
+            report["results"]["live"] = bench_live(
+                options.live_seconds or profile["live_s"], ai_rate=options.ai_rate, directory=directory
+            )
+        if "max_rate" in only:
+            print("max AI rate ...", flush=True)
+            report["results"]["max_rate"] = bench_max_rate(profile["step_s"], directory=directory)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition-to-disk pipeline on the simulated DAQ.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", help="comma-separated subset of throughput,live,max_rate")
+    parser.add_argument("--live-seconds", dest="live_seconds", type=float, help="length of the live run (memory growth)")
+    parser.add_argument("--ai-rate", dest="ai_rate", type=float, default=1000.0, help="AI rate of the live run (Hz)")
+    parser.add_argument("--out", help="JSON result file (default: bench_results/bench_YYYYmmdd_HHMMSS.json)")
+    parser.add_argument("--baseline", help="earlier JSON result to compare against")
+    options = parser.parse_args(argv)
+
+    report = run(options)
+    out = options.out or os.path.join(SCRIPT_DIR, "bench_results", time.strftime("bench_%Y%m%d_%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Results written to {out}")
+
+    results = report["results"]
+    for name, entry in results.get("throughput", {}).items():
+        print(f"throughput {name}: {entry['samples_per_s']:,.0f} samp/s")
+    if "live" in results:
+        live = results["live"]
+        print(
+            f"live: poll p99 {live['poll_latency']['p99_ms']:.2f} ms, "
+            f"CPU {live['cpu_percent_per_channel_khz']:.2f} %/channel-kHz, "
+            f"RSS growth {live['rss_growth_mb_per_min']:+.2f} MB/min"
+        )
+    if "max_rate" in results:
+        print(f"max AI rate without loss: {results['max_rate']['max_ai_rate']} Hz")
+
+    if options.baseline:
+        with open(options.baseline, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        print(f"Compared with {options.baseline}:")
+        for line in compare(results, baseline.get("results", {})):
+            print("  " + line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
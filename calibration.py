@@ -0,0 +1,296 @@
+import numpy as np
+
+
+CAL_KEYS = ("raw1", "eng1", "raw2", "eng2")
+# Optional curve replacing the two-point line of a channel:
+#   points: 0.5:0, 1.0:12.5, 2.5:50, 4.5:100   (raw:eng pairs)
+#   fit: linear (piecewise, default) or cubic (least-squares cubic)
+#   poly: -12.5, 25.0, 0.02                     (eng = c0 + c1*raw + c2*raw**2 ...)
+CURVE_KEYS = ("fit", "points", "poly")
+CURVE_FITS = ("linear", "cubic")
+
+
+def parse_scalar(value):
+    value = value.strip()
+    if not value:
+        return None
+    low = value.lower()
+    if low in ("null", "none"):
+        return None
+    try:
+        if "." in value or "e" in low:
+            return float(value)
+        return int(value)
+    except Exception:
+        return value.strip("\"'")
+
+
+def parse_simple_yaml(text):
+    data = {}
+    stack = [(-1, data)]
+    for raw_line in text.splitlines():
+        line = raw_line.split("#", 1)[0].rstrip()
+        if not line.strip():
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        key, sep, tail = line.strip().partition(":")
+        if not sep:
+            continue
+        while stack and indent <= stack[-1][0]:
+            stack.pop()
+        parent = stack[-1][1] if stack else data
+        tail = tail.strip()
+        if tail == "":
+            new_dict = {}
+            parent[key] = new_dict
+            stack.append((indent, new_dict))
+        else:
+            parent[key] = parse_scalar(tail)
+    return data
+
+
+def read_simple_yaml(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        return parse_simple_yaml(handle.read())
+
+
+def default_calibration(names):
+    cal = {}
+    for name in names:
+        cal[name] = {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 1.0}
+    return cal
+
+
+def parse_points(value):
+    # "0.5:0, 1.0:12.5" (file/dialog) or [[0.5, 0], ...] (log header) ->
+    # [[raw, eng], ...] sorted by raw
+    if isinstance(value, str):
+        pairs = [part.split(":") for part in value.split(",") if part.strip()]
+    else:
+        pairs = list(value)
+    try:
+        points = sorted([float(raw), float(eng)] for raw, eng in pairs)
+    except (TypeError, ValueError):
+        raise ValueError(f"Calibration points must be raw:eng pairs, got {value!r}") from None
+    if len(points) < 2:
+        raise ValueError("A calibration table needs at least 2 points")
+    if any(a[0] == b[0] for a, b in zip(points, points[1:])):
+        raise ValueError("Calibration points have a repeated raw value")
+    return points
+
+
+def format_points(points):
+    return ", ".join(f"{float(raw)!r}:{float(eng)!r}" for raw, eng in points)
+
+
+def parse_coefficients(value):
+    # "c0, c1, c2" or a single number or a list -> [c0, c1, ...]
+    if isinstance(value, str):
+        parts = [part for part in value.split(",") if part.strip()]
+    elif isinstance(value, (int, float)):
+        parts = [value]
+    else:
+        parts = list(value)
+    try:
+        coefficients = [float(part) for part in parts]
+    except (TypeError, ValueError):
+        raise ValueError(f"Polynomial coefficients must be numbers, got {value!r}") from None
+    if not coefficients:
+        raise ValueError("A polynomial needs at least one coefficient")
+    return coefficients
+
+
+def format_coefficients(coefficients):
+    return ", ".join(repr(float(c)) for c in coefficients)
+
+
+def normalize_curve(entry):
+    # Curve keys of one channel entry -> {} (two-point line) or the checked
+    # entry with lists instead of text, as kept in the calibration table
+    if entry.get("poly") is not None:
+        curve = {"poly": parse_coefficients(entry["poly"])}
+    elif entry.get("points") is not None:
+        fit = str(entry.get("fit") or "linear").strip().lower()
+        curve = {"fit": fit, "points": parse_points(entry["points"])}
+    else:
+        return {}
+    compile_curve(curve)
+    return curve
+
+
+def load_calibration(path, names, calibration=None):
+    # Updates (a copy of) `calibration` from the file; unknown or malformed
+    # entries keep their current values.
+    if calibration is None:
+        calibration = default_calibration(names)
+    else:
+        calibration = {name: dict(entry) for name, entry in calibration.items()}
+    data = read_simple_yaml(path)
+    channels = {}
+    if isinstance(data, dict):
+        if isinstance(data.get("channels"), dict):
+            channels = data["channels"]
+        else:
+            channels = data
+    for name in names:
+        entry = channels.get(name)
+        if not isinstance(entry, dict):
+            continue
+        target = calibration.setdefault(name, {})
+        for key in CAL_KEYS:
+            value = entry.get(key)
+            if isinstance(value, (int, float)):
+                target[key] = float(value)
+        try:
+            curve = normalize_curve(entry)
+        except ValueError:
+            continue
+        for key in CURVE_KEYS:
+            target.pop(key, None)
+        target.update(curve)
+    return calibration
+
+
+def save_calibration(path, calibration, names, modules=None, derived=None):
+    # `modules` (channel map, see channelmap.py) and `derived` (expressions,
+    # see derived.py) are written back unchanged so saving calibration never
+    # loses the rest of the configuration.
+    lines = ["version: 1"]
+    if modules:
+        lines.append("modules:")
+        for key, entry in modules.items():
+            lines.append(f"  {key}:")
+            for field, value in entry.items():
+                lines.append(f"    {field}: {value}")
+    if derived:
+        lines.append("derived:")
+        for key, expr in derived.items():
+            lines.append(f"  {key}: {expr}")
+    lines.append("channels:")
+    for name in names:
+        lines.append(f"  {name}:")
+        entry = calibration[name]
+        for key in CAL_KEYS:
+            value = entry.get(key, 0.0)
+            lines.append(f"    {key}: {value}")
+        if entry.get("poly") is not None:
+            lines.append(f"    poly: {format_coefficients(entry['poly'])}")
+        elif entry.get("points") is not None:
+            lines.append(f"    fit: {entry.get('fit') or 'linear'}")
+            lines.append(f"    points: {format_points(entry['points'])}")
+    text = "\n".join(lines) + "\n"
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+
+
+def linear_coefficients(entry):
+    # Two-point calibration entry -> (gain, offset); identity if incomplete.
+    # raw1 == raw2 keeps the historic behaviour of always returning eng1.
+    try:
+        raw1 = float(entry["raw1"])
+        raw2 = float(entry["raw2"])
+        eng1 = float(entry["eng1"])
+        eng2 = float(entry["eng2"])
+    except Exception:
+        return 1.0, 0.0
+    if raw2 == raw1:
+        return 0.0, eng1
+    gain = (eng2 - eng1) / (raw2 - raw1)
+    return gain, eng1 - raw1 * gain
+
+
+class PiecewiseLinear:
+    # Table of (raw, eng) points compiled into per-segment origin, value and
+    # slope arrays. A block row is evaluated with one binary search over the
+    # inner breakpoints; the end segments extend past the table, so
+    # over-range readings are extrapolated rather than clamped.
+    def __init__(self, points):
+        raw = np.array([p[0] for p in points], dtype=np.float64)
+        eng = np.array([p[1] for p in points], dtype=np.float64)
+        self.breaks = raw[1:-1]
+        self.origin = raw[:-1]
+        self.value = eng[:-1]
+        self.slope = np.diff(eng) / np.diff(raw)
+
+    def __call__(self, x):
+        segment = np.searchsorted(self.breaks, x, side="right")
+        return self.value[segment] + (x - self.origin[segment]) * self.slope[segment]
+
+
+class Polynomial:
+    # eng = c0 + c1*raw + c2*raw**2 ..., evaluated with Horner's scheme
+    def __init__(self, coefficients):
+        self.coefficients = np.array(coefficients, dtype=np.float64)
+
+    def __call__(self, x):
+        coefficients = self.coefficients
+        y = x * 0.0 + coefficients[-1]
+        for c in coefficients[-2::-1]:
+            y *= x
+            y += c
+        return y
+
+
+def compile_curve(entry):
+    # Channel entry -> PiecewiseLinear / Polynomial, or None for the
+    # two-point line. Raises ValueError for a malformed curve.
+    if entry.get("poly") is not None:
+        return Polynomial(parse_coefficients(entry["poly"]))
+    if entry.get("points") is None:
+        return None
+    points = parse_points(entry["points"])
+    fit = str(entry.get("fit") or "linear").strip().lower()
+    if fit == "linear":
+        return PiecewiseLinear(points)
+    if fit == "cubic":
+        # Least-squares fit in a scaled domain, converted back to raw units
+        raw = [p[0] for p in points]
+        eng = [p[1] for p in points]
+        fitted = np.polynomial.Polynomial.fit(raw, eng, min(3, len(points) - 1))
+        return Polynomial(fitted.convert().coef)
+    raise ValueError(f"Unknown calibration fit {fit!r} (use {', '.join(CURVE_FITS)})")
+
+
+class CalibrationEngine:
+    # Calibration table compiled into per-group gain/offset column vectors so
+    # a whole (channels x samples) block is calibrated in one operation.
+    # Channels with a multi-point table or polynomial are then overwritten
+    # row by row with their compiled curve (still vectorised over samples).
+    # NaN samples stay NaN (NaN * 0 is still NaN for the degenerate case).
+    # Build a new engine whenever the table changes instead of mutating one,
+    # so reader/writer threads always see a consistent snapshot.
+    def __init__(self, calibration, groups):
+        self.gain = {}
+        self.offset = {}
+        self.curves = {}
+        for group, names in groups:
+            entries = [calibration.get(name) or {} for name in names]
+            coeffs = [linear_coefficients(entry) for entry in entries]
+            self.gain[group] = np.array([c[0] for c in coeffs], dtype=np.float64)[:, None]
+            self.offset[group] = np.array([c[1] for c in coeffs], dtype=np.float64)[:, None]
+            curves = []
+            for row, entry in enumerate(entries):
+                try:
+                    curve = compile_curve(entry)
+                except ValueError:
+                    curve = None
+                if curve is not None:
+                    curves.append((row, curve))
+            self.curves[group] = curves
+
+    def apply(self, group, data):
+        gain = self.gain.get(group)
+        if gain is None:
+            return data
+        out = data * gain + self.offset[group]
+        for row, curve in self.curves[group]:
+            out[row] = curve(data[row])
+        return out
+
+    def apply_latest(self, group, values):
+        # Display path: one value per channel, None means "no data yet".
+        if all(v is None for v in values):
+            return list(values)
+        column = np.array([[np.nan if v is None else v] for v in values], dtype=np.float64)
+        out = self.apply(group, column)[:, 0].tolist()
+        return [None if v is None else c for v, c in zip(values, out)]
@@ -0,0 +1,206 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from acquisition import FALLBACK_RATE, RingBuffer, SampleBlock
+from datalog import BinaryLogger
+
+
+TRIGGER_MODES = ("Rising edge", "Falling edge", "Above", "Below", "Manual only")
+
+
+class LevelTrigger:
+    # Finds the first trigger sample of a block with array operations. Edge
+    # modes compare against the previous block's last sample, so a crossing
+    # on a block boundary is not missed.
+    def __init__(self, mode, level):
+        if mode not in TRIGGER_MODES:
+            raise ValueError(f"Unknown trigger mode: {mode}")
+        self.mode = mode
+        self.level = float(level)
+        self._prev = np.nan
+
+    def find(self, x):
+        # -> index of the first triggering sample, or None
+        if len(x) == 0 or self.mode == "Manual only":
+            return None
+        level = self.level
+        with np.errstate(invalid="ignore"):
+            if self.mode == "Above":
+                hits = x >= level
+            elif self.mode == "Below":
+                hits = x <= level
+            else:
+                before = np.concatenate([[self._prev], x[:-1]])
+                if self.mode == "Rising edge":
+                    hits = (before < level) & (x >= level)
+                else:
+                    hits = (before > level) & (x <= level)
+        self._prev = x[-1]
+        index = np.flatnonzero(hits)
+        return int(index[0]) if len(index) else None
+
+
+def _estimate_rate(t):
+    # Nominal rate of a group whose rate is unknown, from its sample times
+    steps = np.diff(t)
+    steps = steps[steps > 0]
+    return float(1.0 / np.median(steps)) if len(steps) else FALLBACK_RATE
+
+
+class TriggeredCapture:
+    # Single-shot capture of every group around a trigger. While armed, each
+    # group keeps the last pre_s seconds (plus one second of slack for slow
+    # groups) in a fixed-size ring; once triggered, blocks are kept until
+    # every group reaches t_trigger + post_s. The window is then written on
+    # a background thread as a binary log folder with explicit timestamps,
+    # so `python datalog.py capture_...` converts it like any binary log.
+    # Memory is bounded by (pre_s + 1 + post_s) * rate per group.
+    def __init__(self, groups, rates, channel, mode, level, pre_s=1.0, post_s=2.0,
+                 directory=".", calibration=None, t0=None, metadata=None):
+        self.groups = list(groups)
+        self.rates = dict(rates)
+        self.channel = channel
+        self.pre_s = float(pre_s)
+        self.post_s = float(post_s)
+        self.directory = directory
+        self.calibration = calibration
+        self.t0 = t0
+        self.metadata = dict(metadata or {})
+        self.trigger = LevelTrigger(mode, level)
+        self.trigger_group, self.trigger_row = None, None
+        for group, names in self.groups:
+            if channel in names:
+                self.trigger_group, self.trigger_row = group, names.index(channel)
+        if self.trigger_group is None and mode != "Manual only":
+            raise ValueError(f"Unknown trigger channel: {channel}")
+
+        self.rings = {
+            group: RingBuffer(len(names), math.ceil((self.pre_s + 1.0) * (self.rates.get(group) or FALLBACK_RATE)) + 1)
+            for group, names in self.groups
+        }
+        self.state = "armed"
+        self.t_trigger = None
+        self.path = None
+        self.error = None
+        self._fire = False
+        self._latest_t = None
+        self._parts = {}
+        self._thread = None
+
+    @property
+    def t_end(self):
+        return self.t_trigger + self.post_s
+
+    def fire(self):
+        # Manual trigger at the newest sample time seen (next push)
+        if self.state == "armed":
+            self._fire = True
+
+    def push(self, block, cal):
+        if self.state not in ("armed", "triggered"):
+            return
+        t = block.times()
+        if len(t) == 0:
+            return
+        self._latest_t = t[-1] if self._latest_t is None else max(self._latest_t, t[-1])
+        if self.state == "armed":
+            self.rings[block.group].extend(t, block.data)
+            t_hit = None
+            if self._fire:
+                t_hit = self._latest_t
+            elif block.group == self.trigger_group:
+                index = self.trigger.find(cal[self.trigger_row])
+                if index is not None:
+                    t_hit = t[index]
+            if t_hit is None:
+                return
+            self._triggered(t_hit)
+        else:
+            keep = t <= self.t_end
+            self._parts[block.group].append((t[keep], block.data[:, keep]))
+        self._check_done()
+
+    def _triggered(self, t_hit):
+        self.state = "triggered"
+        self.t_trigger = float(t_hit)
+        start = self.t_trigger - self.pre_s
+        for group, _ in self.groups:
+            times, data = self.rings[group].window(start)
+            keep = times <= self.t_end
+            self._parts[group] = [(times[keep], data[:, keep])]
+        self.rings = {}
+
+    def _check_done(self):
+        # Done when every group has reached t_end, or one second later for
+        # groups that have stopped delivering (e.g. an unplugged load cell).
+        # A group of unknown rate is done once it has a sample at t_end.
+        if self._latest_t is None or self._latest_t < self.t_end:
+            return
+        if self._latest_t < self.t_end + 1.0:
+            for group, parts in self._parts.items():
+                last = next((p[0][-1] for p in reversed(parts) if len(p[0])), None)
+                rate = self.rates.get(group)
+                if last is None or (last + 1.0 / rate <= self.t_end if rate else last < self.t_end):
+                    return
+        self.finish()
+
+    def finish(self):
+        # Save now; on Stop this keeps a post-trigger window cut short
+        if self.state != "triggered":
+            return
+        self.state = "saving"
+        self._thread = threading.Thread(target=self._save, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def _save(self):
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.directory, f"capture_{timestamp}")
+        suffix = 1
+        while os.path.exists(path):
+            suffix += 1
+            path = os.path.join(self.directory, f"capture_{timestamp}_{suffix}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            windows = {}
+            rates = {}
+            for group, parts in self._parts.items():
+                t = np.concatenate([p[0] for p in parts])
+                windows[group] = (t, np.concatenate([p[1] for p in parts], axis=1))
+                rates[group] = self.rates.get(group) or _estimate_rate(t)
+            logger = BinaryLogger(
+                path,
+                self.groups,
+                rates,
+                calibration=self.calibration,
+                t0=self.t0,
+                chunk_seconds=self.pre_s + self.post_s + 2.0,
+                timed=[group for group, _ in self.groups],
+            )
+            for key, value in self.metadata.items():
+                logger.update_meta(key, value)
+            logger.update_meta("trigger", {
+                "channel": self.channel,
+                "mode": self.trigger.mode,
+                "level": self.trigger.level,
+                "manual": self._fire,
+                "t_s": self.t_trigger,
+                "pre_s": self.pre_s,
+                "post_s": self.post_s,
+            })
+            for group, (t, data) in windows.items():
+                logger.write_block(SampleBlock(group, data, 0, rates[group], t=t))
+            logger.close()
+            self.path = path
+            self.state = "saved"
+        except Exception as exc:
+            self.error = exc
+            self.state = "failed"
+        self._parts = {}
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,616 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import time
+import zipfile
+
+import numpy as np
+
+from calibration import CalibrationEngine
+from datalog import BINARY_HEADER
+from logreader import ARCHIVE_EXT, ARCHIVE_VERSION, open_recording
+
+
+# Index of every logged run: metadata, channel layout, calibration snapshot
+# and per-channel summary statistics in a SQLite file next to the logs, so
+# "which runs had EGT above 800 °C" is one query instead of opening every
+# log. Finished runs can be compressed into chunked archives (see
+# logreader.ArchiveRecording); a time window is read back by inflating only
+# the chunks that overlap it.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOG_FILE = "runs.sqlite"
+SCHEMA_VERSION = 1
+# Seconds of a group per archive chunk
+ARCHIVE_CHUNK_S = 10.0
+# zlib level: on shuffled 16-bit ADC samples 9 compresses only ~2 % better than 6, ten times slower
+ARCHIVE_LEVEL = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    parts TEXT NOT NULL,
+    format TEXT NOT NULL,
+    mode TEXT,
+    started REAL,
+    duration REAL,
+    operator TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    rates TEXT,
+    channel_config TEXT,
+    calibration TEXT,
+    metadata TEXT,
+    source_bytes INTEGER,
+    archive TEXT,
+    archive_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+CREATE TABLE IF NOT EXISTS channel_stats (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    channel TEXT NOT NULL COLLATE NOCASE,
+    grp TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL,
+    t_min REAL,
+    t_max REAL,
+    PRIMARY KEY (run, channel)
+);
+CREATE INDEX IF NOT EXISTS channel_max ON channel_stats (channel, max);
+CREATE INDEX IF NOT EXISTS channel_min ON channel_stats (channel, min);
+"""
+
+
+class RunStats:
+    # Per-channel count, min, max, mean and the times of the extremes of
+    # calibrated values, updated block by block while a run streams
+    def __init__(self, groups):
+        self.groups = [(group, list(names)) for group, names in groups]
+        self.reset()
+
+    def reset(self):
+        self.t_first = None
+        self.t_last = None
+        self._state = {}
+        for group, names in self.groups:
+            n = len(names)
+            self._state[group] = {
+                "count": np.zeros(n, dtype=np.int64),
+                "sum": np.zeros(n),
+                "min": np.full(n, np.inf),
+                "max": np.full(n, -np.inf),
+                "t_min": np.full(n, np.nan),
+                "t_max": np.full(n, np.nan),
+            }
+
+    def update(self, group, t, cal):
+        state = self._state.get(group)
+        if state is None or not len(t):
+            return
+        cal = np.asarray(cal, dtype=np.float64)
+        finite = np.isfinite(cal)
+        if finite.all():
+            # The usual case: no NaN masking, no copies
+            state["count"] += cal.shape[1]
+            state["sum"] += cal.sum(axis=1)
+            low = high = cal
+        else:
+            state["count"] += finite.sum(axis=1)
+            state["sum"] += np.where(finite, cal, 0.0).sum(axis=1)
+            low = np.where(finite, cal, np.inf)
+            high = np.where(finite, cal, -np.inf)
+        rows = np.arange(cal.shape[0])
+        i = low.argmin(axis=1)
+        value = low[rows, i]
+        better = value < state["min"]
+        state["min"][better] = value[better]
+        state["t_min"][better] = t[i[better]]
+        i = high.argmax(axis=1)
+        value = high[rows, i]
+        better = value > state["max"]
+        state["max"][better] = value[better]
+        state["t_max"][better] = t[i[better]]
+        if np.isfinite(t[0]) and np.isfinite(t[-1]):
+            # Block times are ascending
+            self.t_first = float(t[0]) if self.t_first is None else min(self.t_first, float(t[0]))
+            self.t_last = float(t[-1]) if self.t_last is None else max(self.t_last, float(t[-1]))
+
+    def channels(self):
+        # -> [(channel, group, count, min, max, mean, t_min, t_max)]
+        out = []
+        for group, names in self.groups:
+            state = self._state[group]
+            for k, name in enumerate(names):
+                count = int(state["count"][k])
+                if count:
+                    out.append((name, group, count, float(state["min"][k]), float(state["max"][k]),
+                                float(state["sum"][k] / count), float(state["t_min"][k]), float(state["t_max"][k])))
+                else:
+                    out.append((name, group, 0, None, None, None, None, None))
+        return out
+
+    def duration(self):
+        if self.t_first is None:
+            return None
+        return self.t_last - self.t_first
+
+
+def recording_stats(recording, calibration=None):
+    # RunStats of a finished log, read window by window
+    groups = recording.groups
+    engine = CalibrationEngine(calibration if calibration is not None else recording.calibration, groups)
+    stats = RunStats(groups)
+    for window in recording.chunks(seconds=ARCHIVE_CHUNK_S):
+        for group, (t, raw) in window.items():
+            if len(t):
+                stats.update(group, t, engine.apply(group, raw))
+    return stats
+
+
+def log_format(path):
+    if os.path.isdir(path):
+        return "binary"
+    if path.lower().endswith(ARCHIVE_EXT):
+        return "archive"
+    return "csv"
+
+
+def log_bytes(path):
+    # Bytes of data a log holds
+    if os.path.isdir(path):
+        header_path = os.path.join(path, BINARY_HEADER)
+        try:
+            with open(header_path, "r", encoding="utf-8") as handle:
+                header = json.load(handle)
+        except (OSError, ValueError):
+            return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        # Chunk files are preallocated to a whole chunk; count the samples
+        # actually written, not the file sizes
+        itemsize = np.dtype(header.get("dtype", "float64")).itemsize
+        used = os.path.getsize(header_path)
+        for info in header["groups"].values():
+            rows = len(info["channels"]) + (1 if info.get("timestamps") else 0)
+            used += sum(chunk["samples"] for chunk in info["chunks"]) * rows * itemsize
+        return used
+    if path.lower().endswith(".csv"):
+        root = os.path.splitext(path)[0]
+        sidecars = [root + ".json", root + ".index.json"]
+        return os.path.getsize(path) + sum(os.path.getsize(p) for p in sidecars if os.path.exists(p))
+    return os.path.getsize(path)
+
+
+def shuffle_floats(values):
+    # (rows x samples) -> float64 bytes regrouped into 8 byte planes (all
+    # first bytes, then all second bytes, ...). Neighbouring samples share
+    # sign, exponent and top mantissa bytes, so the planes deflate far
+    # better than interleaved floats.
+    values = np.ascontiguousarray(values, dtype="<f8")
+    return np.ascontiguousarray(values.reshape(-1).view(np.uint8).reshape(-1, 8).T).tobytes()
+
+
+def _clock_start(t, rate, t_offset):
+    # -> start_index if t is bit for bit the sample clock from there, else
+    # None. write_archive stores such chunks without timestamps; the reader
+    # rebuilds them as t_offset + (start_index + k) / rate, as in a binary log.
+    if not rate or not len(t) or not np.isfinite(t).all():
+        return None
+    start = int(round((t[0] - t_offset) * rate))
+    grid = t_offset + (start + np.arange(len(t))) / rate
+    return start if np.array_equal(grid, t) else None
+
+
+def write_archive(paths, archive_path, metadata=None):
+    # Compresses a run (its log parts, in order) into one archive.
+    # -> archive size in bytes
+    recordings = [open_recording(path) for path in paths]
+    first = recordings[0]
+    header = {
+        "archive": ARCHIVE_VERSION,
+        "t0": first.t0,
+        "calibration": first.calibration,
+        "sources": [os.path.basename(path.rstrip("/\\")) for path in paths],
+        "metadata": metadata or {},
+        "groups": {group: {"channels": list(names), "rate": first.rates.get(group), "chunks": []}
+                   for group, names in first.groups},
+    }
+    tmp = archive_path + ".tmp"
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ARCHIVE_LEVEL) as archive:
+        for recording in recordings:
+            if [names for _, names in recording.groups] != [names for _, names in first.groups]:
+                raise ValueError(f"{recording.path}: channel layout differs from the first part")
+            offsets = {group: info.get("t_offset", 0.0)
+                       for group, info in (getattr(recording, "header", None) or {}).get("groups", {}).items()}
+            for window in recording.chunks(seconds=ARCHIVE_CHUNK_S):
+                for group, (t, raw) in window.items():
+                    if not len(t):
+                        continue
+                    info = header["groups"][group]
+                    name = f"{group}_{len(info['chunks']):05d}.f8s"
+                    t_offset = float(offsets.get(group, 0.0))
+                    start = _clock_start(t, info["rate"], t_offset)
+                    rows = raw if start is not None else np.vstack([t, raw])
+                    archive.writestr(name, shuffle_floats(rows))
+                    finite = t[np.isfinite(t)]
+                    info["chunks"].append({
+                        "file": name,
+                        "samples": len(t),
+                        "start_index": start,
+                        "t_offset": t_offset if start is not None else None,
+                        "t_min": float(finite.min()) if len(finite) else float("inf"),
+                        "t_max": float(finite.max()) if len(finite) else float("-inf"),
+                    })
+        archive.writestr(BINARY_HEADER, json.dumps(header, indent=1))
+    os.replace(tmp, archive_path)
+    return os.path.getsize(archive_path)
+
+
+def _dumps(value):
+    return json.dumps(value) if value is not None else None
+
+
+class Catalog:
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"{path} was written by a newer version (schema {version})")
+        with self.db:
+            self.db.executescript(SCHEMA)
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _relative(self, path):
+        # Paths are kept relative to the catalog, so a copied folder of logs
+        # and its runs.sqlite still match
+        path = os.path.abspath(path.rstrip("/\\"))
+        try:
+            return os.path.relpath(path, self.root)
+        except ValueError:
+            # Another drive on Windows
+            return path
+
+    def absolute(self, path):
+        return path if path is None or os.path.isabs(path) else os.path.join(self.root, path)
+
+    def record_run(self, paths, stats, started=None, mode=None, operator="", notes="", rates=None,
+                   channel_config=None, calibration=None, metadata=None):
+        # Adds (or replaces) the run logged to `paths` -> run id
+        path = self._relative(paths[0])
+        name = os.path.splitext(os.path.basename(path))[0]
+        sizes = [log_bytes(p) for p in paths if os.path.exists(p)]
+        values = (
+            name, path, json.dumps([self._relative(p) for p in paths]), log_format(paths[0]), mode,
+            started, stats.duration(), operator or "", notes or "", _dumps(rates), _dumps(channel_config),
+            _dumps(calibration), _dumps(metadata), sum(sizes) if sizes else None,
+        )
+        with self.db:
+            row = self.db.execute("SELECT id FROM runs WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                cursor = self.db.execute(
+                    "INSERT INTO runs (name, path, parts, format, mode, started, duration, operator, notes, rates,"
+                    " channel_config, calibration, metadata, source_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    values,
+                )
+                run = cursor.lastrowid
+            else:
+                run = row["id"]
+                self.db.execute(
+                    "UPDATE runs SET name = ?, path = ?, parts = ?, format = ?, mode = ?, started = ?, duration = ?,"
+                    " operator = ?, notes = ?, rates = ?, channel_config = ?, calibration = ?, metadata = ?,"
+                    " source_bytes = ? WHERE id = ?",
+                    values + (run,),
+                )
+                self.db.execute("DELETE FROM channel_stats WHERE run = ?", (run,))
+            self.db.executemany(
+                "INSERT INTO channel_stats (run, channel, grp, count, min, max, mean, t_min, t_max)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run,) + row for row in stats.channels()],
+            )
+        return run
+
+    def add_log(self, path, operator="", notes=""):
+        # Catalogs an existing log; statistics come from reading it once
+        recording = open_recording(path)
+        meta = getattr(recording, "header", None) or getattr(recording, "meta", None) or {}
+        return self.record_run(
+            [path],
+            recording_stats(recording),
+            started=recording.t0,
+            mode=meta.get("mode") or ("Binary" if os.path.isdir(path) else None),
+            operator=operator or (meta.get("run") or {}).get("operator", ""),
+            notes=notes or (meta.get("run") or {}).get("notes", ""),
+            rates=recording.rates,
+            calibration=recording.calibration,
+            metadata={key: meta[key] for key in ("time_sync", "buffers", "replay", "stats") if key in meta},
+        )
+
+    def run(self, key):
+        # A run by id or name -> row, or None
+        if str(key).isdigit():
+            return self.db.execute("SELECT * FROM runs WHERE id = ?", (int(key),)).fetchone()
+        return self.db.execute("SELECT * FROM runs WHERE name = ?", (str(key),)).fetchone()
+
+    def runs(self, limit=None):
+        sql = "SELECT * FROM runs ORDER BY started DESC, id DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self.db.execute(sql).fetchall()
+
+    def channel_stats(self, run):
+        return self.db.execute("SELECT * FROM channel_stats WHERE run = ? ORDER BY rowid", (run,)).fetchall()
+
+    def find(self, channel=None, above=None, below=None, operator=None, text=None, since=None, until=None):
+        # Runs matching every given condition, newest first. With a channel,
+        # each row also has that channel's min/max/mean and their times.
+        # above / below: the channel's max exceeded / min fell under the level.
+        where, args = [], []
+        columns = "runs.*"
+        tables = "runs"
+        if channel is not None:
+            columns += ", s.channel, s.min, s.max, s.mean, s.t_min, s.t_max"
+            tables += " JOIN channel_stats AS s ON s.run = runs.id"
+            where.append("s.channel = ?")
+            args.append(channel)
+            if above is not None:
+                where.append("s.max > ?")
+                args.append(float(above))
+            if below is not None:
+                where.append("s.min < ?")
+                args.append(float(below))
+        elif above is not None or below is not None:
+            raise ValueError("--above and --below need a channel")
+        if operator:
+            where.append("runs.operator = ? COLLATE NOCASE")
+            args.append(operator)
+        if text:
+            where.append("(runs.notes LIKE ? OR runs.name LIKE ?)")
+            args.extend([f"%{text}%"] * 2)
+        if since is not None:
+            where.append("runs.started >= ?")
+            args.append(float(since))
+        if until is not None:
+            where.append("runs.started < ?")
+            args.append(float(until))
+        sql = f"SELECT {columns} FROM {tables}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self.db.execute(sql + " ORDER BY runs.started DESC, runs.id DESC", args).fetchall()
+
+    def annotate(self, run, operator=None, notes=None):
+        with self.db:
+            if operator is not None:
+                self.db.execute("UPDATE runs SET operator = ? WHERE id = ?", (operator, run))
+            if notes is not None:
+                self.db.execute("UPDATE runs SET notes = ? WHERE id = ?", (notes, run))
+
+    def archive(self, run, delete_source=False):
+        # Compresses a run next to its log -> (archive path, source bytes,
+        # archive bytes). The archive is read back and compared sample for
+        # sample before the source is deleted.
+        row = self.db.execute("SELECT * FROM runs WHERE id = ?", (run,)).fetchone()
+        if row is None:
+            raise ValueError(f"No run {run}")
+        paths = [self.absolute(p) for p in json.loads(row["parts"])]
+        present = [p for p in paths if os.path.exists(p)]
+        archive_path = self.absolute(row["archive"]) if row["archive"] else None
+        size = row["archive_bytes"]
+        if archive_path is None or not os.path.exists(archive_path):
+            if len(present) < len(paths):
+                missing = next(p for p in paths if p not in present)
+                raise FileNotFoundError(f"Log of run {run} not found: {missing}")
+            archive_path = os.path.splitext(paths[0].rstrip("/\\"))[0] + ARCHIVE_EXT
+            metadata = {"name": row["name"], "operator": row["operator"], "notes": row["notes"],
+                        "channel_config": json.loads(row["channel_config"] or "null")}
+            size = write_archive(paths, archive_path, metadata)
+            with self.db:
+                self.db.execute(
+                    "UPDATE runs SET archive = ?, archive_bytes = ? WHERE id = ?",
+                    (self._relative(archive_path), size, run),
+                )
+        if delete_source and present:
+            if len(present) == len(paths):
+                _verify_archive(paths, archive_path)
+            else:
+                raise ValueError(f"Run {run} is missing log parts; cannot check its archive, source kept")
+            for path in paths:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    root = os.path.splitext(path)[0]
+                    for sidecar in (path, root + ".json", root + ".index.json"):
+                        if os.path.exists(sidecar):
+                            os.remove(sidecar)
+        return archive_path, row["source_bytes"], size
+
+    def open_run(self, run):
+        # The run's archive if it has one, else its log (first part)
+        row = self.db.execute("SELECT * FROM runs WHERE id = ?", (run,)).fetchone()
+        if row is None:
+            raise ValueError(f"No run {run}")
+        path = self.absolute(row["archive"]) if row["archive"] else None
+        if path is None or not os.path.exists(path):
+            path = self.absolute(row["path"])
+        return open_recording(path)
+
+    def window(self, run, t_start=None, t_end=None):
+        # -> {group: (t, calibrated)} for [t_start, t_end) of a run
+        recording = self.open_run(run)
+        engine = CalibrationEngine(recording.calibration, recording.groups)
+        return {group: (t, engine.apply(group, raw)) for group, (t, raw) in recording.read(t_start, t_end).items()}
+
+
+def _verify_archive(paths, archive_path):
+    # Reads the log parts and the archive side by side, ARCHIVE_CHUNK_S at a
+    # time, and raises unless every group's times and raw values are equal
+    archive = open_recording(archive_path)
+    pending = {}
+
+    def compare(group, t, raw):
+        # Matches archive samples against the log samples queued for group
+        queue_t, queue_raw = pending.pop(group)
+        n = len(t)
+        if len(queue_t) < n:
+            raise ValueError(f"{archive_path}: {group} sample count does not match the log; source kept")
+        if not (np.array_equal(queue_t[:n], t, equal_nan=True)
+                and np.array_equal(queue_raw[:, :n], raw, equal_nan=True)):
+            raise ValueError(f"{archive_path}: {group} values do not match the log; source kept")
+        pending[group] = (queue_t[n:], queue_raw[:, n:])
+
+    sources = (window for path in paths for window in open_recording(path).chunks(seconds=ARCHIVE_CHUNK_S))
+    for group, names in archive.groups:
+        pending[group] = (np.empty(0), np.empty((len(names), 0)))
+    for window in archive.chunks(seconds=ARCHIVE_CHUNK_S):
+        for group, (t, raw) in window.items():
+            # Pull log windows until they cover this archive window
+            while len(pending[group][0]) < len(t):
+                source = next(sources, None)
+                if source is None:
+                    break
+                for name, (st, sraw) in source.items():
+                    if name not in pending:
+                        raise ValueError(f"{archive_path}: no group {name} in the archive; source kept")
+                    queue_t, queue_raw = pending[name]
+                    pending[name] = (np.concatenate([queue_t, st]), np.concatenate([queue_raw, sraw], axis=1))
+            compare(group, t, raw)
+    for source in sources:
+        for name, (st, sraw) in source.items():
+            if len(st):
+                raise ValueError(f"{archive_path}: {name} has samples missing from the archive; source kept")
+    for group, (t, _) in pending.items():
+        if len(t):
+            raise ValueError(f"{archive_path}: {group} has samples missing from the archive; source kept")
+
+
+def _format_time(started):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(started)) if started else "?"
+
+
+def _format_run(row):
+    duration = f"{row['duration']:.0f} s" if row["duration"] is not None else "?"
+    stored = f"archive {row['archive_bytes'] / 1e6:.1f} MB" if row["archive"] else f"{row['format']}"
+    text = f"{row['id']:5d}  {row['name']}  {_format_time(row['started'])}  {duration}  {stored}"
+    if row["operator"]:
+        text += f"  [{row['operator']}]"
+    if row["notes"]:
+        text += f"  {row['notes']}"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run catalog: list, search, archive and extract logged runs.")
+    parser.add_argument("--catalog", default=os.path.join(SCRIPT_DIR, CATALOG_FILE), help="catalog file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("list", help="list runs, newest first")
+    p.add_argument("--limit", type=int, default=50)
+    p = commands.add_parser("show", help="metadata and channel statistics of a run")
+    p.add_argument("run", help="run id or name")
+    p = commands.add_parser("find", help="runs matching conditions")
+    p.add_argument("--channel", help="channel name (calibrated values)")
+    p.add_argument("--above", type=float, help="channel max exceeded this level")
+    p.add_argument("--below", type=float, help="channel min fell under this level")
+    p.add_argument("--operator")
+    p.add_argument("--text", help="text in the notes or name")
+    p = commands.add_parser("add", help="catalog existing logs")
+    p.add_argument("logs", nargs="+", help="CSV logs or binary log folders")
+    p.add_argument("--operator", default="")
+    p.add_argument("--notes", default="")
+    p = commands.add_parser("note", help="set a run's operator or notes")
+    p.add_argument("run")
+    p.add_argument("--operator")
+    p.add_argument("--notes")
+    p = commands.add_parser("archive", help="compress runs into chunked archives")
+    p.add_argument("runs", nargs="*", help="run ids or names (default: every run not archived yet)")
+    p.add_argument("--delete", action="store_true", help="delete each log after its archive checks out")
+    p = commands.add_parser("extract", help="calibrated values of a time window")
+    p.add_argument("run")
+    p.add_argument("--start", type=float, help="window start (s on the run timebase)")
+    p.add_argument("--end", type=float, help="window end (s)")
+    p.add_argument("--npz", help="save t and values per group to this .npz file")
+    args = parser.parse_args(argv)
+
+    with Catalog(args.catalog) as catalog:
+        def lookup(key):
+            row = catalog.run(key)
+            if row is None:
+                raise SystemExit(f"No run {key} in {args.catalog}")
+            return row
+
+        if args.command == "list":
+            for row in catalog.runs(args.limit):
+                print(_format_run(row))
+        elif args.command == "show":
+            row = lookup(args.run)
+            print(_format_run(row))
+            print(f"log: {catalog.absolute(row['path'])}")
+            if row["archive"]:
+                ratio = row["source_bytes"] / row["archive_bytes"] if row["source_bytes"] and row["archive_bytes"] else 0
+                print(f"archive: {catalog.absolute(row['archive'])} ({ratio:.1f}x smaller)")
+            for stat in catalog.channel_stats(row["id"]):
+                if stat["count"]:
+                    print(f"  {stat['channel']:>12}: min {stat['min']:.4g} at {stat['t_min']:.2f} s, "
+                          f"max {stat['max']:.4g} at {stat['t_max']:.2f} s, mean {stat['mean']:.4g}")
+                else:
+                    print(f"  {stat['channel']:>12}: no data")
+        elif args.command == "find":
+            for row in catalog.find(args.channel, args.above, args.below, args.operator, args.text):
+                text = _format_run(row)
+                if args.channel:
+                    text += f"  | {row['channel']} max {row['max']:.4g} at {row['t_max']:.2f} s"
+                print(text)
+        elif args.command == "add":
+            for path in args.logs:
+                run = catalog.add_log(path.rstrip("/\\"), args.operator, args.notes)
+                print(_format_run(catalog.run(run)))
+        elif args.command == "note":
+            catalog.annotate(lookup(args.run)["id"], args.operator, args.notes)
+        elif args.command == "archive":
+            rows = [lookup(key) for key in args.runs] or [row for row in catalog.runs() if args.delete or not row["archive"]]
+            for row in rows:
+                try:
+                    path, before, after = catalog.archive(row["id"], delete_source=args.delete)
+                except (OSError, ValueError) as exc:
+                    print(f"{row['name']}: {exc}")
+                    continue
+                ratio = f", {before / after:.1f}x smaller" if before and after else ""
+                print(f"{row['name']}: {path}{ratio}")
+        elif args.command == "extract":
+            row = lookup(args.run)
+            window = catalog.window(row["id"], args.start, args.end)
+            recording = catalog.open_run(row["id"])
+            for group, names in recording.groups:
+                t, values = window[group]
+                if not len(t):
+                    print(f"{group}: no samples")
+                    continue
+                print(f"{group}: {len(t)} samples, t = {t[0]:.3f} .. {t[-1]:.3f} s")
+                for name, channel in zip(names, values):
+                    print(f"  {name:>12}: min {np.nanmin(channel):.4g}, max {np.nanmax(channel):.4g}, "
+                          f"mean {np.nanmean(channel):.4g}")
+            if args.npz:
+                arrays = {}
+                for group, (t, values) in window.items():
+                    arrays[f"{group}_t"] = t
+                    arrays[group] = values
+                np.savez(args.npz, **arrays)
+                print(f"Saved {args.npz}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
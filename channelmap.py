@@ -0,0 +1,228 @@
+from calibration import read_simple_yaml
+
+
+# Channel kinds and the group (= one DAQmx task) each kind is acquired in.
+# All channels of one kind share a sample clock, so every module of that
+# kind in the chassis goes into a single task. A serial load cell is not a
+# DAQmx channel; it has its own reader thread and software timestamps.
+KINDS = {
+    "thermocouple": {"group": "tc", "prefix": "TC", "title": "Thermocouples (°C)"},
+    "voltage": {"group": "ai", "prefix": "AI", "title": "Analog inputs (V)"},
+    "serial": {"group": "lc", "prefix": "LC", "title": "Load cell (RS232)"},
+}
+KIND_ALIASES = {
+    "tc": "thermocouple", "thermocouple": "thermocouple",
+    "ai": "voltage", "voltage": "voltage",
+    "serial": "serial", "loadcell": "serial", "load_cell": "serial", "rs232": "serial",
+}
+
+
+def parse_channel_list(value):
+    # 4 -> [0, 1, 2, 3]; "0-7" -> [0..7]; "0,2,5-6" -> [0, 2, 5, 6]
+    if isinstance(value, int):
+        return list(range(value))
+    channels = []
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        if sep:
+            channels.extend(range(int(first), int(last) + 1))
+        else:
+            channels.append(int(part))
+    return channels
+
+
+def format_channel_list(channels):
+    # Inverse of parse_channel_list. Runs are always written as "a-b" (even
+    # "3-3") because a bare number would read back as a channel count.
+    runs = []
+    for channel in channels:
+        if runs and channel == runs[-1][1] + 1:
+            runs[-1][1] = channel
+        else:
+            runs.append([channel, channel])
+    return ",".join(f"{first}-{last}" for first, last in runs)
+
+
+class ModuleSpec:
+    # One C Series module: which inputs to use and what to call them.
+    # device=None means "use the module name entered in the GUI/CLI".
+    # For a serial load cell, device is the port (COM3, /dev/ttyUSB0),
+    # channels the values per line, and rate its nominal output rate.
+    def __init__(self, key, kind, channels, device=None, names=None, tc_type=None, baudrate=9600, rate=None):
+        self.key = key
+        self.kind = kind
+        self.channels = list(channels)
+        self.device = device
+        self.names = names
+        self.tc_type = tc_type
+        self.baudrate = baudrate
+        self.rate = rate
+
+
+class ChannelMap:
+    # Declarative channel layout, resolved once into groups of channel names.
+    # Everything downstream (tasks, readers, calibration, logs, UI) is sized
+    # from `groups`; `index` maps a channel name to its (group, row) so the
+    # hot path never looks channels up by building names.
+    def __init__(self, modules):
+        self.modules = list(modules)
+        self.groups = []
+        self.index = {}
+        self._physical = {}
+        counters = {}
+        for kind, spec in KINDS.items():
+            group = spec["group"]
+            names = []
+            physical = []
+            for module in self.modules:
+                if module.kind != kind:
+                    continue
+                if module.names is not None and len(module.names) != len(module.channels):
+                    raise ValueError(f"Module {module.key}: {len(module.names)} names for {len(module.channels)} channels")
+                for row, channel in enumerate(module.channels):
+                    if module.names is not None:
+                        name = module.names[row]
+                    else:
+                        n = counters.get(kind, 0)
+                        counters[kind] = n + 1
+                        name = f"{spec['prefix']}{n}"
+                    if name in self.index:
+                        raise ValueError(f"Duplicate channel name: {name}")
+                    self.index[name] = (group, len(names))
+                    names.append(name)
+                    physical.append((module, channel))
+            if names:
+                self.groups.append((group, names))
+                self._physical[group] = physical
+        if len([m for m in self.modules if m.kind == "serial"]) > 1:
+            raise ValueError("Only one serial load cell is supported")
+
+    @classmethod
+    def default(cls):
+        # The original bench layout: NI-9212 ai0..ai2 and NI-9201 ai0..ai3
+        return cls([
+            ModuleSpec("tc", "thermocouple", range(3)),
+            ModuleSpec("ai", "voltage", range(4)),
+        ])
+
+    @classmethod
+    def from_groups(cls, groups):
+        # Layout of a recorded log: one module per logged group, channels
+        # named as they were logged (used for replay)
+        specs = []
+        for group, names in groups:
+            kind = next((kind for kind, spec in KINDS.items() if spec["group"] == group), None)
+            if kind is None:
+                raise ValueError(f"Unknown channel group in log: {group}")
+            specs.append(ModuleSpec(group, kind, range(len(names)), names=list(names)))
+        return cls(specs)
+
+    def names(self):
+        out = []
+        for _, names in self.groups:
+            out.extend(names)
+        return out
+
+    def kind(self, group):
+        for kind, spec in KINDS.items():
+            if spec["group"] == group:
+                return kind
+        raise KeyError(group)
+
+    def title(self, group):
+        return KINDS[self.kind(group)]["title"]
+
+    def physical_channels(self, group, devices):
+        # -> [(physical_channel, module)] in row order. `devices` maps a kind
+        # to the module name used when the config does not give one.
+        out = []
+        for module, channel in self._physical.get(group, []):
+            device = module.device or devices.get(module.kind)
+            if not device:
+                raise ValueError(f"No module name for {module.key}; enter it as shown in NI MAX.")
+            out.append((f"{device}/ai{channel}", module))
+        return out
+
+    def serial_module(self, group):
+        for module in self.modules:
+            if module.kind == "serial" and KINDS["serial"]["group"] == group:
+                if not module.device:
+                    raise ValueError(f"No serial port for {module.key}")
+                return module
+        return None
+
+    def describe(self, group):
+        # "Mod4 ai0-3; Mod2 ai0-7" style summary for labels
+        parts = []
+        for module in self.modules:
+            if KINDS[module.kind]["group"] != group or not module.channels:
+                continue
+            where = module.device or module.key
+            if module.kind == "serial":
+                parts.append(f"{where} @ {module.baudrate} baud")
+            else:
+                parts.append(f"{where} ai{format_channel_list(module.channels)}")
+        return "; ".join(parts)
+
+    def as_config(self):
+        # Inverse of channel_map_from_config, for writing the file back
+        modules = {}
+        for module in self.modules:
+            entry = {"kind": module.kind, "channels": format_channel_list(module.channels)}
+            if module.device:
+                entry["device"] = module.device
+            if module.tc_type:
+                entry["tc_type"] = module.tc_type
+            if module.names is not None:
+                entry["names"] = ",".join(module.names)
+            if module.kind == "serial":
+                entry["baudrate"] = module.baudrate
+                if module.rate:
+                    entry["rate"] = module.rate
+            modules[module.key] = entry
+        return modules
+
+
+def channel_map_from_config(data):
+    # `modules:` section of calibration.yaml; missing section -> default map.
+    # Each module key holds kind (thermocouple|voltage), channels (count,
+    # "0-7" or "0,2,5"), and optionally device, names ("a,b,c") and tc_type.
+    # Serial load cells (kind: serial) take device (port), baudrate, rate
+    # and channels = values per line (default 1).
+    modules = data.get("modules") if isinstance(data, dict) else None
+    if not isinstance(modules, dict) or not modules:
+        return ChannelMap.default()
+    specs = []
+    for key, entry in modules.items():
+        if not isinstance(entry, dict):
+            raise ValueError(f"Module {key}: expected a mapping")
+        kind = KIND_ALIASES.get(str(entry.get("kind", "")).strip().lower())
+        if kind is None:
+            raise ValueError(f"Module {key}: unknown kind {entry.get('kind')!r}")
+        if kind == "serial":
+            entry.setdefault("channels", 1)
+        if entry.get("channels") is None:
+            raise ValueError(f"Module {key}: no channels")
+        names = entry.get("names")
+        if names is not None:
+            names = [n.strip() for n in str(names).split(",") if n.strip()]
+        device = entry.get("device")
+        tc_type = entry.get("tc_type")
+        specs.append(ModuleSpec(
+            key,
+            kind,
+            parse_channel_list(entry["channels"]),
+            device=str(device) if device else None,
+            names=names,
+            tc_type=str(tc_type).upper() if tc_type else None,
+            baudrate=int(entry.get("baudrate") or 9600),
+            rate=float(entry["rate"]) if entry.get("rate") else None,
+        ))
+    return ChannelMap(specs)
+
+
+def load_channel_map(path):
+    return channel_map_from_config(read_simple_yaml(path))
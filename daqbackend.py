@@ -0,0 +1,106 @@
+# Device backends expose the same small surface as the nidaqmx package
+# (Task, DaqError, AcquisitionType, TemperatureUnits, ThermocoupleType) so
+# the acquisition code does not care whether real hardware is attached.
+# open_serial(port, baudrate, rate, n_channels) opens a load-cell port;
+# list_devices() enumerates chassis and modules (see discovery.py).
+
+BACKENDS = ("NI-DAQmx", "Simulated")
+
+OVERFLOW_ERROR = -200279
+TIMEOUT_ERROR = -200284
+
+
+class NiDaqmxBackend:
+    name = "NI-DAQmx"
+    simulated = False
+
+    def __init__(self):
+        import nidaqmx
+        from nidaqmx.constants import READ_ALL_AVAILABLE, AcquisitionType, TemperatureUnits, ThermocoupleType
+        from nidaqmx.errors import DaqError
+
+        self.Task = nidaqmx.Task
+        self.DaqError = DaqError
+        self.AcquisitionType = AcquisitionType
+        self.TemperatureUnits = TemperatureUnits
+        self.ThermocoupleType = ThermocoupleType
+        self.READ_ALL_AVAILABLE = READ_ALL_AVAILABLE
+
+    def open_serial(self, port, baudrate, rate, n_channels):
+        from loadcell import open_serial_port
+
+        return open_serial_port(port, baudrate)
+
+    def list_devices(self):
+        import nidaqmx.system
+        from nidaqmx.constants import UsageTypeAI
+
+        devices = []
+        for device in nidaqmx.system.System.local().devices:
+            entry = {"name": device.name, "product_type": None, "chassis": None, "slot": None,
+                     "kind": None, "channels": []}
+            # Each property is a driver call; a chassis or an offline module
+            # refuses some of them
+            try:
+                entry["product_type"] = device.product_type
+                entry["channels"] = list(device.ai_physical_chans.channel_names)
+            except self.DaqError:
+                pass
+            try:
+                entry["chassis"] = device.compact_daq_chassis_device.name
+                entry["slot"] = device.compact_daq_slot_num
+            except self.DaqError:
+                pass
+            if entry["channels"]:
+                try:
+                    types = device.ai_meas_types
+                except self.DaqError:
+                    types = []
+                if UsageTypeAI.TEMPERATURE_THERMOCOUPLE in types:
+                    entry["kind"] = "thermocouple"
+                elif UsageTypeAI.VOLTAGE in types:
+                    entry["kind"] = "voltage"
+            devices.append(entry)
+        return devices
+
+
+class SimulatedBackend:
+    name = "Simulated"
+    simulated = True
+
+    def __init__(self):
+        import simdaq
+
+        self.Task = simdaq.Task
+        self.DaqError = simdaq.DaqError
+        self.AcquisitionType = simdaq.AcquisitionType
+        self.TemperatureUnits = simdaq.TemperatureUnits
+        self.ThermocoupleType = simdaq.ThermocoupleType
+        self.READ_ALL_AVAILABLE = simdaq.READ_ALL_AVAILABLE
+        self._simdaq = simdaq
+
+    def open_serial(self, port, baudrate, rate, n_channels):
+        return self._simdaq.SerialLoadCell(port, baudrate, rate=rate, n_channels=n_channels)
+
+    def list_devices(self):
+        return self._simdaq.list_devices()
+
+
+def canonical_backend(name):
+    # "sim", "nidaqmx", ... -> the matching BACKENDS entry
+    key = (name or "").strip().lower()
+    if key in ("sim", "simulated"):
+        return SimulatedBackend.name
+    if key in ("", "ni-daqmx", "nidaqmx", "ni"):
+        return NiDaqmxBackend.name
+    raise ValueError(f"Unknown DAQ backend: {name}")
+
+
+def load_backend(name):
+    if canonical_backend(name) == SimulatedBackend.name:
+        return SimulatedBackend()
+    return NiDaqmxBackend()
+
+
+def error_code(exc):
+    return getattr(exc, "error_code", None)
@@ -0,0 +1,582 @@
+import argparse
+import atexit
+import collections
+import csv
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from calibration import CalibrationEngine
+from timebase import StreamAligner
+
+
+LOG_MODES = ("Latest", "Full rate", "Aligned", "Binary")
+BINARY_HEADER = "header.json"
+
+
+def column_names(groups):
+    # groups: sequence of (group, channel_names); matches the historic
+    # tc0_raw..tc2_raw, tc0_cal..tc2_cal, ai0_raw.. layout.
+    columns = []
+    for _, names in groups:
+        columns.extend(f"{name.lower()}_raw" for name in names)
+        columns.extend(f"{name.lower()}_cal" for name in names)
+    return columns
+
+
+class _WallClock:
+    # Formats t0 + t_s with millisecond resolution, caching the strftime part.
+    def __init__(self, t0):
+        self.t0 = t0
+        self._sec = None
+        self._prefix = ""
+
+    def format(self, t_s):
+        wall = self.t0 + t_s
+        sec = int(wall)
+        if sec != self._sec:
+            self._prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+            self._sec = sec
+        return f"{self._prefix}.{int((wall - sec) * 1000.0):03d}"
+
+
+class CsvLogger:
+    calibrated = True
+
+    def __init__(self, path, groups, mode="Latest", t0=None):
+        # mode: "Latest" (one row per UI update), "Full rate" (every sample,
+        # groups interleaved) or "Aligned" (every AI sample, slower groups
+        # interpolated onto the AI timeline by the session's StreamAligner)
+        self.path = path
+        self.groups = list(groups)
+        self.mode = mode
+        self.full_rate = mode in ("Full rate", "Aligned")
+        self.aligned = mode == "Aligned"
+        self.t0 = time.time() if t0 is None else t0
+        self.rows_written = 0
+        self._clock = _WallClock(self.t0)
+
+        # Column span of each group inside a row, after the time columns
+        self._spans = {}
+        col = 2
+        for group, names in self.groups:
+            self._spans[group] = (col, len(names))
+            col += 2 * len(names)
+        self._width = col
+
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        header = ["timestamp", "t_s"]
+        header.extend(column_names(self.groups))
+        self.writer.writerow(header)
+        self.file.flush()
+
+        # The CSV stays plain for Excel; run metadata and the final
+        # acquisition counters go to a JSON sidecar next to it.
+        self.meta_path = os.path.splitext(path)[0] + ".json"
+        self.meta = {
+            "version": 1,
+            "t0": self.t0,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.t0)),
+            "mode": mode,
+            "groups": {group: list(names) for group, names in self.groups},
+        }
+        self._write_meta()
+
+    def update_meta(self, key, value):
+        self.meta[key] = value
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(self.meta_path, "w", encoding="utf-8") as handle:
+            json.dump(self.meta, handle, indent=2)
+
+    def write_latest(self, t_s, raw_values, cal_values):
+        # One row of the newest value per channel, groups in config order,
+        # stamped with the time of the newest sample.
+        row = [self._clock.format(t_s), f"{t_s:.6f}"]
+        for raw, cal in zip(raw_values, cal_values):
+            row.extend(raw)
+            row.extend(cal)
+        self.writer.writerow(row)
+        self.rows_written += 1
+
+    def write_block(self, block, cal):
+        # Every sample of the block, timestamped from the sample clock.
+        col, n_ch = self._spans[block.group]
+        n = block.n_samples
+        t_s = block.times()
+        raw_rows = block.data.T.tolist()
+        cal_rows = np.asarray(cal).T.tolist()
+
+        rows = []
+        for i in range(n):
+            row = [""] * self._width
+            row[0] = self._clock.format(t_s[i])
+            row[1] = f"{t_s[i]:.6f}"
+            row[col:col + n_ch] = raw_rows[i]
+            row[col + n_ch:col + 2 * n_ch] = cal_rows[i]
+            rows.append(row)
+        self.writer.writerows(rows)
+        self.rows_written += n
+
+    def write_aligned(self, t_s, raw, cal):
+        # raw/cal: group -> (channels x n) on the common t_s axis
+        n = len(t_s)
+        table = np.full((n, self._width - 2), np.nan)
+        for group, (col, n_ch) in self._spans.items():
+            if group in raw:
+                table[:, col - 2:col - 2 + n_ch] = raw[group].T
+                table[:, col - 2 + n_ch:col - 2 + 2 * n_ch] = cal[group].T
+        values = table.tolist()
+        rows = []
+        for i in range(n):
+            rows.append([self._clock.format(t_s[i]), f"{t_s[i]:.6f}"] + values[i])
+        self.writer.writerows(rows)
+        self.rows_written += n
+
+    def size(self):
+        return self.file.tell()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except Exception:
+            pass
+        try:
+            self.file.close()
+        except Exception:
+            pass
+
+
+class BinaryLogger:
+    # Run directory with one preallocated, memory-mapped .npy chunk file per
+    # channel group at a time plus a small JSON header. Chunks are stored
+    # channel-major (channels x samples) so each channel is contiguous.
+    # Only raw values are stored; the header carries the calibration snapshot.
+    # Groups listed in `timed` (software-timed sources such as the serial
+    # load cell) store their timestamps as an extra first row.
+    calibrated = False
+    full_rate = True
+
+    def __init__(self, path, groups, rates, calibration=None, t0=None, offsets=None, dtype="float64",
+                 chunk_seconds=60.0, timed=()):
+        self.path = path
+        self.groups = list(groups)
+        self.t0 = time.time() if t0 is None else t0
+        self.dtype = np.dtype(dtype)
+        self.rows_written = 0
+        os.makedirs(path, exist_ok=True)
+
+        self.header = {
+            "version": 1,
+            "t0": self.t0,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.t0)),
+            "dtype": self.dtype.name,
+            "calibration": calibration or {},
+            "groups": {},
+        }
+        self._state = {}
+        for group, names in self.groups:
+            rate = float(rates[group])
+            self.header["groups"][group] = {
+                "channels": list(names),
+                "rate": rate,
+                "t_offset": float((offsets or {}).get(group, 0.0)),
+                "chunk_samples": max(1, int(rate * chunk_seconds)),
+                "timestamps": group in timed,
+                "chunks": [],
+            }
+            # next_index starts at the first block's index, so a log opened
+            # mid-run (or a rotation part) does not begin with a NaN gap
+            self._state[group] = {"mm": None, "fill": 0, "next_index": None}
+        self._write_header()
+
+    def _open_chunk(self, group):
+        info = self.header["groups"][group]
+        state = self._state[group]
+        filename = f"{group}_{len(info['chunks']):04d}.npy"
+        state["mm"] = np.lib.format.open_memmap(
+            os.path.join(self.path, filename),
+            mode="w+",
+            dtype=self.dtype,
+            shape=(self._rows(info), info["chunk_samples"]),
+        )
+        state["fill"] = 0
+        info["chunks"].append({"file": filename, "start_index": state["next_index"], "samples": 0})
+
+    def _rows(self, info):
+        return len(info["channels"]) + (1 if info["timestamps"] else 0)
+
+    def _append(self, group, data):
+        info = self.header["groups"][group]
+        state = self._state[group]
+        pos = 0
+        n = data.shape[1]
+        while pos < n:
+            if state["mm"] is None or state["fill"] >= info["chunk_samples"]:
+                self._finish_chunk(group)
+                self._open_chunk(group)
+            take = min(n - pos, info["chunk_samples"] - state["fill"])
+            state["mm"][:, state["fill"]:state["fill"] + take] = data[:, pos:pos + take]
+            state["fill"] += take
+            state["next_index"] += take
+            info["chunks"][-1]["samples"] = state["fill"]
+            pos += take
+
+    def _finish_chunk(self, group):
+        state = self._state[group]
+        if state["mm"] is not None:
+            state["mm"].flush()
+            state["mm"] = None
+            self._write_header()
+
+    def write_block(self, block, cal=None):
+        state = self._state[block.group]
+        if state["next_index"] is None:
+            state["next_index"] = block.start_index
+        info = self.header["groups"][block.group]
+        gap = block.start_index - state["next_index"]
+        if gap > 0:
+            # Dropped blocks: keep the sample index contiguous with NaNs
+            self._append(block.group, np.full((self._rows(info), gap), np.nan))
+        elif gap < 0:
+            return
+        if info["timestamps"]:
+            self._append(block.group, np.vstack([block.times(), block.data]))
+        else:
+            self._append(block.group, block.data)
+        self.rows_written += block.n_samples
+
+    def update_meta(self, key, value):
+        self.header[key] = value
+        self._write_header()
+
+    def _write_header(self):
+        tmp = os.path.join(self.path, BINARY_HEADER + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(self.header, handle, indent=2)
+        os.replace(tmp, os.path.join(self.path, BINARY_HEADER))
+
+    def size(self):
+        total = 0
+        for info in self.header["groups"].values():
+            samples = sum(chunk["samples"] for chunk in info["chunks"])
+            total += samples * self._rows(info) * self.dtype.itemsize
+        return total
+
+    def flush(self):
+        for state in self._state.values():
+            if state["mm"] is not None:
+                state["mm"].flush()
+        self._write_header()
+
+    def close(self):
+        try:
+            for group in self._state:
+                self._finish_chunk(group)
+            self._write_header()
+        except Exception:
+            pass
+
+
+class FlushPolicy:
+    # Flush after `rows` rows or `seconds` seconds, whichever comes first
+    # (0 disables that trigger); the writer always flushes on close. Rotate to
+    # a new file after `rotate_bytes` bytes or `rotate_seconds` seconds.
+    def __init__(self, rows=0, seconds=1.0, rotate_bytes=0, rotate_seconds=0.0):
+        self.rows = int(rows)
+        self.seconds = float(seconds)
+        self.rotate_bytes = int(rotate_bytes)
+        self.rotate_seconds = float(rotate_seconds)
+
+
+# What AsyncLogWriter does with a write when max_items are already queued:
+# "spill" queues it anyway (nothing is lost; memory grows until the disk
+# catches up), "block" waits up to put_timeout for room, "drop" discards it
+# at once. Writes given up by "block" or "drop" are counted in dropped_items.
+WHEN_FULL = ("spill", "block", "drop")
+
+
+class AsyncLogWriter(threading.Thread):
+    # Moves file I/O off the acquisition/UI thread. Calls are queued and
+    # applied to the underlying CsvLogger/BinaryLogger in batches by this
+    # thread. open_sink(part) creates the logger for each rotation part
+    # (part 0 is the first file). By default a disk stall never blocks the
+    # caller and never loses rows: the queue spills past max_items and the
+    # status shows the backlog. Metadata, flush and close are never dropped.
+    def __init__(self, open_sink, policy=None, max_items=512, when_full="spill", put_timeout=2.0):
+        super().__init__(name="log-writer", daemon=True)
+        if when_full not in WHEN_FULL:
+            raise ValueError(f"Unknown log queue policy: {when_full}")
+        self.open_sink = open_sink
+        self.policy = policy or FlushPolicy()
+        self.max_items = max(1, int(max_items))
+        self.when_full = when_full
+        self.put_timeout = put_timeout
+        self.part = 0
+        self.sink = open_sink(0)
+        self.paths = [self.sink.path]
+        self.calibrated = self.sink.calibrated
+        self.full_rate = self.sink.full_rate
+        self.aligned = getattr(self.sink, "aligned", False)
+        self.dropped_items = 0
+        self.spilled_items = 0
+        self.max_backlog = 0
+        self.error = None
+        self._rows_closed = 0
+        self._meta = {}
+        self._items = collections.deque()
+        self._ready = threading.Condition()
+        self._closed = False
+        self.start()
+        atexit.register(self.close)
+
+    @property
+    def path(self):
+        return self.paths[0]
+
+    @property
+    def rows_written(self):
+        return self._rows_closed + self.sink.rows_written
+
+    @property
+    def backlog(self):
+        # Calls queued and not yet written
+        return len(self._items)
+
+    def _put(self, item, droppable=True):
+        with self._ready:
+            if self._closed:
+                return
+            if droppable and len(self._items) >= self.max_items:
+                if self.when_full == "drop" or (self.when_full == "block" and not self._ready.wait_for(
+                        lambda: len(self._items) < self.max_items, self.put_timeout)):
+                    self.dropped_items += 1
+                    return
+                if self.when_full == "spill":
+                    self.spilled_items += 1
+            self._items.append(item)
+            self.max_backlog = max(self.max_backlog, len(self._items))
+            self._ready.notify_all()
+
+    def write_block(self, block, cal=None):
+        self._put(("write_block", (block, cal)))
+
+    def write_latest(self, t_s, raw_values, cal_values):
+        self._put(("write_latest", (t_s, raw_values, cal_values)))
+
+    def write_aligned(self, t_s, raw, cal):
+        self._put(("write_aligned", (t_s, raw, cal)))
+
+    def update_meta(self, key, value):
+        self._put(("update_meta", (key, value)), droppable=False)
+
+    def flush(self):
+        # Returns at once; the writer flushes after the calls queued before it
+        self._put(("flush", ()), droppable=False)
+
+    def close(self):
+        with self._ready:
+            if self._closed:
+                return
+            self._items.append(None)
+            self._closed = True
+            self._ready.notify_all()
+        self.join()
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
+
+    def _rotate(self):
+        self._rows_closed += self.sink.rows_written
+        self.sink.close()
+        self.part += 1
+        self.sink = self.open_sink(self.part)
+        self.paths.append(self.sink.path)
+        for key, value in self._meta.items():
+            self.sink.update_meta(key, value)
+
+    def run(self):
+        policy = self.policy
+        last_flush = time.monotonic()
+        part_started = last_flush
+        rows_at_flush = 0
+        done = False
+        while not done:
+            timeout = policy.seconds if policy.seconds > 0 else None
+            # Take everything queued so one flush covers many calls
+            with self._ready:
+                if not self._items:
+                    self._ready.wait(timeout)
+                batch = list(self._items)
+                self._items.clear()
+                self._ready.notify_all()
+
+            for item in batch:
+                if item is None:
+                    done = True
+                    continue
+                name, args = item
+                if name == "update_meta":
+                    self._meta[args[0]] = args[1]
+                try:
+                    getattr(self.sink, name)(*args)
+                except Exception as exc:
+                    self.error = exc
+
+            now = time.monotonic()
+            rows = self.sink.rows_written
+            if done:
+                break
+            try:
+                if (policy.rotate_bytes and self.sink.size() >= policy.rotate_bytes) or (
+                    policy.rotate_seconds and now - part_started >= policy.rotate_seconds
+                ):
+                    self._rotate()
+                    part_started = now
+                    last_flush = now
+                    rows_at_flush = 0
+                    continue
+                if (policy.rows and rows - rows_at_flush >= policy.rows) or (
+                    policy.seconds and now - last_flush >= policy.seconds
+                ):
+                    self.sink.flush()
+                    last_flush = now
+                    rows_at_flush = rows
+            except Exception as exc:
+                self.error = exc
+
+        self.sink.close()
+
+
+def part_path(path, part):
+    # log_X.csv -> log_X_part001.csv, log_X -> log_X_part001
+    if part == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_part{part:03d}{ext}"
+
+
+def first_index(info):
+    chunks = info.get("chunks") or []
+    return chunks[0]["start_index"] if chunks else 0
+
+
+def read_binary_log(path):
+    # -> (header, data, times): raw (channels x n) array and sample times
+    # (s on the run timebase) per group
+    with open(os.path.join(path, BINARY_HEADER), "r", encoding="utf-8") as handle:
+        header = json.load(handle)
+    groups = {}
+    times = {}
+    for group, info in header["groups"].items():
+        timed = info.get("timestamps", False)
+        parts = []
+        for chunk in info["chunks"]:
+            mm = np.load(os.path.join(path, chunk["file"]), mmap_mode="r")
+            parts.append(mm[:, :chunk["samples"]])
+        if parts:
+            data = np.concatenate(parts, axis=1)
+        else:
+            data = np.empty((len(info["channels"]) + (1 if timed else 0), 0))
+        if timed:
+            times[group] = np.asarray(data[0])
+            data = data[1:]
+        else:
+            times[group] = info.get("t_offset", 0.0) + (first_index(info) + np.arange(data.shape[1])) / info["rate"]
+        groups[group] = data
+    return header, groups, times
+
+
+def binary_to_csv(path, csv_path=None, aligned=False):
+    # Rewrites a binary run in the full-rate CSV layout, rows in time order.
+    # With aligned=True, slower groups are interpolated onto the fastest one.
+    header, data, group_times = read_binary_log(path)
+    if csv_path is None:
+        csv_path = path.rstrip("/\\") + ".csv"
+    groups = [(g, info["channels"]) for g, info in header["groups"].items()]
+    engine = CalibrationEngine(header.get("calibration", {}), groups)
+
+    if aligned:
+        infos = header["groups"]
+        reference = max(infos, key=lambda g: infos[g]["rate"])
+        aligner = StreamAligner(reference, [g for g, _ in groups], max_pending=float("inf"))
+        for group, _ in groups:
+            info = infos[group]
+            raw = data[group]
+            t = group_times[group]
+            if info.get("timestamps"):
+                # NaN gap fill has no timestamps to interpolate from
+                keep = np.isfinite(t)
+                t, raw = t[keep], raw[:, keep]
+            aligner.push(group, t, raw, engine.apply(group, raw))
+        logger = CsvLogger(csv_path, groups, mode="Aligned", t0=header["t0"])
+        try:
+            result = aligner.pop(flush=True)
+            if result is not None:
+                logger.write_aligned(*result)
+        finally:
+            logger.close()
+        return csv_path
+
+    times = []
+    owners = []
+    cal = {}
+    for gid, (group, names) in enumerate(groups):
+        raw = data[group]
+        n = raw.shape[1]
+        cal[group] = engine.apply(group, raw)
+        times.append(group_times[group])
+        owners.append(np.full(n, gid, dtype=np.int32))
+
+    t_all = np.concatenate(times) if times else np.empty(0)
+    owner_all = np.concatenate(owners) if owners else np.empty(0, dtype=np.int32)
+    index_all = np.concatenate([np.arange(len(t)) for t in times]) if times else np.empty(0, dtype=np.int64)
+    order = np.argsort(t_all, kind="stable")
+    # Gap-filled samples of timestamped groups have no time; leave them out
+    order = order[np.isfinite(t_all[order])]
+
+    spans = []
+    col = 2
+    for _, names in groups:
+        spans.append((col, len(names)))
+        col += 2 * len(names)
+    width = col
+    clock = _WallClock(header["t0"])
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["timestamp", "t_s"] + column_names(groups))
+        for start in range(0, len(order), 10000):
+            rows = []
+            for k in order[start:start + 10000].tolist():
+                gid = owner_all[k]
+                group = groups[gid][0]
+                i = index_all[k]
+                c, n_ch = spans[gid]
+                row = [""] * width
+                row[0] = clock.format(t_all[k])
+                row[1] = f"{t_all[k]:.6f}"
+                row[c:c + n_ch] = data[group][:, i].tolist()
+                row[c + n_ch:c + 2 * n_ch] = cal[group][:, i].tolist()
+                rows.append(row)
+            writer.writerows(rows)
+    return csv_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a binary log folder to CSV.")
+    parser.add_argument("log_dir")
+    parser.add_argument("csv_path", nargs="?")
+    parser.add_argument("--aligned", action="store_true", help="interpolate slow channels onto the fastest timeline")
+    args = parser.parse_args()
+    print(binary_to_csv(args.log_dir, args.csv_path, aligned=args.aligned))
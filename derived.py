@@ -0,0 +1,393 @@
+import ast
+import math
+
+import numpy as np
+
+from acquisition import SampleBlock
+from spectral import BandPower, PeakFrequency
+
+
+# Element-wise functions available in derived expressions
+FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "sin": np.sin,
+    "cos": np.cos,
+    "min": np.minimum,
+    "max": np.maximum,
+    "clip": np.clip,
+    "where": np.where,
+}
+CONSTANTS = {"pi": math.pi, "g0": 9.80665}
+
+BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+    ast.Mod: np.mod,
+}
+COMPARE_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+}
+
+
+def first_order(x, a, y0):
+    # y[n] = a * y[n-1] + (1 - a) * x[n], vectorised. Written as a scaled
+    # cumulative sum, y[n] = a^(n+1) y0 + (1-a) a^n sum(x[k] a^-k), in runs
+    # short enough that a^-k stays well inside float range.
+    n = len(x)
+    if a <= 0.0:
+        return np.array(x, dtype=np.float64)
+    run = n if a >= 1.0 else max(1, int(30.0 / -math.log(a)))
+    y = np.empty(n)
+    for start in range(0, n, run):
+        seg = x[start:start + run]
+        powers = a ** np.arange(1, len(seg) + 1)
+        y[start:start + len(seg)] = powers * y0 + (1.0 - a) * powers * np.cumsum(seg / powers)
+        y0 = y[start + len(seg) - 1]
+    return y
+
+
+class Ema:
+    # Exponential moving average with time constant tau (s)
+    def __init__(self, tau):
+        self.tau = float(tau)
+        self.reset()
+
+    def reset(self):
+        self.y = np.nan
+
+    def __call__(self, x, t, rate):
+        if len(x) == 0:
+            return x
+        if not np.isfinite(self.y):
+            self.y = x[0]
+        out = first_order(x, math.exp(-1.0 / (rate * self.tau)) if self.tau > 0 else 0.0, self.y)
+        self.y = out[-1]
+        return out
+
+
+class LowPass:
+    # IIR low-pass: `order` cascaded first-order sections at cutoff fc (Hz)
+    def __init__(self, fc, order=1):
+        self.fc = float(fc)
+        self.order = max(1, int(order))
+        self.reset()
+
+    def reset(self):
+        self.y = [np.nan] * self.order
+
+    def __call__(self, x, t, rate):
+        if len(x) == 0:
+            return x
+        a = math.exp(-2.0 * math.pi * self.fc / rate)
+        for i in range(self.order):
+            if not np.isfinite(self.y[i]):
+                self.y[i] = x[0]
+            x = first_order(x, a, self.y[i])
+            self.y[i] = x[-1]
+        return x
+
+
+class MovingAverage:
+    # Boxcar average over the last `window` seconds; the previous window-1
+    # samples are carried so the average is seamless across blocks.
+    def __init__(self, window):
+        self.window = float(window)
+        self.reset()
+
+    def reset(self):
+        self.hist = np.empty(0)
+
+    def __call__(self, x, t, rate):
+        n = max(1, int(round(self.window * rate)))
+        z = np.concatenate([self.hist, x])
+        sums = np.concatenate([[0.0], np.cumsum(z)])
+        end = len(self.hist) + np.arange(1, len(x) + 1)
+        start = np.maximum(0, end - n)
+        self.hist = z[-(n - 1):] if n > 1 else np.empty(0)
+        return (sums[end] - sums[start]) / (end - start)
+
+
+class PeakHold:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.peak = np.nan
+
+    def __call__(self, x, t, rate):
+        out = np.fmax.accumulate(np.concatenate([[self.peak], x]))[1:]
+        if len(out):
+            self.peak = out[-1]
+        return out
+
+
+class RiseTime:
+    # Seconds from the first sample >= lo to the first later sample >= hi;
+    # NaN until both levels have been crossed, then held.
+    def __init__(self, lo, hi):
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.reset()
+
+    def reset(self):
+        self.t_lo = None
+        self.value = np.nan
+
+    def __call__(self, x, t, rate):
+        out = np.full(len(x), self.value)
+        if np.isfinite(self.value) or len(x) == 0:
+            return out
+        start = 0
+        if self.t_lo is None:
+            above = np.flatnonzero(x >= self.lo)
+            if len(above) == 0:
+                return out
+            start = above[0]
+            self.t_lo = t[start]
+        above = np.flatnonzero(x[start:] >= self.hi)
+        if len(above):
+            i = start + above[0]
+            self.value = t[i] - self.t_lo
+            out[i:] = self.value
+        return out
+
+
+class Integral:
+    # Running trapezoidal integral over time, e.g. total impulse from thrust
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total = 0.0
+        self.last = None
+
+    def __call__(self, x, t, rate):
+        if len(x) == 0:
+            return x
+        # The first sample of a run has no interval before it
+        last_x, last_t = self.last if self.last is not None else (x[0], t[0])
+        xs = np.concatenate([[last_x], x])
+        steps = 0.5 * (xs[1:] + xs[:-1]) * np.diff(np.concatenate([[last_t], t]))
+        out = self.total + np.cumsum(np.nan_to_num(steps))
+        self.total = out[-1]
+        self.last = (x[-1], t[-1])
+        return out
+
+
+# Stateful filters: first argument is a signal, the rest are constants
+FILTERS = {
+    "ema": Ema,
+    "lowpass": LowPass,
+    "sma": MovingAverage,
+    "peak": PeakHold,
+    "rise": RiseTime,
+    "integral": Integral,
+    "peakfreq": PeakFrequency,
+    "bandpower": BandPower,
+}
+
+
+class _Compiler:
+    # Turns one expression into a closure over (env, t, rate). Every filter
+    # call site gets its own state, so ema(AI0, 0.1) used twice filters twice.
+    def __init__(self, name, known):
+        self.name = name
+        self.known = known
+        self.inputs = []
+        self.filters = []
+
+    def compile(self, text):
+        try:
+            tree = ast.parse(str(text), mode="eval")
+        except SyntaxError as exc:
+            raise ValueError(f"{self.name}: {exc.msg} in {text!r}") from None
+        return self._node(tree.body)
+
+    def _error(self, what):
+        return ValueError(f"{self.name}: {what} is not allowed in derived expressions")
+
+    def _constant(self, node):
+        try:
+            value = CONSTANTS.get(node.id) if isinstance(node, ast.Name) else ast.literal_eval(node)
+        except ValueError:
+            value = None
+        if not isinstance(value, (int, float)):
+            raise ValueError(f"{self.name}: filter parameters must be numbers")
+        return value
+
+    def _node(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            value = float(node.value)
+            return lambda env, t, rate: value
+        if isinstance(node, ast.Name):
+            key = node.id
+            if key in CONSTANTS:
+                value = CONSTANTS[key]
+                return lambda env, t, rate: value
+            if key == "t":
+                return lambda env, t, rate: t
+            if key not in self.known:
+                raise ValueError(f"{self.name}: unknown channel {key!r}")
+            if key not in self.inputs:
+                self.inputs.append(key)
+            return lambda env, t, rate: env[key]
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+            op = BINARY_OPS[type(node.op)]
+            left, right = self._node(node.left), self._node(node.right)
+            return lambda env, t, rate: op(left(env, t, rate), right(env, t, rate))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self._node(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            return lambda env, t, rate: np.negative(operand(env, t, rate))
+        if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in COMPARE_OPS:
+            op = COMPARE_OPS[type(node.ops[0])]
+            left, right = self._node(node.left), self._node(node.comparators[0])
+            return lambda env, t, rate: op(left(env, t, rate), right(env, t, rate))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            func = node.func.id
+            if func in FILTERS:
+                if not node.args:
+                    raise ValueError(f"{self.name}: {func}() needs a signal")
+                signal = self._node(node.args[0])
+                try:
+                    state = FILTERS[func](*[self._constant(arg) for arg in node.args[1:]])
+                except TypeError:
+                    raise ValueError(f"{self.name}: wrong number of arguments to {func}()") from None
+                except ValueError as exc:
+                    raise ValueError(f"{self.name}: {exc}") from None
+                self.filters.append(state)
+                return lambda env, t, rate: state(np.broadcast_to(signal(env, t, rate), t.shape).astype(np.float64), t, rate)
+            if func in FUNCTIONS:
+                fn = FUNCTIONS[func]
+                args = [self._node(arg) for arg in node.args]
+                return lambda env, t, rate: fn(*[arg(env, t, rate) for arg in args])
+            raise ValueError(f"{self.name}: unknown function {func}()")
+        raise self._error(type(node).__name__)
+
+
+class DerivedEngine:
+    # Derived channels from `name: expression` definitions (the derived:
+    # section of calibration.yaml), evaluated on whole calibrated blocks.
+    # Each derived channel runs on the timeline of its fastest input group
+    # (first in `groups` order, i.e. AI before the slower TC and serial
+    # groups) and is emitted as a `<group>_derived` block with the same
+    # timestamps. Inputs from other groups are interpolated from their most
+    # recent block and held past its end, so the result stays causal.
+    def __init__(self, definitions, groups, priority=None):
+        self.source_groups = [group for group, _ in groups]
+        self.channel_group = {}
+        self.channel_row = {}
+        for group, names in groups:
+            for row, name in enumerate(names):
+                self.channel_group[name] = group
+                self.channel_row[name] = row
+        order = list(priority or []) + [g for g in self.source_groups if g not in (priority or [])]
+
+        compiled = {}
+        known = set(self.channel_group) | set(definitions)
+        for name, text in definitions.items():
+            if name in self.channel_group:
+                raise ValueError(f"Derived channel {name} shadows an acquired channel")
+            compiler = _Compiler(name, known - {name})
+            compiled[name] = (compiler.compile(text), compiler)
+
+        # Dependency order; derived inputs on another timeline are read from
+        # their last output instead of being recomputed.
+        self.order = []
+        visiting = set()
+
+        def visit(name):
+            if name in self.order:
+                return
+            if name in visiting:
+                raise ValueError(f"Derived channel {name} depends on itself")
+            visiting.add(name)
+            for dep in compiled[name][1].inputs:
+                if dep in compiled:
+                    visit(dep)
+            visiting.discard(name)
+            self.order.append(name)
+
+        for name in definitions:
+            visit(name)
+
+        self.home = {}
+        for name in self.order:
+            homes = set()
+            for dep in compiled[name][1].inputs:
+                homes.add(self.home[dep] if dep in compiled else self.channel_group[dep])
+            self.home[name] = next((g for g in order if g in homes), order[0] if order else None)
+
+        self._exprs = {name: compiled[name][0] for name in self.order}
+        self._inputs = {name: compiled[name][1].inputs for name in self.order}
+        self._filters = [f for name in self.order for f in compiled[name][1].filters]
+        self.groups = []
+        self.group_home = {}
+        for home in order:
+            names = [name for name in definitions if self.home.get(name) == home]
+            if names:
+                group = f"{home}_derived"
+                self.groups.append((group, names))
+                self.group_home[group] = home
+        self._derived_group = {name: f"{self.home[name]}_derived" for name in self.order}
+        self._row = {name: names.index(name) for _, names in self.groups for name in names}
+        self._history = {}
+
+    def reset(self):
+        for state in self._filters:
+            state.reset()
+        self._history = {}
+
+    def _value(self, name, block_group, data, t):
+        if name in self._exprs:
+            group, row = self._derived_group[name], self._row[name]
+        else:
+            group, row = self.channel_group[name], self.channel_row[name]
+        if group == block_group:
+            return data[row]
+        hist = self._history.get(group)
+        if hist is None or len(hist[0]) == 0:
+            return np.full(len(t), np.nan)
+        return np.interp(t, hist[0], hist[1][row])
+
+    def process(self, block, cal):
+        # -> derived SampleBlocks computed from one calibrated block
+        t = block.times()
+        self._history[block.group] = (t, cal)
+        out = []
+        for group, names in self.groups:
+            if self.group_home[group] != block.group:
+                continue
+            env = {}
+            values = np.empty((len(names), len(t)))
+            for name in self.order:
+                if self._derived_group[name] != group:
+                    continue
+                for dep in self._inputs[name]:
+                    if dep not in env:
+                        env[dep] = values[self._row[dep]] if self._derived_group.get(dep) == group else self._value(dep, block.group, cal, t)
+                with np.errstate(all="ignore"):
+                    values[self._row[name]] = self._exprs[name](env, t, block.rate)
+                env[name] = values[self._row[name]]
+            self._history[group] = (t, values)
+            out.append(SampleBlock(group, values, block.start_index, block.rate, block.t_offset, t=block.t))
+        return out
+
+
+def load_derived(data):
+    # `derived:` section of a parsed calibration.yaml -> {name: expression}
+    section = data.get("derived") if isinstance(data, dict) else None
+    if not isinstance(section, dict):
+        return {}
+    return {str(name): str(expr) for name, expr in section.items() if expr is not None}
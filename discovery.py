@@ -0,0 +1,142 @@
+import difflib
+import json
+import os
+import time
+
+from daqbackend import canonical_backend, load_backend
+
+
+# Chassis modules and their AI channels as last enumerated per backend,
+# kept in devices.json so module names can be checked (and filled in) the
+# moment the GUI opens. Enumerating a network cDAQ can take seconds, so the
+# GUI refreshes the cache on a background thread.
+DEVICE_CACHE = "devices.json"
+CACHE_VERSION = 1
+
+
+def enumerate_devices(backend_name):
+    # -> [{name, product_type, chassis, slot, kind, channels}]; slow, and
+    # raises if the backend's driver is missing
+    return load_backend(backend_name).list_devices()
+
+
+class DeviceCache:
+    def __init__(self, path):
+        self.path = path
+        self.backends = {}
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+            if data.get("version") == CACHE_VERSION:
+                self.backends = dict(data.get("backends") or {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _entry(self, backend_name):
+        return self.backends.get(canonical_backend(backend_name)) or {}
+
+    def devices(self, backend_name):
+        return list(self._entry(backend_name).get("devices") or [])
+
+    def updated(self, backend_name):
+        # Wall-clock time of the last enumeration, or None
+        return self._entry(backend_name).get("updated")
+
+    def update(self, backend_name, devices):
+        self.backends[canonical_backend(backend_name)] = {"updated": time.time(), "devices": list(devices)}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as handle:
+                json.dump({"version": CACHE_VERSION, "backends": self.backends}, handle, indent=2)
+            os.replace(tmp, self.path)
+        except OSError:
+            # Read-only folder: the listing still serves this session
+            pass
+
+    def refresh(self, backend_name):
+        devices = enumerate_devices(backend_name)
+        self.update(backend_name, devices)
+        return devices
+
+
+def modules_of_kind(devices, kind):
+    return [device["name"] for device in devices if device.get("kind") == kind]
+
+
+def _find(devices, name):
+    key = name.strip().lower()
+    return next((device for device in devices if device["name"].lower() == key), None)
+
+
+def _suggest(devices, name, kind):
+    candidates = modules_of_kind(devices, kind) or [d["name"] for d in devices if d.get("channels")]
+    close = difflib.get_close_matches(name, candidates, n=1, cutoff=0.6)
+    return (close or candidates or [None])[0]
+
+
+def check_module(devices, name, kind):
+    # -> (ok, text) for a module name field; ok is None when there is no
+    # listing to check against
+    if not devices:
+        return None, ""
+    if not name.strip():
+        return False, "no module name"
+    device = _find(devices, name)
+    if device is None:
+        suggestion = _suggest(devices, name, kind)
+        return False, f"not found, {suggestion}?" if suggestion else "not found"
+    if device.get("kind") and device["kind"] != kind:
+        return False, f"{device.get('product_type') or 'module'} is not a {kind} module"
+    where = f" slot {device['slot']}" if device.get("slot") else ""
+    return True, f"{device.get('product_type') or 'found'}{where}"
+
+
+def autofill_module(devices, name, kind):
+    # The module to put in a name field: `name` if it is listed, else the
+    # only module of that kind in the listing, else `name` unchanged
+    if not devices or _find(devices, name) is not None:
+        return name
+    modules = modules_of_kind(devices, kind)
+    return modules[0] if len(modules) == 1 else name
+
+
+def check_channel_map(channel_map, devices_by_kind, devices):
+    # Every physical channel the session would create, checked against the
+    # listing -> list of problems (empty when all are listed or there is no
+    # listing). Serial load cells are not DAQmx devices and are skipped.
+    if not devices:
+        return []
+    problems = []
+    for group, _ in channel_map.groups:
+        kind = channel_map.kind(group)
+        if kind == "serial":
+            continue
+        try:
+            channels = channel_map.physical_channels(group, devices_by_kind)
+        except ValueError as exc:
+            problems.append(str(exc))
+            continue
+        for physical, module in channels:
+            name, _, _ = physical.partition("/")
+            ok, text = check_module(devices, name, kind)
+            if ok is False:
+                problem = f"{module.key}: {name} {text}"
+            else:
+                device = _find(devices, name)
+                listed = device.get("channels") or []
+                if not listed or physical.lower() in (c.lower() for c in listed):
+                    continue
+                problem = f"{module.key}: {name} has no {physical.partition('/')[2]} ({len(listed)} channels)"
+            if problem not in problems:
+                problems.append(problem)
+    return problems
+
+
+def format_devices(devices):
+    lines = []
+    for device in devices:
+        where = f"  slot {device['slot']} of {device['chassis']}" if device.get("chassis") else ""
+        kind = f"  {device['kind']}" if device.get("kind") else ""
+        count = f"  {len(device['channels'])} AI" if device.get("channels") else ""
+        lines.append(f"{device['name']}  ({device.get('product_type') or '?'}){kind}{count}{where}")
+    return "\n".join(lines)
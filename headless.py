@@ -0,0 +1,289 @@
+import argparse
+import os
+import signal
+import sys
+import time
+
+from acqprocess import ProcessSession
+from calibration import load_calibration, read_simple_yaml
+from capture import TRIGGER_MODES
+from catalog import CATALOG_FILE, Catalog
+from channelmap import channel_map_from_config
+from derived import load_derived
+from datalog import FlushPolicy
+from daqbackend import BACKENDS
+from discovery import DEVICE_CACHE, DeviceCache, check_channel_map, format_devices
+from session import TC_TYPES, AcquisitionSession
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOG_CHOICES = {
+    "none": None,
+    "latest": "Latest",
+    "full": "Full rate",
+    "aligned": "Aligned",
+    "binary": "Binary",
+}
+
+CAPTURE_MODES = {
+    "rising": "Rising edge",
+    "falling": "Falling edge",
+    "above": "Above",
+    "below": "Below",
+}
+
+DEFAULTS = {
+    "backend": BACKENDS[0],
+    "tc_module": "cDAQ9185-20050D7Mod4",
+    "ai_module": "cDAQ9185-20050D7Mod3",
+    "tc_type": "K",
+    "tc_rate": 10.0,
+    "ai_rate": 1000.0,
+    "calibration": os.path.join(SCRIPT_DIR, "calibration.yaml"),
+    "log": "binary",
+    "log_dir": SCRIPT_DIR,
+    "duration": 0.0,
+    "poll_interval": 0.1,
+    "stats_interval": 5.0,
+    "flush_rows": 0,
+    "flush_seconds": 1.0,
+    "rotate_mb": 0.0,
+    "rotate_minutes": 0.0,
+    "capture_channel": None,
+    "capture_mode": "rising",
+    "capture_level": 0.0,
+    "capture_pre": 1.0,
+    "capture_post": 2.0,
+    "replay": None,
+    "speed": 1.0,
+    "telemetry_port": 0,
+    "telemetry_host": "0.0.0.0",
+    "process": False,
+    "operator": "",
+    "notes": "",
+    "catalog": CATALOG_FILE,
+    "archive": False,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless cDAQ acquisition (no Tkinter).")
+    parser.add_argument("--config", help="YAML file with any of the options below (keys use underscores)")
+    parser.add_argument("--backend", help="NI-DAQmx or Simulated")
+    parser.add_argument("--tc-module", dest="tc_module", help="NI-9212 module name (in MAX)")
+    parser.add_argument("--ai-module", dest="ai_module", help="NI-9201 module name (in MAX)")
+    parser.add_argument("--tc-type", dest="tc_type", choices=TC_TYPES)
+    parser.add_argument("--tc-rate", dest="tc_rate", type=float, help="thermocouple sample rate (Hz)")
+    parser.add_argument("--ai-rate", dest="ai_rate", type=float, help="analog input sample rate (Hz)")
+    parser.add_argument("--calibration", help="calibration.yaml to apply")
+    parser.add_argument("--log", choices=sorted(LOG_CHOICES), help="log mode")
+    parser.add_argument("--log-dir", dest="log_dir", help="directory for log files")
+    parser.add_argument("--duration", type=float, help="seconds to run; 0 runs until Ctrl+C")
+    parser.add_argument("--poll-interval", dest="poll_interval", type=float, help="seconds between queue drains")
+    parser.add_argument("--stats-interval", dest="stats_interval", type=float, help="seconds between stats lines")
+    parser.add_argument("--flush-rows", dest="flush_rows", type=int, help="flush the log every N rows (0: off)")
+    parser.add_argument("--flush-seconds", dest="flush_seconds", type=float, help="flush the log every T seconds (0: off)")
+    parser.add_argument("--rotate-mb", dest="rotate_mb", type=float, help="start a new log part after this many MB (0: off)")
+    parser.add_argument("--rotate-minutes", dest="rotate_minutes", type=float, help="start a new log part after this many minutes (0: off)")
+    parser.add_argument("--capture-channel", dest="capture_channel", help="arm a triggered capture on this calibrated channel")
+    parser.add_argument("--capture-mode", dest="capture_mode", choices=sorted(CAPTURE_MODES), help="capture trigger condition")
+    parser.add_argument("--capture-level", dest="capture_level", type=float, help="capture trigger level (calibrated units)")
+    parser.add_argument("--capture-pre", dest="capture_pre", type=float, help="seconds kept before the trigger")
+    parser.add_argument("--capture-post", dest="capture_post", type=float, help="seconds kept after the trigger")
+    parser.add_argument("--replay", help="replay a CSV log or binary log folder instead of acquiring")
+    parser.add_argument("--speed", type=float, help="replay speed (1 = real time, 0 = as fast as possible)")
+    parser.add_argument("--telemetry-port", dest="telemetry_port", type=int, help="stream live data to TCP clients on this port (0: off)")
+    parser.add_argument("--telemetry-host", dest="telemetry_host", help="interface for the telemetry server (default: all)")
+    parser.add_argument("--process", action="store_true", default=None, help="acquire and log in a separate process (shared-memory ring)")
+    parser.add_argument("--operator", help="operator name for the run catalog")
+    parser.add_argument("--notes", help="notes for the run catalog")
+    parser.add_argument("--catalog", help=f"run catalog file in the log directory (default {CATALOG_FILE}; none: off)")
+    parser.add_argument("--archive", action="store_true", default=None, help="compress the log into a run archive when the run ends")
+    parser.add_argument("--list-devices", dest="list_devices", action="store_true", help="list the chassis modules and exit")
+    return parser
+
+
+def resolve_options(args):
+    # Defaults < config file < command line
+    options = dict(DEFAULTS)
+    if args.config:
+        data = read_simple_yaml(args.config)
+        for key, value in data.items():
+            key = key.replace("-", "_")
+            if key in options and value is not None:
+                options[key] = value
+    for key, value in vars(args).items():
+        if key not in ("config", "list_devices") and value is not None:
+            options[key] = value
+    for key in ("tc_rate", "ai_rate", "duration", "poll_interval", "stats_interval",
+                "flush_seconds", "rotate_mb", "rotate_minutes", "capture_level", "capture_pre", "capture_post", "speed"):
+        options[key] = float(options[key])
+    options["flush_rows"] = int(options["flush_rows"])
+    options["telemetry_port"] = int(options["telemetry_port"])
+    options["log"] = str(options["log"]).lower()
+    options["process"] = str(options["process"]).lower() in ("1", "true", "yes", "on")
+    options["archive"] = str(options["archive"]).lower() in ("1", "true", "yes", "on")
+    if str(options["catalog"]).lower() in ("", "none", "off"):
+        options["catalog"] = None
+    options["capture_mode"] = str(options["capture_mode"]).lower()
+    if CAPTURE_MODES.get(options["capture_mode"]) not in TRIGGER_MODES:
+        raise ValueError(f"Unknown capture mode: {options['capture_mode']}")
+    if options["log"] not in LOG_CHOICES:
+        raise ValueError(f"Unknown log mode: {options['log']}")
+    return options
+
+
+def format_stats(stats, prev, dt):
+    parts = [f"t={stats['elapsed']:8.1f}s"]
+    for group, total in stats["samples"].items():
+        rate = (total - prev.get(group, 0)) / dt if dt > 0 else 0.0
+        parts.append(f"{group}: {total} samp ({rate:.0f}/s)")
+    dropped = sum(stats["gap_samples"].values())
+    parts.append(f"dropped: {dropped} samp / {stats['dropped_blocks']} blocks")
+    for group, reader in stats["readers"].items():
+        parts.append(
+            f"{group} backlog {reader['backlog']} (max {reader['max_backlog']}), "
+            f"read {reader['max_read_latency'] * 1000:.0f} ms, "
+            f"ovf {reader['overflows']}, timeouts {reader['timeouts']}"
+        )
+    ring = stats.get("ring")
+    if ring is not None:
+        parts.append(f"ring: {ring['blocks']} blocks, {ring['overruns']} overruns ({ring['lost_blocks']} lost), {ring['torn_blocks']} torn")
+    parts.append(f"rows: {stats['rows_written']}")
+    if stats.get("log_backlog", 0) > stats.get("log_max_items", 0):
+        parts.append(f"log behind: {stats['log_backlog']} writes queued")
+    if stats.get("log_dropped_items"):
+        parts.append(f"log overloaded: {stats['log_dropped_items']} writes dropped")
+    if stats.get("telemetry_clients"):
+        parts.append(f"clients: {stats['telemetry_clients']}")
+    return " | ".join(parts)
+
+
+def run(options):
+    # The channel layout (modules:) and derived channels (derived:) live
+    # next to the calibration
+    has_calibration = bool(options["calibration"]) and os.path.exists(options["calibration"])
+    config = read_simple_yaml(options["calibration"]) if has_calibration else {}
+    session_class = ProcessSession if options["process"] else AcquisitionSession
+    session = session_class(
+        options["backend"],
+        str(options["tc_module"]),
+        str(options["ai_module"]),
+        tc_type=str(options["tc_type"]),
+        channel_map=channel_map_from_config(config),
+        derived=load_derived(config),
+        replay=str(options["replay"]) if options["replay"] else None,
+        replay_speed=options["speed"],
+    )
+    session.flush_policy = FlushPolicy(
+        rows=options["flush_rows"],
+        seconds=options["flush_seconds"],
+        rotate_bytes=int(options["rotate_mb"] * 1024 * 1024),
+        rotate_seconds=options["rotate_minutes"] * 60.0,
+    )
+    if has_calibration:
+        session.set_calibration(load_calibration(options["calibration"], session.channel_names(), session.calibration))
+    session.catalog_file = options["catalog"]
+    session.run_info = {"operator": str(options["operator"]), "notes": str(options["notes"])}
+
+    stop_requested = []
+
+    def on_sigint(signum, frame):
+        stop_requested.append(signum)
+
+    signal.signal(signal.SIGINT, on_sigint)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, on_sigint)
+
+    if session.replay is None:
+        # Warn early about module names the last enumeration did not list
+        devices = DeviceCache(os.path.join(SCRIPT_DIR, DEVICE_CACHE)).devices(options["backend"])
+        for problem in check_channel_map(session.channel_map, {"thermocouple": session.tc_module, "voltage": session.ai_module}, devices):
+            print(f"Warning: {problem}", file=sys.stderr)
+
+    capture_reported = False
+    session.connect()
+    try:
+        if options["process"]:
+            print(f"Acquisition process ring: {session.ring_name}")
+        if options["telemetry_port"]:
+            port = session.start_telemetry(options["telemetry_port"], str(options["telemetry_host"]))
+            print(f"Telemetry on {options['telemetry_host']}:{port}")
+        session.start(options["tc_rate"], options["ai_rate"])
+        if session.replay is not None:
+            speed = f"{options['speed']:g}x" if options["speed"] > 0 else "max speed"
+            print(f"Replaying {options['replay']} at {speed}")
+        mode = LOG_CHOICES[options["log"]]
+        if mode:
+            print(f"Logging to {session.open_log(mode, options['log_dir'])}")
+        if options["capture_channel"]:
+            session.arm_capture(
+                str(options["capture_channel"]),
+                CAPTURE_MODES[options["capture_mode"]],
+                options["capture_level"],
+                options["capture_pre"],
+                options["capture_post"],
+                options["log_dir"],
+            )
+            print(f"Capture armed on {options['capture_channel']}")
+
+        started = time.monotonic()
+        last_stats = started
+        prev_samples = {}
+        while not stop_requested:
+            time.sleep(options["poll_interval"])
+            session.poll()
+            capture = session.capture
+            if capture is not None and capture.state in ("saved", "failed") and not capture_reported:
+                capture_reported = True
+                print(f"Capture saved to {capture.path}" if capture.path else f"Capture failed: {capture.error}", flush=True)
+            now = time.monotonic()
+            if options["stats_interval"] > 0 and now - last_stats >= options["stats_interval"]:
+                stats = session.stats()
+                print(format_stats(stats, prev_samples, now - last_stats), flush=True)
+                prev_samples = stats["samples"]
+                last_stats = now
+            if options["duration"] > 0 and now - started >= options["duration"]:
+                break
+            if session.replay_finished():
+                break
+    finally:
+        session.stop()
+        if session.capture is not None and not capture_reported:
+            session.capture.wait(10.0)
+            if session.capture.path:
+                print(f"Capture saved to {session.capture.path}")
+        stats = session.stats()
+        session.disconnect()
+    print("Final: " + format_stats(stats, {}, stats["elapsed"]))
+    if session.catalog_error is not None:
+        print(f"Run not cataloged: {session.catalog_error}", file=sys.stderr)
+    elif session.last_run_id is not None:
+        catalog_path = os.path.join(options["log_dir"], options["catalog"])
+        print(f"Cataloged as run {session.last_run_id} in {catalog_path}")
+        if options["archive"]:
+            with Catalog(catalog_path) as catalog:
+                path, before, after = catalog.archive(session.last_run_id)
+            ratio = f" ({before / after:.1f}x smaller)" if before and after else ""
+            print(f"Archived to {path}{ratio}")
+    return stats
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        options = resolve_options(args)
+        if args.list_devices:
+            devices = DeviceCache(os.path.join(SCRIPT_DIR, DEVICE_CACHE)).refresh(options["backend"])
+            print(format_devices(devices) or "No devices found")
+            return 0
+        run(options)
+    except Exception as exc:
+        print(f"Acquisition failed: {type(exc).__name__}: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
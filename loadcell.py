@@ -0,0 +1,134 @@
+import re
+import threading
+import time
+
+import numpy as np
+
+from acquisition import ReaderStats, SampleBlock
+
+
+# First numbers on a line, e.g. "ST,GS,+0012.35kg" or "  -3.1e2 N\r"
+NUMBER = re.compile(rb"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def open_serial_port(port, baudrate=9600, timeout=0.1):
+    # pyserial is only needed when a load cell is configured. serial_for_url
+    # also accepts test URLs such as "loop://".
+    import serial
+
+    return serial.serial_for_url(port, baudrate=int(baudrate), timeout=timeout)
+
+
+class LineParser:
+    # Splits the byte stream into lines with bytes.split and converts a whole
+    # batch of lines to a (channels x readings) array at once. Partial lines
+    # are carried over to the next chunk; lines without enough numbers
+    # (start-up banners, garbled frames) are counted and skipped. With
+    # skip_first, the first line is dropped: after opening a port that is
+    # already streaming it is usually the end of a frame.
+    def __init__(self, n_channels, terminator=b"\n", max_line=256, skip_first=False):
+        self.n_channels = n_channels
+        self.terminator = terminator
+        self.max_line = max_line
+        self.bad_frames = 0
+        self._tail = b""
+        self._skip = skip_first
+
+    def feed(self, chunk):
+        lines = (self._tail + chunk).split(self.terminator)
+        # A terminator-less stream would otherwise grow the tail forever
+        self._tail = lines.pop()[-self.max_line:]
+        if self._skip and lines:
+            self._skip = False
+            lines = lines[1:]
+        rows = []
+        n = self.n_channels
+        for line in lines:
+            numbers = NUMBER.findall(line)
+            if len(numbers) >= n:
+                rows.append(numbers[:n])
+            elif line.strip():
+                self.bad_frames += 1
+        if not rows:
+            return np.empty((n, 0))
+        return np.array(rows, dtype=np.float64).T
+
+
+class SerialStats(ReaderStats):
+    def __init__(self):
+        super().__init__()
+        self.bad_frames = 0
+
+
+class SerialReader(threading.Thread):
+    # Reads a streaming load-cell indicator on its own thread. Each read
+    # takes whatever the driver has buffered (at least one byte, waiting at
+    # most the port timeout), so the loop runs once per burst rather than
+    # once per byte. Readings carry timestamps from the run timebase clock:
+    # the last complete line of a burst is stamped with the time the burst
+    # was read and earlier ones are spaced back at the nominal rate.
+    def __init__(self, group, port, n_channels, rate, out_queue, clock, terminator=b"\n"):
+        super().__init__(name=f"{group}-reader", daemon=True)
+        self.group = group
+        self.port = port
+        self.n_channels = n_channels
+        self.rate = float(rate)
+        self.out_queue = out_queue
+        self.clock = clock
+        self.parser = LineParser(n_channels, terminator, skip_first=True)
+        self.samples_read = 0
+        self.stats = SerialStats()
+        self.error = None
+        self._last_t = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _timestamps(self, n, t_now):
+        t = t_now - (n - 1 - np.arange(n)) / self.rate
+        if self._last_t is not None and t[0] <= self._last_t:
+            # Faster than nominal: spread the burst since the previous one
+            t = np.linspace(self._last_t, t_now, n + 1)[1:]
+        self._last_t = t_now
+        return t
+
+    def run(self):
+        stats = self.stats
+        last_return = time.perf_counter()
+        try:
+            self.port.reset_input_buffer()
+        except Exception:
+            pass
+        while not self._stop_event.is_set():
+            t_call = time.perf_counter()
+            stats.max_unread_interval = max(stats.max_unread_interval, t_call - last_return)
+            try:
+                chunk = self.port.read(max(1, self.port.in_waiting))
+            except Exception as exc:
+                if self._stop_event.is_set():
+                    break
+                self.error = exc
+                break
+            t_now = self.clock()
+            last_return = time.perf_counter()
+            if not chunk:
+                stats.timeouts += 1
+                continue
+            stats.max_read_latency = max(stats.max_read_latency, last_return - t_call)
+
+            block = self.parser.feed(chunk)
+            stats.bad_frames = self.parser.bad_frames
+            n = block.shape[1]
+            if n == 0:
+                continue
+            t = self._timestamps(n, t_now)
+            self.out_queue.put(SampleBlock(self.group, block, self.samples_read, self.rate, t=t))
+            self.samples_read += n
+            stats.samples_read += n
+            stats.reads += 1
+            try:
+                stats.backlog = int(self.port.in_waiting)
+            except Exception:
+                stats.backlog = 0
+            stats.max_backlog = max(stats.max_backlog, stats.backlog)
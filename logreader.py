@@ -0,0 +1,615 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+from acquisition import ReaderStats, SampleBlock
+from datalog import BINARY_HEADER, column_names
+
+
+INDEX_VERSION = 1
+# Rows per entry of the CSV time index; a seek reads at most two entries
+# more than the window it asked for
+INDEX_ROWS = 8192
+# Bytes parsed at a time when scanning or reading a CSV log
+CHUNK_BYTES = 8 * 1024 * 1024
+# CsvLogger writes "YYYY-mm-dd HH:MM:SS.mmm," in front of every row
+STAMP_WIDTH = 24
+# Logs from the first GUI version: "timestamp,tc0_raw,..." with whole-second
+# local-time stamps and no t_s column
+LEGACY_STAMP = "%Y-%m-%d %H:%M:%S"
+FIRST_FIELD = re.compile(rb"^[^,\n]*,", re.M)
+# Seconds of recording fetched per read while replaying
+REPLAY_WINDOW = 10.0
+ARCHIVE_EXT = ".zip"
+ARCHIVE_VERSION = 1
+
+
+def parse_csv_rows(text, n_values, stamp_width=STAMP_WIDTH):
+    # text: complete CSV rows (timestamp first, each ending in a newline)
+    # -> (values, starts): a (rows x n_values) array of the columns after
+    # the timestamp, empty cells as NaN, and each row's byte offset in text.
+    # stamp_width=None when the stamps are not CsvLogger's fixed width.
+    # The whole chunk is converted at once: the timestamp column is masked
+    # out with NumPy, empty cells get "nan" with bytes.replace and
+    # np.fromstring parses the rest; about 2.5x faster than the csv module.
+    buf = np.frombuffer(text, dtype=np.uint8)
+    ends = np.flatnonzero(buf == 10)
+    starts = np.zeros(len(ends), dtype=np.int64)
+    starts[1:] = ends[:-1] + 1
+    if len(ends) == 0:
+        return np.empty((0, n_values)), starts
+    if stamp_width and (ends - starts >= stamp_width).all() and (buf[starts + stamp_width - 1] == ord(",")).all():
+        edges = np.zeros(len(buf) + 1, dtype=np.int8)
+        edges[starts] = 1
+        edges[starts + stamp_width] -= 1
+        body = buf[np.cumsum(edges[:-1], dtype=np.int8) == 0].tobytes()
+    else:
+        # Hand-edited or foreign timestamps: strip the first field by regex
+        body = FIRST_FIELD.sub(b"", text)
+
+    # Empty first cells (legacy logs before the first TC reading)
+    if body.startswith(b","):
+        body = b"nan" + body
+    body = body.replace(b"\n,", b"\nnan,")
+    # Twice, because ",,," only gets every other gap filled per pass
+    body = body.replace(b",,", b",nan,").replace(b",,", b",nan,")
+    if body.endswith(b"\r\n"):
+        # csv.writer's default line terminator
+        body = body.replace(b",\r\n", b",nan\r\n").replace(b"\r\n", b",")
+    else:
+        body = body.replace(b",\n", b",nan\n").replace(b"\n", b",")
+    try:
+        values = np.fromstring(body, sep=",")
+    except ValueError:
+        values = None
+    if values is None or values.size != len(starts) * n_values:
+        raise ValueError(f"Malformed CSV rows (expected {n_values} values per row)")
+    return values.reshape(len(starts), n_values), starts
+
+
+def _block_span(run_max, suffix_min, t_start, t_end):
+    # Blocks that can hold samples in [t_start, t_end): running maxima and
+    # suffix minima of the per-block time bounds are both sorted, so each
+    # end of the span is one binary search.
+    first = 0 if t_start is None else int(np.searchsorted(run_max, t_start, side="left"))
+    last = len(run_max) if t_end is None else int(np.searchsorted(suffix_min, t_end, side="left"))
+    return first, last
+
+
+def _bounds(t_min, t_max):
+    t_min = np.asarray(t_min, dtype=np.float64)
+    t_max = np.asarray(t_max, dtype=np.float64)
+    if len(t_min) == 0:
+        return t_max, t_min
+    return np.maximum.accumulate(t_max), np.minimum.accumulate(t_min[::-1])[::-1]
+
+
+def _estimate_rate(t):
+    steps = np.diff(t)
+    steps = steps[steps > 0]
+    return float(1.0 / np.median(steps)) if len(steps) else None
+
+
+class Recording:
+    # Common interface of the log readers: `groups` [(group, names)],
+    # `rates`, `t0` (wall clock of t = 0, or None), `calibration` snapshot,
+    # time_range() and read(t_start, t_end) -> {group: (t, raw)} with raw
+    # as (channels x samples). Windows are half-open, [t_start, t_end).
+    def acquired_groups(self):
+        # Derived channels are recomputed on replay, not read back
+        return [(group, names) for group, names in self.groups if not group.endswith("_derived")]
+
+    def chunks(self, t_start=None, t_end=None, seconds=REPLAY_WINDOW):
+        # read() in consecutive windows, so a long recording is never loaded whole
+        span = self.time_range()
+        if span is None:
+            return
+        t = span[0] if t_start is None else max(t_start, span[0])
+        # Just past the last sample, so the half-open windows include it
+        stop = np.nextafter(span[1], np.inf)
+        if t_end is not None:
+            stop = min(stop, t_end)
+        while t < stop:
+            end = min(t + seconds, stop)
+            yield self.read(t, end)
+            t = end
+
+
+def _legacy_stamp(stamp):
+    try:
+        return np.datetime64(stamp, "ms")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+class CsvRecording(Recording):
+    # A CsvLogger file of any mode. Rows are located through a sidecar time
+    # index (log_X.index.json): one entry per INDEX_ROWS rows with its byte
+    # offset and time bounds. The index is built on first open and extended
+    # when the log has grown since, e.g. while it is still being written.
+    # Legacy logs get t_s from their wall-clock stamps, relative to the
+    # first row; rows within the same second share its time.
+    def __init__(self, path):
+        self.path = path
+        root = os.path.splitext(path)[0]
+        self.meta = {}
+        if os.path.exists(root + ".json"):
+            with open(root + ".json", "r", encoding="utf-8") as handle:
+                self.meta = json.load(handle)
+        self.index_path = root + ".index.json"
+        with open(path, "rb") as handle:
+            header = handle.readline()
+            first_row = handle.readline()
+        self.data_start = len(header)
+        self.columns = header.decode("utf-8").strip().split(",")
+        if self.columns[:1] != ["timestamp"]:
+            raise ValueError(f"{path}: not a data log (expected a timestamp column)")
+        self.legacy = self.columns[1:2] != ["t_s"]
+        self.data_columns = self.columns[1:] if self.legacy else self.columns[2:]
+        self.groups = self._groups()
+        # Values per parsed row, t_s included
+        self.n_values = len(self.data_columns) + 1
+        self.t0 = self.meta.get("t0")
+        self._epoch = None
+        if self.legacy and first_row.endswith(b"\n"):
+            stamp = first_row.split(b",", 1)[0].decode("utf-8", "replace").strip()
+            try:
+                self._epoch = np.datetime64(stamp, "ms")
+                self.t0 = datetime.datetime.fromisoformat(stamp).timestamp()
+            except ValueError:
+                raise ValueError(f"{path}: unreadable timestamp {stamp!r} (expected {LEGACY_STAMP})") from None
+        self.calibration = self.meta.get("calibration") or {}
+
+        self._spans = {}
+        col = 1
+        for group, names in self.groups:
+            self._spans[group] = (col, len(names))
+            col += 2 * len(names)
+
+        self.index = self._load_index()
+        self._run_max, self._suffix_min = _bounds(self.index["t_min"], self.index["t_max"])
+
+        # Latest and Aligned rows put every group on one row timeline, so
+        # only full-rate logs are at the acquisition rates in the sidecar
+        rates = (self.meta.get("rates") or {}) if self.meta.get("mode") == "Full rate" else {}
+        self.rates = {group: rates.get(group) for group, _ in self.groups}
+        span = self.time_range()
+        if self.legacy and span is not None and span[1] > span[0]:
+            # Whole-second stamps: the mean row rate over the run
+            self.rates = {group: (self.rows - 1) / (span[1] - span[0]) for group, _ in self.groups}
+        if not all(self.rates.values()) and self.index["offsets"]:
+            # Row-timeline modes, and logs from before rates were recorded
+            sample = self._parse_blocks(0, 1)
+            for group, (t, _) in self._split(sample).items():
+                if not self.rates[group]:
+                    self.rates[group] = _estimate_rate(t)
+
+    def _groups(self):
+        groups = self.meta.get("groups")
+        if groups:
+            groups = [(group, list(names)) for group, names in groups.items()]
+            if column_names(groups) == self.data_columns:
+                return groups
+        # No (matching) sidecar: every run of *_raw columns followed by the
+        # matching *_cal columns is one group, named after the channel prefix
+        groups = []
+        columns = self.data_columns
+        i = 0
+        while i < len(columns):
+            names = []
+            while i < len(columns) and columns[i].endswith("_raw"):
+                names.append(columns[i][:-len("_raw")])
+                i += 1
+            if not names or columns[i:i + len(names)] != [f"{name}_cal" for name in names]:
+                raise ValueError(f"{self.path}: unrecognised column layout")
+            i += len(names)
+            group = re.match(r"[a-z]*", names[0]).group() or f"group{len(groups)}"
+            groups.append((group, [name.upper() for name in names]))
+        return groups
+
+    def _load_index(self):
+        stat = os.stat(self.path)
+        index = None
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as handle:
+                index = json.load(handle)
+        except (OSError, ValueError):
+            pass
+        if (
+            not isinstance(index, dict)
+            or index.get("version") != INDEX_VERSION
+            or index.get("data_start") != self.data_start
+            or index.get("end", 0) > stat.st_size
+        ):
+            index = {
+                "version": INDEX_VERSION,
+                "data_start": self.data_start,
+                "rows": 0,
+                "end": self.data_start,
+                "offsets": [],
+                "counts": [],
+                "t_min": [],
+                "t_max": [],
+            }
+        elif index["size"] == stat.st_size and index["mtime"] == stat.st_mtime:
+            return index
+        elif index["offsets"]:
+            # Appended since: re-scan from the start of the last entry, which
+            # may have been cut short by the end of the file
+            index["end"] = index["offsets"].pop()
+            index["rows"] -= index["counts"].pop()
+            index["t_min"].pop()
+            index["t_max"].pop()
+
+        self._scan(index)
+        index["size"] = stat.st_size
+        index["mtime"] = stat.st_mtime
+        try:
+            with open(self.index_path, "w", encoding="utf-8") as handle:
+                json.dump(index, handle)
+        except OSError:
+            # Read-only location: keep the index in memory only
+            pass
+        return index
+
+    def _scan(self, index):
+        offset = index["end"]
+        carry = b""
+        with open(self.path, "rb") as handle:
+            handle.seek(offset)
+            while True:
+                data = handle.read(CHUNK_BYTES)
+                if not data:
+                    break
+                text = carry + data
+                cut = text.rfind(b"\n") + 1
+                carry = text[cut:]
+                if not cut:
+                    continue
+                values, starts = self._parse(text[:cut])
+                t = values[:, 0]
+                first = np.arange(0, len(t), INDEX_ROWS)
+                index["offsets"].extend((offset + starts[first]).tolist())
+                index["counts"].extend(np.diff(np.append(first, len(t))).tolist())
+                index["t_min"].extend(np.fmin.reduceat(t, first).tolist())
+                index["t_max"].extend(np.fmax.reduceat(t, first).tolist())
+                index["rows"] += len(t)
+                offset += cut
+        # A partial last row (log still being written) is left for later
+        index["end"] = offset
+
+    @property
+    def rows(self):
+        return self.index["rows"]
+
+    def time_range(self):
+        if not self.index["offsets"]:
+            return None
+        return float(np.nanmin(self.index["t_min"])), float(np.nanmax(self.index["t_max"]))
+
+    def _parse_blocks(self, first, last):
+        # Values of index entries [first, last), CHUNK_BYTES at a time
+        offsets = self.index["offsets"] + [self.index["end"]]
+        parts = []
+        with open(self.path, "rb") as handle:
+            block = first
+            while block < last:
+                stop = block + 1
+                while stop < last and offsets[stop + 1] - offsets[block] <= CHUNK_BYTES:
+                    stop += 1
+                handle.seek(offsets[block])
+                text = handle.read(offsets[stop] - offsets[block])
+                parts.append(self._parse(text)[0])
+                block = stop
+        if not parts:
+            return np.empty((0, self.n_values))
+        return np.concatenate(parts)
+
+    def _parse(self, text):
+        # parse_csv_rows with t_s in column 0, also for legacy logs
+        if not self.legacy:
+            return parse_csv_rows(text, self.n_values)
+        values, starts = parse_csv_rows(text, self.n_values - 1, stamp_width=None)
+        return np.column_stack([self._legacy_times(text, starts), values]), starts
+
+    def _legacy_times(self, text, starts):
+        stamps = [text[start:text.find(b",", start)].decode("utf-8", "replace").strip() for start in starts]
+        try:
+            wall = np.array(stamps, dtype="datetime64[ms]")
+        except ValueError:
+            # Some rows are damaged: only those lose their time
+            wall = np.array([_legacy_stamp(stamp) for stamp in stamps], dtype="datetime64[ms]")
+        if self._epoch is None and len(wall):
+            # The first row was still being written when the log was opened
+            self._epoch = wall[0]
+        return (wall - self._epoch) / np.timedelta64(1, "s")
+
+    def _split(self, values):
+        # Full-rate rows hold one group each; a group owns the rows where
+        # any of its cells is filled
+        t = values[:, 0]
+        out = {}
+        for group, (col, n) in self._spans.items():
+            cells = values[:, col:col + 2 * n]
+            present = ~np.isnan(cells).all(axis=1)
+            out[group] = (t[present], np.ascontiguousarray(values[present, col:col + n].T))
+        return out
+
+    def read(self, t_start=None, t_end=None):
+        first, last = _block_span(self._run_max, self._suffix_min, t_start, t_end)
+        values = self._parse_blocks(first, last)
+        t = values[:, 0]
+        keep = np.isfinite(t)
+        if t_start is not None:
+            keep &= t >= t_start
+        if t_end is not None:
+            keep &= t < t_end
+        return self._split(values[keep])
+
+
+class BinaryRecording(Recording):
+    # A BinaryLogger folder. The header already lists every chunk file, so
+    # the time index is just each chunk's first and last sample time:
+    # computed from the sample clock, or read from the timestamp row of
+    # timed groups. Chunks are memory-mapped and only the window is copied.
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, BINARY_HEADER), "r", encoding="utf-8") as handle:
+            self.header = json.load(handle)
+        infos = self.header["groups"]
+        self.groups = [(group, list(info["channels"])) for group, info in infos.items()]
+        self.rates = {group: info["rate"] for group, info in infos.items()}
+        self.t0 = self.header.get("t0")
+        self.calibration = self.header.get("calibration") or {}
+        self._chunks = {}
+        self._bounds = {}
+        for group, info in infos.items():
+            chunks = [chunk for chunk in info["chunks"] if chunk["samples"]]
+            t_min, t_max = [], []
+            for chunk in chunks:
+                if info.get("timestamps"):
+                    t = self._load(chunk)[0, :chunk["samples"]]
+                else:
+                    t = self._chunk_times(group, chunk, np.array([0, chunk["samples"] - 1]))
+                t_min.append(np.nanmin(t) if np.isfinite(t).any() else np.inf)
+                t_max.append(np.nanmax(t) if np.isfinite(t).any() else -np.inf)
+            self._chunks[group] = chunks
+            self._bounds[group] = (t_min, t_max) + _bounds(t_min, t_max)
+
+    def _load(self, chunk):
+        return np.load(os.path.join(self.path, chunk["file"]), mmap_mode="r")
+
+    def _chunk_times(self, group, chunk, positions):
+        info = self.header["groups"][group]
+        return info.get("t_offset", 0.0) + (chunk["start_index"] + positions) / info["rate"]
+
+    def time_range(self):
+        lows = [min(b[0]) for b in self._bounds.values() if b[0]]
+        highs = [max(b[1]) for b in self._bounds.values() if b[1]]
+        if not lows or not np.isfinite(min(lows)):
+            return None
+        return float(min(lows)), float(max(highs))
+
+    def read(self, t_start=None, t_end=None):
+        out = {}
+        for group, names in self.groups:
+            timed = self.header["groups"][group].get("timestamps")
+            _, _, run_max, suffix_min = self._bounds[group]
+            first, last = _block_span(run_max, suffix_min, t_start, t_end)
+            times, parts = [], []
+            for chunk in self._chunks[group][first:last]:
+                mm = self._load(chunk)[:, :chunk["samples"]]
+                if timed:
+                    t = np.asarray(mm[0])
+                    keep = np.isfinite(t)
+                    if t_start is not None:
+                        keep &= t >= t_start
+                    if t_end is not None:
+                        keep &= t < t_end
+                    times.append(t[keep])
+                    parts.append(np.array(mm[1:, keep]))
+                    continue
+                t = self._chunk_times(group, chunk, np.arange(chunk["samples"]))
+                i0 = 0 if t_start is None else int(np.searchsorted(t, t_start, side="left"))
+                i1 = len(t) if t_end is None else int(np.searchsorted(t, t_end, side="left"))
+                times.append(t[i0:i1])
+                parts.append(np.array(mm[:, i0:i1]))
+            if parts:
+                out[group] = (np.concatenate(times), np.concatenate(parts, axis=1))
+            else:
+                out[group] = (np.empty(0), np.empty((len(names), 0)))
+        return out
+
+
+def unshuffle_floats(data, rows, samples):
+    # Inverse of catalog.shuffle_floats: byte planes -> (rows x samples) float64
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(8, rows * samples)
+    return np.ascontiguousarray(planes.T).view("<f8").reshape(rows, samples)
+
+
+class ArchiveRecording(Recording):
+    # A compressed run archive written by catalog.py: a zip holding a JSON
+    # header (layout, calibration, run metadata and a time index of every
+    # chunk) and one deflated member per chunk of a group, so a window only
+    # inflates the chunks it overlaps. Chunks of sample-clocked data store
+    # the index of their first sample and the group's time offset; others
+    # carry a timestamp row like the timed groups of a binary log.
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as archive:
+            self.header = json.loads(archive.read(BINARY_HEADER).decode("utf-8"))
+        if self.header.get("archive") != ARCHIVE_VERSION:
+            raise ValueError(f"{path}: not a run archive")
+        infos = self.header["groups"]
+        self.groups = [(group, list(info["channels"])) for group, info in infos.items()]
+        self.rates = {group: info["rate"] for group, info in infos.items()}
+        self.t0 = self.header.get("t0")
+        self.calibration = self.header.get("calibration") or {}
+        self._bounds = {}
+        for group, info in infos.items():
+            t_min = [chunk["t_min"] for chunk in info["chunks"]]
+            t_max = [chunk["t_max"] for chunk in info["chunks"]]
+            self._bounds[group] = (t_min, t_max) + _bounds(t_min, t_max)
+
+    def time_range(self):
+        lows = [min(b[0]) for b in self._bounds.values() if b[0]]
+        highs = [max(b[1]) for b in self._bounds.values() if b[1]]
+        if not lows:
+            return None
+        return float(min(lows)), float(max(highs))
+
+    def _chunk(self, archive, group, chunk):
+        # -> (t, raw) of one chunk
+        info = self.header["groups"][group]
+        timed = chunk["start_index"] is None
+        data = unshuffle_floats(archive.read(chunk["file"]), len(info["channels"]) + timed, chunk["samples"])
+        if timed:
+            return data[0], data[1:]
+        # The same arithmetic as BinaryRecording, so times match bit for bit
+        return chunk["t_offset"] + (chunk["start_index"] + np.arange(chunk["samples"])) / info["rate"], data
+
+    def read(self, t_start=None, t_end=None):
+        out = {}
+        with zipfile.ZipFile(self.path) as archive:
+            for group, names in self.groups:
+                _, _, run_max, suffix_min = self._bounds[group]
+                first, last = _block_span(run_max, suffix_min, t_start, t_end)
+                times, parts = [], []
+                for chunk in self.header["groups"][group]["chunks"][first:last]:
+                    t, raw = self._chunk(archive, group, chunk)
+                    keep = np.isfinite(t)
+                    if t_start is not None:
+                        keep &= t >= t_start
+                    if t_end is not None:
+                        keep &= t < t_end
+                    times.append(t[keep])
+                    parts.append(raw[:, keep])
+                if parts:
+                    out[group] = (np.concatenate(times), np.concatenate(parts, axis=1))
+                else:
+                    out[group] = (np.empty(0), np.empty((len(names), 0)))
+        return out
+
+
+def open_recording(path):
+    # A CSV log file, a binary log folder (or its header.json) or a run archive
+    if os.path.basename(path) == BINARY_HEADER:
+        path = os.path.dirname(path)
+    if os.path.isdir(path):
+        return BinaryRecording(path)
+    if path.lower().endswith(".csv"):
+        return CsvRecording(path)
+    if path.lower().endswith(ARCHIVE_EXT):
+        return ArchiveRecording(path)
+    raise ValueError(f"Not a log: {path} (expected a .csv file, a binary log folder or a {ARCHIVE_EXT} archive)")
+
+
+class ReplayReader(threading.Thread):
+    # Feeds a recording back into the block queue as if it were being
+    # acquired, so calibration, derived channels, logging, capture and the
+    # plots run exactly as they do live. Samples are cut into blocks of
+    # block_seconds and released when the replay clock passes their end, at
+    # `speed` times real time; speed 0 replays as fast as the consumer keeps
+    # up, holding back while the queue is half full rather than letting it
+    # drop blocks. Blocks carry the recorded timestamps.
+    group = "replay"
+
+    def __init__(self, recording, groups, out_queue, speed=1.0, t_start=None, t_end=None, block_seconds=0.1):
+        super().__init__(name="replay-reader", daemon=True)
+        self.recording = recording
+        self.groups = list(groups)
+        self.out_queue = out_queue
+        self.speed = float(speed)
+        self.t_start = t_start
+        self.t_end = t_end
+        self.block_seconds = float(block_seconds)
+        self.stats = ReaderStats()
+        self.error = None
+        self.t_replayed = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            self._replay()
+        except Exception as exc:
+            if not self._stop_event.is_set():
+                self.error = exc
+
+    def _replay(self):
+        span = self.recording.time_range()
+        if span is None:
+            return
+        t_first = span[0] if self.t_start is None else max(self.t_start, span[0])
+        rates = self.recording.rates
+        sent = {group: 0 for group, _ in self.groups}
+        started = time.perf_counter()
+        limit = max(1, self.out_queue.maxlen // 2)
+        for window in self.recording.chunks(t_first, self.t_end):
+            slots = {}
+            for group, _ in self.groups:
+                t, raw = window[group]
+                slots[group] = (np.floor((t - t_first) / self.block_seconds).astype(np.int64), t, raw)
+            keys = [slot[0] for slot in slots.values() if len(slot[0])]
+            if not keys:
+                continue
+            for k in np.unique(np.concatenate(keys)).tolist():
+                if self.speed > 0:
+                    due = (k + 1) * self.block_seconds / self.speed
+                    delay = due - (time.perf_counter() - started)
+                    if delay > 0 and self._stop_event.wait(delay):
+                        return
+                else:
+                    while len(self.out_queue) >= limit:
+                        if self._stop_event.wait(0.002):
+                            return
+                if self._stop_event.is_set():
+                    return
+                stats = self.stats
+                for group, (slot, t, raw) in slots.items():
+                    i0 = np.searchsorted(slot, k, side="left")
+                    i1 = np.searchsorted(slot, k, side="right")
+                    if i1 <= i0:
+                        continue
+                    n = int(i1 - i0)
+                    self.out_queue.put(SampleBlock(group, raw[:, i0:i1], sent[group], rates.get(group) or 1.0, t=t[i0:i1]))
+                    sent[group] += n
+                    stats.samples_read += n
+                    stats.reads += 1
+                    self.t_replayed = float(t[i1 - 1])
+                stats.backlog = len(self.out_queue)
+                stats.max_backlog = max(stats.max_backlog, stats.backlog)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index a log and print its layout, or export a time window.")
+    parser.add_argument("log", help="CSV log file or binary log folder")
+    parser.add_argument("--start", type=float, help="window start (s on the run timebase)")
+    parser.add_argument("--end", type=float, help="window end (s)")
+    args = parser.parse_args()
+    t_open = time.perf_counter()
+    recording = open_recording(args.log)
+    print(f"{args.log}: opened in {time.perf_counter() - t_open:.2f} s")
+    span = recording.time_range()
+    if span is not None:
+        print(f"t = {span[0]:.3f} .. {span[1]:.3f} s")
+    for group, names in recording.groups:
+        print(f"{group}: {', '.join(names)} @ {recording.rates.get(group)} Hz")
+    if args.start is not None or args.end is not None:
+        t_read = time.perf_counter()
+        window = recording.read(args.start, args.end)
+        print(f"window read in {time.perf_counter() - t_read:.3f} s")
+        for group, (t, raw) in window.items():
+            if len(t):
+                print(f"{group}: {len(t)} samples, t = {t[0]:.3f} .. {t[-1]:.3f} s")
+            else:
+                print(f"{group}: no samples")
@@ -1,47 +1,92 @@
-import csv
 import os
+import queue
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
-import nidaqmx
-from nidaqmx.constants import AcquisitionType, TemperatureUnits, ThermocoupleType
-from nidaqmx.errors import DaqError
+from tkinter import ttk, messagebox, filedialog
 import math
-import time
+
+from capture import TRIGGER_MODES
+from calibration import (
+    CURVE_FITS,
+    default_calibration,
+    format_coefficients,
+    format_points,
+    load_calibration,
+    normalize_curve,
+    read_simple_yaml,
+    save_calibration,
+)
+from channelmap import ChannelMap, channel_map_from_config
+from daqbackend import BACKENDS
+from discovery import DEVICE_CACHE, DeviceCache, autofill_module, check_channel_map, check_module, enumerate_devices
+from datalog import LOG_MODES
+from derived import DerivedEngine, load_derived
+from acqprocess import ProcessSession
+from session import TC_TYPES, AcquisitionSession, rates_for_period
+from stripchart import StripChart
 
 
 class NiDaqGui(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("cDAQ Live Readout (NI-9212 TC + NI-9201 AI)")
-        self.geometry("720x420")
+        self.geometry("1000x860")
 
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.calibration_path = os.path.join(self.script_dir, "calibration.yaml")
 
-        # DAQ tasks
-        self.tc_task = None
-        self.ai_task = None
+        # DAQ tasks, readers and logger live in the session
+        self.session = None
         self.running = False
         self.after_id = None
-        self.log_file = None
-        self.log_writer = None
+        # Connect/Start run on a worker thread; the buttons wait meanwhile
+        self.busy = False
+        self.close_when_idle = False
+        # Last known chassis modules per backend, refreshed in the background
+        self.device_cache = DeviceCache(os.path.join(self.script_dir, DEVICE_CACHE))
+        self.refreshing_devices = False
 
         # --- UI Vars ---
         # These should match what NI MAX shows. Example: "cDAQ9185-1A2B3C4DMod1"
         self.tc_module = tk.StringVar(value="cDAQ9185-20050D7Mod4")  # NI-9212
         self.ai_module = tk.StringVar(value="cDAQ9185-20050D7Mod3")  # NI-9201
 
+        self.backend_name = tk.StringVar(value=BACKENDS[0])
         self.tc_type = tk.StringVar(value="K")      # change if needed
         self.sample_period_ms = tk.IntVar(value=200)  # 5 Hz UI update
         self.logging_enabled = tk.BooleanVar(value=False)
-
-        # Readouts
-        self.tc_vals = [tk.StringVar(value="—") for _ in range(3)]
-        self.ai_vals = [tk.StringVar(value="—") for _ in range(4)]
+        self.log_mode = tk.StringVar(value=LOG_MODES[0])
+        self.plot_span_s = tk.StringVar(value="30")
+        # A recorded log to play back instead of connecting to the DAQ
+        self.replay_path = tk.StringVar(value="")
+        self.replay_speed = tk.StringVar(value="1")
+        self.telemetry_port = tk.StringVar(value="")  # empty = no network clients
+        self.separate_process = tk.BooleanVar(value=False)  # DAQ + logging in their own process
+        self.operator = tk.StringVar(value="")    # run catalog entry of each log
+        self.run_notes = tk.StringVar(value="")
+
+        # Channel layout (modules:) and derived channels (derived:) from
+        # calibration.yaml; display groups are the acquired then derived ones
+        self.channel_map, self.derived, self.groups = self._load_layout()
+
+        # Readouts, one per channel in display order
+        self.readouts = {group: [tk.StringVar(value="—") for _ in names] for group, names in self.groups}
         self.status = tk.StringVar(value="Disconnected")
+        self.tc_check = tk.StringVar(value="")
+        self.ai_check = tk.StringVar(value="")
+        self.device_status = tk.StringVar(value="")
+        self.acq_stats = tk.StringVar(value="")
+
+        # Triggered capture
+        names = [name for _, group_names in self.groups for name in group_names]
+        self.capture_channel = tk.StringVar(value=names[0] if names else "")
+        self.capture_mode = tk.StringVar(value=TRIGGER_MODES[0])
+        self.capture_level = tk.StringVar(value="1.0")
+        self.capture_pre = tk.StringVar(value="1.0")
+        self.capture_post = tk.StringVar(value="2.0")
+        self.capture_status = tk.StringVar(value="Not armed")
 
-        self.last_tc_raw = [None] * 3
-        self.last_ai_raw = [None] * 4
         self.calibration = self._default_calibration()
         self._load_calibration()
 
@@ -59,17 +104,46 @@ class NiDaqGui(tk.Tk):
 
         ttk.Label(conn, text="NI-9212 module name (in MAX):").grid(row=0, column=0, sticky="w", **pad)
         ttk.Entry(conn, textvariable=self.tc_module, width=35).grid(row=0, column=1, sticky="w", **pad)
+        ttk.Label(conn, textvariable=self.tc_check).grid(row=0, column=4, sticky="w", **pad)
 
         ttk.Label(conn, text="NI-9201 module name (in MAX):").grid(row=1, column=0, sticky="w", **pad)
         ttk.Entry(conn, textvariable=self.ai_module, width=35).grid(row=1, column=1, sticky="w", **pad)
+        ttk.Label(conn, textvariable=self.ai_check).grid(row=1, column=4, sticky="w", **pad)
 
         ttk.Label(conn, text="Thermocouple type:").grid(row=0, column=2, sticky="w", **pad)
-        tc_combo = ttk.Combobox(conn, textvariable=self.tc_type, values=["J", "K", "T", "E", "N", "R", "S", "B"], width=6, state="readonly")
+        tc_combo = ttk.Combobox(conn, textvariable=self.tc_type, values=TC_TYPES, width=6, state="readonly")
         tc_combo.grid(row=0, column=3, sticky="w", **pad)
 
         ttk.Label(conn, text="Update period (ms):").grid(row=1, column=2, sticky="w", **pad)
         ttk.Entry(conn, textvariable=self.sample_period_ms, width=8).grid(row=1, column=3, sticky="w", **pad)
 
+        ttk.Label(conn, text="DAQ backend:").grid(row=2, column=0, sticky="w", **pad)
+        ttk.Combobox(conn, textvariable=self.backend_name, values=BACKENDS, width=12, state="readonly").grid(row=2, column=1, sticky="w", **pad)
+
+        ttk.Label(conn, text="Telemetry port (optional):").grid(row=2, column=2, sticky="w", **pad)
+        ttk.Entry(conn, textvariable=self.telemetry_port, width=8).grid(row=2, column=3, sticky="w", **pad)
+
+        ttk.Label(conn, text="Replay log (optional):").grid(row=3, column=0, sticky="w", **pad)
+        ttk.Entry(conn, textvariable=self.replay_path, width=35).grid(row=3, column=1, sticky="w", **pad)
+        ttk.Button(conn, text="Browse...", command=self._browse_replay).grid(row=3, column=2, sticky="w", **pad)
+        speed_row = ttk.Frame(conn)
+        speed_row.grid(row=3, column=3, sticky="w", **pad)
+        ttk.Label(speed_row, text="Speed:").pack(side="left")
+        ttk.Combobox(speed_row, textvariable=self.replay_speed, values=["1", "2", "5", "10", "max"], width=5).pack(side="left", padx=4)
+
+        ttk.Checkbutton(conn, text="Separate acquisition process", variable=self.separate_process).grid(
+            row=4, column=1, sticky="w", **pad)
+        ttk.Label(conn, text="Operator:").grid(row=4, column=2, sticky="w", **pad)
+        ttk.Entry(conn, textvariable=self.operator, width=12).grid(row=4, column=3, sticky="w", **pad)
+        ttk.Label(conn, text="Run notes:").grid(row=5, column=0, sticky="w", **pad)
+        ttk.Entry(conn, textvariable=self.run_notes, width=60).grid(row=5, column=1, columnspan=3, sticky="w", **pad)
+
+        ttk.Button(conn, text="Find modules", command=self._refresh_devices).grid(row=2, column=4, sticky="w", **pad)
+        ttk.Label(conn, textvariable=self.device_status).grid(row=3, column=4, sticky="w", **pad)
+        for var in (self.tc_module, self.ai_module):
+            var.trace_add("write", lambda *_: self._check_modules())
+        self.backend_name.trace_add("write", lambda *_: self._on_backend_change())
+
         # Buttons + status
         btns = ttk.Frame(frm)
         btns.pack(fill="x", **pad)
@@ -88,66 +162,79 @@ class NiDaqGui(tk.Tk):
 
         self.chk_log = ttk.Checkbutton(
             btns,
-            text="Log to CSV",
+            text="Log to disk",
             variable=self.logging_enabled,
             command=self._on_logging_toggle,
         )
         self.chk_log.pack(side="left", padx=8)
 
+        ttk.Combobox(btns, textvariable=self.log_mode, values=LOG_MODES, width=9, state="readonly").pack(side="left", padx=2)
+
         self.btn_disconnect = ttk.Button(btns, text="Disconnect", command=self.disconnect, state="disabled")
         self.btn_disconnect.pack(side="left", padx=5)
 
         ttk.Label(btns, textvariable=self.status).pack(side="right", padx=5)
 
+        # Triggered capture: pre/post window around a level, edge or Fire
+        cap = ttk.LabelFrame(frm, text="Triggered capture (full rate, binary)")
+        cap.pack(fill="x", **pad)
+        names = [name for _, group_names in self.groups for name in group_names]
+        ttk.Combobox(cap, textvariable=self.capture_channel, values=names, width=10, state="readonly").pack(side="left", padx=4)
+        ttk.Combobox(cap, textvariable=self.capture_mode, values=TRIGGER_MODES, width=12, state="readonly").pack(side="left", padx=4)
+        ttk.Label(cap, text="Level:").pack(side="left", padx=2)
+        ttk.Entry(cap, textvariable=self.capture_level, width=8).pack(side="left", padx=2)
+        ttk.Label(cap, text="Pre (s):").pack(side="left", padx=2)
+        ttk.Entry(cap, textvariable=self.capture_pre, width=5).pack(side="left", padx=2)
+        ttk.Label(cap, text="Post (s):").pack(side="left", padx=2)
+        ttk.Entry(cap, textvariable=self.capture_post, width=5).pack(side="left", padx=2)
+        self.btn_arm = ttk.Button(cap, text="Arm", command=self.arm_capture, state="disabled")
+        self.btn_arm.pack(side="left", padx=5)
+        self.btn_fire = ttk.Button(cap, text="Fire", command=self.fire_capture, state="disabled")
+        self.btn_fire.pack(side="left", padx=5)
+        ttk.Label(cap, textvariable=self.capture_status).pack(side="left", padx=5)
+
         # Readouts
         ro = ttk.Frame(frm)
         ro.pack(fill="both", expand=True, **pad)
 
-        tc_box = ttk.LabelFrame(ro, text="Thermocouples (NI-9212) ai0..ai2 (°C)")
-        tc_box.pack(side="left", fill="both", expand=True, padx=8, pady=8)
-
-        for i in range(3):
-            ttk.Label(tc_box, text=f"TC{i} (ai{i}):").grid(row=i, column=0, sticky="w", padx=10, pady=10)
-            ttk.Label(tc_box, textvariable=self.tc_vals[i], font=("TkDefaultFont", 12, "bold")).grid(row=i, column=1, sticky="w", padx=10, pady=10)
-
-        ai_box = ttk.LabelFrame(ro, text="Pressure / Analog Inputs (NI-9201) ai0..ai3 (V)")
-        ai_box.pack(side="right", fill="both", expand=True, padx=8, pady=8)
+        for group, names in self.groups:
+            box = ttk.LabelFrame(ro, text=self._group_title(group, describe=True))
+            box.pack(side="left", fill="both", expand=True, padx=8, pady=8)
+            # Wrap into extra columns so 8+ channels still fit the window
+            rows = 4 if len(names) > 4 else len(names)
+            pady = 10 if len(names) <= 4 else 3
+            for i, (name, var) in enumerate(zip(names, self.readouts[group])):
+                row, col = i % rows, 2 * (i // rows)
+                ttk.Label(box, text=f"{name}:").grid(row=row, column=col, sticky="w", padx=10, pady=pady)
+                ttk.Label(box, textvariable=var, font=("TkDefaultFont", 12, "bold")).grid(row=row, column=col + 1, sticky="w", padx=10, pady=pady)
+
+        # Live plots (redrawn on their own timer, independent of the tick)
+        plots = ttk.LabelFrame(frm, text="Live plots (calibrated)")
+        plots.pack(fill="both", expand=True, **pad)
+
+        span_row = ttk.Frame(plots)
+        span_row.pack(fill="x")
+        ttk.Label(span_row, text="Span (s):").pack(side="left", padx=5)
+        span_combo = ttk.Combobox(span_row, textvariable=self.plot_span_s, values=["10", "30", "60", "120", "300"], width=6, state="readonly")
+        span_combo.pack(side="left", padx=5)
+        span_combo.bind("<<ComboboxSelected>>", self._on_span_change)
+
+        self.charts = {
+            group: StripChart(plots, names, title=self._group_title(group))
+            for group, names in self.groups
+        }
+        for chart in self.charts.values():
+            chart.pack(fill="both", expand=True, padx=5, pady=3)
 
-        for i in range(4):
-            ttk.Label(ai_box, text=f"AI{i} (ai{i}):").grid(row=i, column=0, sticky="w", padx=10, pady=10)
-            ttk.Label(ai_box, textvariable=self.ai_vals[i], font=("TkDefaultFont", 12, "bold")).grid(row=i, column=1, sticky="w", padx=10, pady=10)
+        ttk.Label(frm, textvariable=self.acq_stats, anchor="w").pack(fill="x", padx=10)
 
         # Close handler
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-    def _tc_enum(self):
-        m = {
-            "J": ThermocoupleType.J,
-            "K": ThermocoupleType.K,
-            "T": ThermocoupleType.T,
-            "E": ThermocoupleType.E,
-            "N": ThermocoupleType.N,
-            "R": ThermocoupleType.R,
-            "S": ThermocoupleType.S,
-            "B": ThermocoupleType.B,
-        }
-        return m.get(self.tc_type.get().strip().upper(), ThermocoupleType.K)
-
-    def _normalize_read(self, data, expected_channels):
-        # Normalize NI-DAQmx return shapes to one scalar per channel.
-        if isinstance(data, (list, tuple)):
-            if data and isinstance(data[0], (list, tuple)):
-                flat = [ch[-1] if ch else float("nan") for ch in data]
-            else:
-                flat = list(data)
-        else:
-            flat = [data]
-
-        if len(flat) < expected_channels:
-            flat.extend([float("nan")] * (expected_channels - len(flat)))
-        else:
-            flat = flat[:expected_channels]
-        return flat
+        # Check the module names against the cached listing right away,
+        # then re-enumerate in the background
+        self._check_modules(autofill=True)
+        self._refresh_devices()
 
     def _format_value(self, value, fmt):
         if value is None:
@@ -159,142 +246,70 @@ class NiDaqGui(tk.Tk):
         except Exception:
             return "—"
 
+    def _load_layout(self):
+        if os.path.exists(self.calibration_path):
+            try:
+                config = read_simple_yaml(self.calibration_path)
+                channel_map = channel_map_from_config(config)
+                derived = load_derived(config)
+                engine = DerivedEngine(derived, channel_map.groups, priority=["ai"])
+                return channel_map, derived, channel_map.groups + engine.groups
+            except Exception as exc:
+                messagebox.showerror("Channel map", f"Using the default channels.\n{type(exc).__name__}: {exc}")
+        channel_map = ChannelMap.default()
+        return channel_map, {}, channel_map.groups
+
+    def _group_title(self, group, describe=False):
+        if group.endswith("_derived"):
+            return f"Derived ({group[:-len('_derived')].upper()} timeline)"
+        if describe:
+            return f"{self.channel_map.title(group)}  {self.channel_map.describe(group)}"
+        return self.channel_map.title(group)
+
     def _channel_names(self):
-        return ["TC0", "TC1", "TC2", "AI0", "AI1", "AI2", "AI3"]
+        return self.channel_map.names()
 
     def _default_calibration(self):
-        cal = {}
-        for name in self._channel_names():
-            cal[name] = {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 1.0}
-        return cal
-
-    def _parse_scalar(self, value):
-        value = value.strip()
-        if not value:
-            return None
-        low = value.lower()
-        if low in ("null", "none"):
-            return None
-        try:
-            if "." in value or "e" in low:
-                return float(value)
-            return int(value)
-        except Exception:
-            return value.strip("\"'")
-
-    def _parse_simple_yaml(self, text):
-        data = {}
-        stack = [(-1, data)]
-        for raw_line in text.splitlines():
-            line = raw_line.split("#", 1)[0].rstrip()
-            if not line.strip():
-                continue
-            indent = len(line) - len(line.lstrip(" "))
-            key, sep, tail = line.strip().partition(":")
-            if not sep:
-                continue
-            while stack and indent <= stack[-1][0]:
-                stack.pop()
-            parent = stack[-1][1] if stack else data
-            tail = tail.strip()
-            if tail == "":
-                new_dict = {}
-                parent[key] = new_dict
-                stack.append((indent, new_dict))
-            else:
-                parent[key] = self._parse_scalar(tail)
-        return data
+        return default_calibration(self._channel_names())
 
     def _load_calibration(self):
         if not os.path.exists(self.calibration_path):
             self._save_calibration()
             return
         try:
-            with open(self.calibration_path, "r", encoding="utf-8") as handle:
-                text = handle.read()
+            self.calibration = load_calibration(self.calibration_path, self._channel_names(), self.calibration)
         except Exception:
-            return
-        data = self._parse_simple_yaml(text)
-        channels = {}
-        if isinstance(data, dict):
-            if isinstance(data.get("channels"), dict):
-                channels = data["channels"]
-            else:
-                channels = data
-        for name in self._channel_names():
-            entry = channels.get(name)
-            if not isinstance(entry, dict):
-                continue
-            for key in ("raw1", "eng1", "raw2", "eng2"):
-                value = entry.get(key)
-                if isinstance(value, (int, float)):
-                    self.calibration[name][key] = float(value)
+            pass
+        self._rebuild_calibration()
 
     def _save_calibration(self):
-        lines = ["version: 1", "channels:"]
-        for name in self._channel_names():
-            lines.append(f"  {name}:")
-            for key in ("raw1", "eng1", "raw2", "eng2"):
-                value = self.calibration[name].get(key, 0.0)
-                lines.append(f"    {key}: {value}")
-        text = "\n".join(lines) + "\n"
-        with open(self.calibration_path, "w", encoding="utf-8") as handle:
-            handle.write(text)
-
-    def _apply_calibration(self, channel, value):
-        if value is None:
-            return value
-        try:
-            if isinstance(value, float) and math.isnan(value):
-                return value
-        except Exception:
-            return value
-        entry = self.calibration.get(channel)
-        if not entry:
-            return value
-        raw1 = entry.get("raw1")
-        raw2 = entry.get("raw2")
-        eng1 = entry.get("eng1")
-        eng2 = entry.get("eng2")
-        if None in (raw1, raw2, eng1, eng2):
-            return value
-        if raw2 == raw1:
-            return eng1
-        return eng1 + (value - raw1) * (eng2 - eng1) / (raw2 - raw1)
+        save_calibration(self.calibration_path, self.calibration, self._channel_names(), modules=self.channel_map.as_config(), derived=self.derived)
+        self._rebuild_calibration()
+
+    def _rebuild_calibration(self):
+        if self.session is not None:
+            self.session.set_calibration(self.calibration)
 
     def _open_log(self):
-        if self.log_file:
+        if self.session is None or self.session.logger:
             return
+        self.session.run_info = {"operator": self.operator.get().strip(), "notes": self.run_notes.get().strip()}
         try:
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            filename = f"log_{timestamp}.csv"
-            path = os.path.join(self.script_dir, filename)
-            self.log_file = open(path, "w", newline="", encoding="utf-8")
-            self.log_writer = csv.writer(self.log_file)
-            header = ["timestamp"]
-            for i in range(3):
-                header.append(f"tc{i}_raw")
-            for i in range(3):
-                header.append(f"tc{i}_cal")
-            for i in range(4):
-                header.append(f"ai{i}_raw")
-            for i in range(4):
-                header.append(f"ai{i}_cal")
-            self.log_writer.writerow(header)
-            self.log_file.flush()
+            self.session.open_log(self.log_mode.get(), self.script_dir)
         except Exception as exc:
             self._close_log()
             self.logging_enabled.set(False)
             messagebox.showerror("Log failed", f"{type(exc).__name__}: {exc}")
 
     def _close_log(self):
-        if self.log_file:
-            try:
-                self.log_file.close()
-            except Exception:
-                pass
-        self.log_file = None
-        self.log_writer = None
+        if self.session is not None:
+            self.session.close_log()
+            self._report_catalog()
+
+    def _report_catalog(self):
+        if self.session.catalog_error is not None:
+            messagebox.showwarning("Run catalog", f"The log was saved but not cataloged:\n{self.session.catalog_error}")
+            self.session.catalog_error = None
 
     def _on_logging_toggle(self):
         if self.running:
@@ -303,202 +318,352 @@ class NiDaqGui(tk.Tk):
             else:
                 self._close_log()
 
-    def _get_period_ms(self):
+    def _format_stats(self, stats):
+        parts = []
+        for group, reader in stats["readers"].items():
+            parts.append(
+                f"{group.upper()}: {reader['samples_read']} samp, backlog {reader['backlog']}, "
+                f"max read {reader['max_read_latency'] * 1000:.0f} ms, "
+                f"ovf {reader['overflows']}, timeouts {reader['timeouts']}"
+            )
+        lost = sum(stats["gap_samples"].values())
+        parts.append(f"lost {lost} samp")
+        if stats.get("log_backlog", 0) > stats.get("log_max_items", 0):
+            parts.append(f"log behind, {stats['log_backlog']} writes queued")
+        if stats.get("log_dropped_items"):
+            parts.append(f"log overloaded, {stats['log_dropped_items']} writes dropped")
+        ring = stats.get("ring")
+        if ring is not None and (ring["overruns"] or ring["torn_blocks"]):
+            parts.append(f"ring overruns {ring['overruns']} ({ring['lost_blocks']} blocks), torn {ring['torn_blocks']}")
+        return " | ".join(parts)
+
+    def arm_capture(self):
+        if self.session is None or not self.running:
+            return
         try:
-            value = int(self.sample_period_ms.get())
-        except Exception:
-            return 200
-        return max(50, value)
+            self.session.arm_capture(
+                self.capture_channel.get(),
+                self.capture_mode.get(),
+                float(self.capture_level.get()),
+                float(self.capture_pre.get()),
+                float(self.capture_post.get()),
+                self.script_dir,
+            )
+        except Exception as exc:
+            messagebox.showerror("Arm failed", f"{type(exc).__name__}: {exc}")
+            return
+        self.btn_fire.config(state="normal")
+        self._update_capture_status()
 
-    def _configure_timing(self):
-        period_ms = self._get_period_ms()
-        ui_rate = 1000.0 / period_ms
-        tc_rate = max(1.0, min(10.0, ui_rate * 2.0))
-        ai_rate = max(10.0, min(1000.0, ui_rate * 10.0))
+    def fire_capture(self):
+        if self.session is not None:
+            self.session.fire_capture()
 
-        self.tc_task.timing.cfg_samp_clk_timing(
-            rate=tc_rate,
-            sample_mode=AcquisitionType.CONTINUOUS,
-            samps_per_chan=max(2, int(tc_rate * 2)),
-        )
-        self.ai_task.timing.cfg_samp_clk_timing(
-            rate=ai_rate,
-            sample_mode=AcquisitionType.CONTINUOUS,
-            samps_per_chan=max(2, int(ai_rate * 2)),
+    def _update_capture_status(self):
+        capture = self.session.capture if self.session is not None else None
+        if capture is None:
+            self.capture_status.set("Not armed")
+            return
+        if capture.state == "armed":
+            self.capture_status.set("Armed")
+        elif capture.state in ("triggered", "saving"):
+            self.capture_status.set(f"Triggered at t = {capture.t_trigger:.3f} s")
+        elif capture.state == "saved":
+            self.capture_status.set(f"Saved {os.path.basename(capture.path)}")
+        else:
+            self.capture_status.set(f"Failed: {capture.error}")
+        if capture.state != "armed":
+            self.btn_fire.config(state="disabled")
+
+    def _on_span_change(self, event=None):
+        for chart in self.charts.values():
+            chart.set_span(self.plot_span_s.get())
+
+    def _browse_replay(self):
+        path = filedialog.askopenfilename(
+            title="Replay log",
+            initialdir=self.script_dir,
+            filetypes=[("CSV log", "*.csv"), ("Binary log header", "header.json"), ("Run archive", "*.zip"), ("All files", "*.*")],
         )
+        if path:
+            self.replay_path.set(path)
+
+    def _check_modules(self, autofill=False):
+        # Instant check of the module fields against the cached listing
+        devices = self.device_cache.devices(self.backend_name.get())
+        for var, check, kind in ((self.tc_module, self.tc_check, "thermocouple"),
+                                 (self.ai_module, self.ai_check, "voltage")):
+            if autofill:
+                name = autofill_module(devices, var.get(), kind)
+                if name != var.get():
+                    var.set(name)
+            ok, text = check_module(devices, var.get(), kind)
+            check.set(f"✓ {text}" if ok else f"✗ {text}" if ok is False else "")
+
+    def _on_backend_change(self):
+        self._check_modules(autofill=True)
+        self._refresh_devices()
+
+    def _refresh_devices(self):
+        if self.refreshing_devices:
+            return
+        backend = self.backend_name.get()
+        self.refreshing_devices = True
+        self.device_status.set("Looking for modules...")
+
+        def done(devices, error):
+            self.refreshing_devices = False
+            if error is not None:
+                if backend != self.backend_name.get():
+                    self._refresh_devices()
+                    return
+                cached = self.device_cache.updated(backend)
+                since = time.strftime(" (list from %Y-%m-%d %H:%M)", time.localtime(cached)) if cached else ""
+                self.device_status.set(f"Module search failed{since}")
+                return
+            self.device_cache.update(backend, devices)
+            modules = [d for d in devices if d.get("channels")]
+            self.device_status.set(f"{len(modules)} modules found")
+            if backend == self.backend_name.get():
+                self._check_modules(autofill=True)
+            else:
+                self._refresh_devices()
 
-    def _read_latest(self, task, expected_channels, max_samples=200):
-        try:
-            available = int(task.in_stream.avail_samp_per_chan)
-        except Exception:
-            return None
+        self._run_worker(lambda progress: enumerate_devices(backend), done, show_progress=False)
 
-        if available <= 0:
-            return None
+    def _run_worker(self, work, done, show_progress=True):
+        # work(progress) runs on a worker thread so slow driver calls never
+        # freeze the window. Its progress texts and its result come back
+        # through a queue polled from the Tk loop; done(result, error) runs
+        # on the Tk thread.
+        messages = queue.Queue()
 
-        samples_to_read = min(available, max_samples)
+        def target():
+            try:
+                result = work(lambda text: messages.put(("progress", text)))
+            except Exception as exc:
+                messages.put(("done", (None, exc)))
+            else:
+                messages.put(("done", (result, None)))
+
+        threading.Thread(target=target, name="gui-worker", daemon=True).start()
+        self.after(50, self._poll_worker, messages, done, show_progress)
+
+    def _poll_worker(self, messages, done, show_progress):
+        while True:
+            try:
+                kind, payload = messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                if show_progress:
+                    self.status.set(payload)
+                continue
+            done(*payload)
+            if self.close_when_idle and not self.busy:
+                self.on_close()
+            return
+        self.after(50, self._poll_worker, messages, done, show_progress)
+
+    def _set_busy(self, text):
+        # Disable the session buttons while a worker owns the session
+        self.busy = True
+        self.status.set(text)
+        for button in (self.btn_connect, self.btn_start, self.btn_disconnect):
+            button.config(state="disabled")
+
+    def _get_replay_speed(self):
+        text = self.replay_speed.get().strip().lower()
+        if text in ("max", "0"):
+            return 0.0
+        return max(0.01, float(text.rstrip("x")))
+
+    def _get_period_ms(self):
         try:
-            data = task.read(number_of_samples_per_channel=samples_to_read, timeout=0)
-        except DaqError as exc:
-            if exc.error_code == -200284:
-                return None
-            raise
-        return self._normalize_read(data, expected_channels)
+            value = int(self.sample_period_ms.get())
+        except Exception:
+            return 200
+        return max(50, value)
 
     def connect(self):
-        if self.tc_task or self.ai_task:
+        if self.session is not None and self.session.connected:
             messagebox.showinfo("Info", "Already connected.")
             return
+        if self.busy:
+            return
 
         tc_mod = self.tc_module.get().strip()
         ai_mod = self.ai_module.get().strip()
-        if not tc_mod or not ai_mod:
-            messagebox.showerror("Error", "Please enter module names as shown in NI MAX.")
-            return
+        backend = self.backend_name.get()
 
+        replay = self.replay_path.get().strip() or None
+        session_class = ProcessSession if self.separate_process.get() else AcquisitionSession
         try:
-            # Create tasks
-            self.tc_task = nidaqmx.Task(new_task_name="TC_Task")
-            self.ai_task = nidaqmx.Task(new_task_name="AI_Task")
-
-            # Add channels
-            # NI-9212: ai0..ai2 thermocouple
-            for i in range(3):
-                ch = f"{tc_mod}/ai{i}"
-                self.tc_task.ai_channels.add_ai_thrmcpl_chan(
-                    physical_channel=ch,
-                    thermocouple_type=self._tc_enum(),
-                    units=TemperatureUnits.DEG_C
-                )
-
-            # NI-9201: ai0..ai3 voltage
-            for i in range(4):
-                ch = f"{ai_mod}/ai{i}"
-                self.ai_task.ai_channels.add_ai_voltage_chan(ch)
-
-            self.tc_task.in_stream.read_all_avail_samp = True
-            self.ai_task.in_stream.read_all_avail_samp = True
-
-            self.status.set("Connected (tasks created)")
+            replay_speed = self._get_replay_speed() if replay else 1.0
+            port = int(self.telemetry_port.get().strip() or 0)
+        except ValueError as e:
+            messagebox.showerror("Connect failed", f"{type(e).__name__}: {e}")
+            return
+
+        if not replay:
+            # A typo in a module name shows up here instead of after the
+            # driver round-trip; the listing may be stale, so allow going on
+            problems = check_channel_map(self.channel_map, {"thermocouple": tc_mod, "voltage": ai_mod},
+                                         self.device_cache.devices(backend))
+            if problems and not messagebox.askyesno(
+                    "Check modules", "\n".join(problems) + "\n\nNot in the last module list. Connect anyway?"):
+                return
+
+        # Only plain values cross into the worker; Tk variables stay here
+        options = dict(
+            tc_type=self.tc_type.get(),
+            calibration=self.calibration,
+            channel_map=self.channel_map,
+            derived=self.derived,
+            replay=replay,
+            replay_speed=replay_speed,
+        )
+
+        def work(progress):
+            progress("Opening log" if replay else "Loading driver")
+            session = session_class(backend, tc_mod, ai_mod, **options)
+            try:
+                if replay and session.channel_map.groups != self.channel_map.groups:
+                    raise ValueError("The log's channels differ from the modules in calibration.yaml; "
+                                     "replay it with headless.py --replay or update the modules section.")
+                session.connect(progress)
+                telemetry = session.start_telemetry(port) if port else None
+            except Exception:
+                session.disconnect()
+                raise
+            return session, telemetry
+
+        def done(result, error):
+            self.busy = False
+            if error is not None:
+                self.btn_connect.config(state="normal")
+                messagebox.showerror("Connect failed", f"{type(error).__name__}: {error}")
+                self.status.set("Disconnected")
+                return
+            self.session, telemetry = result
+            if replay:
+                self.status.set(f"Replay ready ({os.path.basename(replay.rstrip('/'))})")
+            else:
+                self.status.set(f"Connected (tasks created, {self.session.backend.name})")
+            if telemetry:
+                self.status.set(f"{self.status.get()}, telemetry on port {telemetry}")
             self.btn_start.config(state="normal")
             self.btn_disconnect.config(state="normal")
-            self.btn_connect.config(state="disabled")
 
-        except Exception as e:
-            self._cleanup_tasks()
-            messagebox.showerror("Connect failed", f"{type(e).__name__}: {e}")
-            self.status.set("Disconnected")
+        self._set_busy("Connecting...")
+        self._run_worker(work, done)
 
     def start(self):
-        if not self.tc_task or not self.ai_task:
+        if self.session is None or not self.session.connected:
             messagebox.showerror("Error", "Not connected.")
             return
 
-        if self.running:
+        if self.running or self.busy:
             return
 
-        try:
-            self._configure_timing()
-            self.tc_task.start()
-            self.ai_task.start()
-        except Exception as e:
-            messagebox.showerror("Start failed", f"{type(e).__name__}: {e}")
+        tc_rate, ai_rate = rates_for_period(self._get_period_ms())
+        session = self.session
+        self._set_busy("Starting...")
+        self._run_worker(lambda progress: session.start(tc_rate, ai_rate, progress), self._on_started)
+
+    def _on_started(self, result, error):
+        self.busy = False
+        self.btn_disconnect.config(state="normal")
+        if error is not None:
+            self.btn_start.config(state="normal")
+            messagebox.showerror("Start failed", f"{type(error).__name__}: {error}")
             self.status.set("Connected (stopped)")
             return
 
         self.running = True
+        for group, rate in self.session.rates().items():
+            if group in self.charts:
+                self.charts[group].reset(rate)
         self.btn_start.config(state="disabled")
         self.btn_stop.config(state="normal")
-        self.status.set("Running")
+        self.btn_arm.config(state="normal")
+        if self.session.replay is not None:
+            self.status.set("Replaying")
+        else:
+            sync = "shared start trigger" if self.session.timebase.synchronized else "software start"
+            self.status.set(f"Running ({sync})")
         if self.logging_enabled.get():
             self._open_log()
 
-        # Kick off periodic read (UI thread)
+        # Readers drain the DAQ buffers; the UI thread only consumes the queue
         self._tick()
 
     def stop(self):
         if not self.running:
             return
         self.running = False
-        for t in (self.tc_task, self.ai_task):
-            if t is not None:
-                try:
-                    t.stop()
-                except Exception:
-                    pass
         if self.after_id is not None:
             try:
                 self.after_cancel(self.after_id)
             except Exception:
                 pass
             self.after_id = None
-        self._close_log()
+        if self.session is not None:
+            self.session.stop()
         self.btn_stop.config(state="disabled")
         self.btn_start.config(state="normal")
+        self.btn_arm.config(state="disabled")
+        self.btn_fire.config(state="disabled")
+        self._update_capture_status()
         self.status.set("Connected (stopped)")
+        if self.session is not None:
+            if self.session.last_run_id is not None:
+                self.status.set(f"Connected (stopped, run {self.session.last_run_id} cataloged)")
+            self._report_catalog()
 
     def disconnect(self):
         self.stop()
-        self._cleanup_tasks()
+        if self.session is not None:
+            self.session.disconnect()
+            self.session = None
         self.btn_connect.config(state="normal")
         self.btn_disconnect.config(state="disabled")
         self.btn_start.config(state="disabled")
         self.btn_stop.config(state="disabled")
         self.status.set("Disconnected")
-        for v in self.tc_vals + self.ai_vals:
-            v.set("—")
-
-    def _cleanup_tasks(self):
-        for t in (self.tc_task, self.ai_task):
-            if t is not None:
-                try:
-                    t.close()
-                except Exception:
-                    pass
-        self.tc_task = None
-        self.ai_task = None
+        for values in self.readouts.values():
+            for v in values:
+                v.set("—")
 
     def _tick(self):
         if not self.running:
             return
 
         try:
-            tc = self._read_latest(self.tc_task, 3)
-            ai = self._read_latest(self.ai_task, 4)
-
-            updated = False
-            if tc is not None:
-                self.last_tc_raw = tc
-                updated = True
-            if ai is not None:
-                self.last_ai_raw = ai
-                updated = True
-
-            tc_cal = [self._apply_calibration(f"TC{i}", v) for i, v in enumerate(self.last_tc_raw)]
-            ai_cal = [self._apply_calibration(f"AI{i}", v) for i, v in enumerate(self.last_ai_raw)]
-
-            if any(v is not None for v in self.last_tc_raw):
-                for i in range(3):
-                    self.tc_vals[i].set(self._format_value(tc_cal[i], ".2f"))
-            if any(v is not None for v in self.last_ai_raw):
-                for i in range(4):
-                    self.ai_vals[i].set(self._format_value(ai_cal[i], ".4f"))
-
-            if self.log_writer and updated:
-                row = [time.strftime("%Y-%m-%d %H:%M:%S")]
-                row.extend(self.last_tc_raw)
-                row.extend(tc_cal)
-                row.extend(self.last_ai_raw)
-                row.extend(ai_cal)
-                self.log_writer.writerow(row)
-                self.log_file.flush()
+            blocks = self.session.poll()
+            for block in blocks:
+                chart = self.charts.get(block.group)
+                if chart is not None:
+                    chart.push(block.times(), block.cal)
+
+            for group, values in self.readouts.items():
+                if all(v is None for v in self.session.latest_raw[group]):
+                    continue
+                fmt = ".2f" if group == "tc" else ".4g" if group.endswith("_derived") else ".4f"
+                for var, value in zip(values, self.session.latest_calibrated(group)):
+                    var.set(self._format_value(value, fmt))
+
+            self.acq_stats.set(self._format_stats(self.session.stats()))
+            self._update_capture_status()
+
+            if self.session.replay_finished():
+                self.stop()
+                self.status.set("Replay finished")
+                return
 
         except Exception as e:
             # Stop acquisition but keep connection so user can retry
-            self.running = False
-            self._close_log()
-            self.btn_stop.config(state="disabled")
-            self.btn_start.config(state="normal")
+            self.stop()
             self.status.set("Error (stopped)")
             messagebox.showerror("Read failed", f"{type(e).__name__}: {e}")
             return
@@ -509,27 +674,44 @@ class NiDaqGui(tk.Tk):
 
     def open_calibration_dialog(self):
         dialog = tk.Toplevel(self)
-        dialog.title("Calibration (2-point)")
+        dialog.title("Calibration")
         dialog.transient(self)
         dialog.grab_set()
 
+        # Curve "2-point" uses raw1..eng2; linear/cubic take raw:eng pairs
+        # ("0.5:0, 1.0:12.5, ...") and poly takes c0, c1, c2 ...
         keys = ("raw1", "eng1", "raw2", "eng2")
-        ttk.Label(dialog, text="Channel").grid(row=0, column=0, padx=6, pady=6, sticky="w")
-        for col, key in enumerate(keys, start=1):
-            ttk.Label(dialog, text=key).grid(row=0, column=col, padx=6, pady=6, sticky="w")
+        curves = ("2-point",) + CURVE_FITS + ("poly",)
+        headings = ("Channel",) + keys + ("Curve", "Points raw:eng / poly c0, c1, ...")
+        for col, text in enumerate(headings):
+            ttk.Label(dialog, text=text).grid(row=0, column=col, padx=6, pady=6, sticky="w")
+
+        def curve_fields(entry):
+            if entry.get("poly") is not None:
+                return "poly", format_coefficients(entry["poly"])
+            if entry.get("points") is not None:
+                return entry.get("fit") or "linear", format_points(entry["points"])
+            return "2-point", ""
 
         entries = {}
         for row, name in enumerate(self._channel_names(), start=1):
             ttk.Label(dialog, text=name).grid(row=row, column=0, padx=6, pady=4, sticky="w")
             entries[name] = {}
+            entry = self.calibration.get(name, {})
             for col, key in enumerate(keys, start=1):
-                value = self.calibration.get(name, {}).get(key, 0.0)
-                var = tk.StringVar(value=str(value))
+                var = tk.StringVar(value=str(entry.get(key, 0.0)))
                 ttk.Entry(dialog, textvariable=var, width=10).grid(row=row, column=col, padx=4, pady=4, sticky="w")
                 entries[name][key] = var
+            curve, text = curve_fields(entry)
+            entries[name]["curve"] = tk.StringVar(value=curve)
+            entries[name]["points"] = tk.StringVar(value=text)
+            ttk.Combobox(dialog, textvariable=entries[name]["curve"], values=curves, width=8, state="readonly").grid(
+                row=row, column=len(keys) + 1, padx=4, pady=4, sticky="w")
+            ttk.Entry(dialog, textvariable=entries[name]["points"], width=40).grid(
+                row=row, column=len(keys) + 2, padx=4, pady=4, sticky="w")
 
         btns = ttk.Frame(dialog)
-        btns.grid(row=len(self._channel_names()) + 1, column=0, columnspan=5, pady=10, sticky="e")
+        btns.grid(row=len(self._channel_names()) + 1, column=0, columnspan=len(headings), pady=10, sticky="e")
 
         def apply_defaults():
             defaults = self._default_calibration()
@@ -538,6 +720,8 @@ class NiDaqGui(tk.Tk):
             for name in self._channel_names():
                 for key in keys:
                     entries[name][key].set(str(defaults[name][key]))
+                entries[name]["curve"].set("2-point")
+                entries[name]["points"].set("")
 
         def save_and_close():
             new_cal = self._default_calibration()
@@ -550,6 +734,18 @@ class NiDaqGui(tk.Tk):
                         messagebox.showerror("Invalid value", f"{name} {key} must be a number.")
                         return
                     new_cal[name][key] = value
+                curve = entries[name]["curve"].get()
+                text = entries[name]["points"].get().strip()
+                if curve == "2-point":
+                    continue
+                try:
+                    if curve == "poly":
+                        new_cal[name].update(normalize_curve({"poly": text}))
+                    else:
+                        new_cal[name].update(normalize_curve({"fit": curve, "points": text}))
+                except ValueError as exc:
+                    messagebox.showerror("Invalid curve", f"{name}: {exc}")
+                    return
             self.calibration = new_cal
             self._save_calibration()
             dialog.destroy()
@@ -559,6 +755,10 @@ class NiDaqGui(tk.Tk):
         ttk.Button(btns, text="Save", command=save_and_close).pack(side="right", padx=5)
 
     def on_close(self):
+        if self.busy:
+            # Let the worker finish so its tasks are closed properly
+            self.close_when_idle = True
+            return
         try:
             self.disconnect()
         except Exception:
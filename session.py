@@ -0,0 +1,566 @@
+import os
+import time
+
+from acquisition import BlockQueue, TaskReader, plan_buffer
+from calibration import CalibrationEngine, default_calibration
+from catalog import CATALOG_FILE, Catalog, RunStats
+from capture import TriggeredCapture
+from channelmap import ChannelMap
+from daqbackend import load_backend
+from datalog import AsyncLogWriter, BinaryLogger, CsvLogger, FlushPolicy, part_path
+from derived import DerivedEngine
+from loadcell import SerialReader
+from logreader import ReplayReader, open_recording
+from telemetry import TelemetryServer
+from timebase import StreamAligner, Timebase, share_start_trigger
+
+
+TC_TYPES = ("J", "K", "T", "E", "N", "R", "S", "B")
+# Typical streaming rate of a load-cell indicator when the config omits it
+SERIAL_RATE = 80.0
+
+
+def _no_progress(text):
+    pass
+
+
+def rates_for_period(period_ms):
+    # Historic GUI defaults: sample a few times faster than the display.
+    ui_rate = 1000.0 / period_ms
+    tc_rate = max(1.0, min(10.0, ui_rate * 2.0))
+    ai_rate = max(10.0, min(1000.0, ui_rate * 10.0))
+    return tc_rate, ai_rate
+
+
+class AcquisitionSession:
+    # Everything between the DAQ tasks and the disk: tasks, reader threads,
+    # calibration and logging. Shared by the Tk GUI and the headless CLI.
+    def __init__(self, backend_name, tc_module, ai_module, tc_type="K", calibration=None, channel_map=None, derived=None,
+                 replay=None, replay_speed=1.0):
+        self.backend_name = backend_name
+        self.tc_module = tc_module
+        self.ai_module = ai_module
+        self.tc_type = tc_type
+        # Replay: a recorded log (path or Recording) stands in for the DAQ
+        # and its layout replaces the configured channel map
+        self.replay = open_recording(replay) if isinstance(replay, str) else replay
+        self.replay_speed = replay_speed
+        if self.replay is not None:
+            channel_map = ChannelMap.from_groups(self.replay.acquired_groups())
+            if calibration is None and self.replay.calibration:
+                calibration = {name: dict(entry) for name, entry in self.replay.calibration.items()}
+        self.channel_map = channel_map or ChannelMap.default()
+        # Derived channels run on the fastest (AI) timeline where possible
+        self.derived = DerivedEngine(derived or {}, self.channel_map.groups, priority=["ai"])
+        # Acquired groups followed by the derived ones; logs, plots and the
+        # latest values cover both, tasks and readers only the acquired ones
+        self.groups = self.channel_map.groups + self.derived.groups
+
+        self.backend = None
+        # One DAQmx task per group (channel kind), in channel map order
+        self.tasks = {}
+        # Serial load-cell ports by group, read by their own threads
+        self.serial_ports = {}
+        self.group_rates = {}
+        self.readers = []
+        self.block_queue = BlockQueue()
+        # Worst reader stall seen so far (s); sizes the next run's buffers
+        self.consumer_latency = 0.5
+        self.buffer_plan = {}
+        self.reader_stats = {}
+        self.logger = None
+        self.flush_policy = FlushPolicy()
+        self.last_log_rows = 0
+        # Every closed log is added to the run catalog in its folder (None:
+        # off) with this operator/notes and the statistics of the run
+        self.catalog_file = CATALOG_FILE
+        self.run_info = {}
+        self.run_stats = None
+        self.last_run_id = None
+        self.catalog_error = None
+        self._log_mode = None
+        self._log_directory = None
+        self.running = False
+        self.timebase = Timebase()
+        self.aligner = None
+        self.capture = None
+        self.telemetry = None
+        # Shared-memory ring (shmring.ShmRing) that raw blocks are copied
+        # into, set when this session runs in an acquisition process
+        self.ring = None
+
+        self.calibration = calibration or default_calibration(self.channel_names())
+        self.cal_engine = CalibrationEngine(self.calibration, self.groups)
+        self.latest_raw = {group: [None] * len(names) for group, names in self.groups}
+        self.latest_time = {}
+        self.samples = {}
+        self.gap_samples = {}
+        self._next_index = {}
+
+    def channel_names(self):
+        return self.channel_map.names()
+
+    def set_calibration(self, calibration):
+        # Swap in a freshly compiled engine; readers of the old one are unaffected.
+        self.calibration = calibration
+        self.cal_engine = CalibrationEngine(calibration, self.groups)
+
+    @property
+    def connected(self):
+        return bool(self.tasks or self.serial_ports) or self.replay is not None
+
+    def _tc_enum(self, tc_type=None):
+        ThermocoupleType = self.backend.ThermocoupleType
+        key = (tc_type or self.tc_type or "K").strip().upper()
+        if key not in TC_TYPES:
+            key = "K"
+        return getattr(ThermocoupleType, key)
+
+    def connect(self, progress=None):
+        # progress(text), if given, is called before each slow driver call
+        # (the GUI runs this on a worker thread and shows the text)
+        if self.connected:
+            return
+        progress = progress or _no_progress
+        devices = {"thermocouple": self.tc_module, "voltage": self.ai_module}
+
+        try:
+            self.backend = load_backend(self.backend_name)
+
+            # One task per channel kind; a cDAQ task can span every module
+            # of that kind in the chassis, so they share one sample clock.
+            for group, names in self.channel_map.groups:
+                kind = self.channel_map.kind(group)
+                if kind == "serial":
+                    module = self.channel_map.serial_module(group)
+                    progress(f"Opening {module.device}")
+                    self.serial_ports[group] = self.backend.open_serial(
+                        module.device, module.baudrate, module.rate or SERIAL_RATE, len(names)
+                    )
+                    continue
+                channels = self.channel_map.physical_channels(group, devices)
+                progress(f"Creating {group.upper()} task")
+                task = self.backend.Task(new_task_name=f"{group.upper()}_Task")
+                self.tasks[group] = task
+                for physical, module in channels:
+                    progress(f"Adding {physical}")
+                    if kind == "thermocouple":
+                        task.ai_channels.add_ai_thrmcpl_chan(
+                            physical_channel=physical,
+                            thermocouple_type=self._tc_enum(module.tc_type),
+                            units=self.backend.TemperatureUnits.DEG_C
+                        )
+                    else:
+                        task.ai_channels.add_ai_voltage_chan(physical)
+                task.in_stream.read_all_avail_samp = True
+        except Exception:
+            self._cleanup_tasks()
+            raise
+
+    def _configure_timing(self, tc_rate, ai_rate):
+        kind_rates = {"thermocouple": float(tc_rate), "voltage": float(ai_rate)}
+        self.group_rates = {}
+        self.buffer_plan = {}
+        if self.replay is not None:
+            self.group_rates = {group: self.replay.rates.get(group) for group, _ in self.channel_map.groups}
+            return
+        for group, names in self.channel_map.groups:
+            if group in self.serial_ports:
+                self.group_rates[group] = self.channel_map.serial_module(group).rate or SERIAL_RATE
+                continue
+            task = self.tasks[group]
+            rate = kind_rates[self.channel_map.kind(group)]
+            self.group_rates[group] = rate
+            buffer, chunk = plan_buffer(rate, len(names), self.consumer_latency)
+            task.timing.cfg_samp_clk_timing(
+                rate=rate,
+                sample_mode=self.backend.AcquisitionType.CONTINUOUS,
+                samps_per_chan=buffer,
+            )
+            try:
+                # DAQmx may round the buffer up; report what it really uses
+                buffer = int(task.in_stream.input_buf_size)
+            except Exception:
+                pass
+            self.buffer_plan[group] = {"rate": rate, "buffer_samples": buffer, "chunk_samples": chunk}
+
+    def rates(self):
+        rates = dict(self.group_rates)
+        for group, home in self.derived.group_home.items():
+            rates[group] = rates.get(home)
+        return rates
+
+    def start(self, tc_rate, ai_rate, progress=None):
+        if not self.connected:
+            raise RuntimeError("Not connected.")
+        if self.running:
+            return
+        progress = progress or _no_progress
+        self.last_run_id = None
+        try:
+            self._start_acquisition(tc_rate, ai_rate, progress)
+        except Exception:
+            self._stop_readers()
+            raise
+        self.running = True
+        if self.telemetry is not None:
+            self.telemetry.set_layout(self.groups, self.rates(), self.timebase.wall_t0)
+
+    def _start_acquisition(self, tc_rate, ai_rate, progress):
+        progress("Configuring sample clocks")
+        self._configure_timing(tc_rate, ai_rate)
+        progress("Starting tasks")
+        self._start_tasks()
+        progress("Starting readers")
+        self._start_readers()
+
+    def _master_group(self):
+        if "ai" in self.tasks:
+            return "ai"
+        return next(iter(self.tasks), self.groups[0][0])
+
+    def _start_tasks(self):
+        # AI is the master: the other tasks are armed on its start trigger,
+        # then AI starts every sample clock on the same edge, and t = 0 for
+        # every stream.
+        tb = self.timebase
+        if not self.tasks:
+            tb.mark_start()
+            if self.replay is not None and self.replay.t0 is not None:
+                # Logs written during a replay keep the recording's wall clock
+                tb.wall_t0 = self.replay.t0
+            return
+        master = self._master_group()
+        slaves = [group for group in self.tasks if group != master]
+        tb.synchronized = share_start_trigger(self.tasks[master], [self.tasks[g] for g in slaves])
+        if tb.synchronized:
+            for group in slaves:
+                self.tasks[group].start()
+            tb.mark_start()
+            self.tasks[master].start()
+            return
+
+        # Software start: estimate each task's start as the midpoint of its
+        # start() call on the monotonic clock.
+        tb.mark_start()
+        before = tb.now()
+        for group in slaves + [master]:
+            self.tasks[group].start()
+            after = tb.now()
+            tb.set_offset(group, (before + after) / 2.0)
+            before = after
+
+    def _start_readers(self):
+        self.block_queue.clear()
+        self.latest_raw = {group: [None] * len(names) for group, names in self.groups}
+        self.latest_time = {}
+        self.samples = {group: 0 for group, _ in self.groups}
+        self.gap_samples = {group: 0 for group, _ in self.groups}
+        self._next_index = {group: 0 for group, _ in self.groups}
+        self.derived.reset()
+        self.readers = self._make_readers()
+        for reader in self.readers:
+            reader.start()
+
+    def _make_readers(self):
+        if self.replay is not None:
+            return [ReplayReader(self.replay, self.channel_map.groups, self.block_queue, speed=self.replay_speed)]
+        return [
+            self._make_reader(group, self.tasks.get(group), len(names), self.group_rates[group])
+            for group, names in self.channel_map.groups
+        ]
+
+    def _make_reader(self, group, task, n_channels, rate):
+        if task is None:
+            return SerialReader(group, self.serial_ports[group], n_channels, rate, self.block_queue, clock=self.timebase.now)
+        plan = self.buffer_plan.get(group, {})
+        return TaskReader(
+            group,
+            task,
+            n_channels,
+            rate,
+            self.block_queue,
+            chunk=plan.get("chunk_samples"),
+            buffer_size=plan.get("buffer_samples"),
+            t_offset=self.timebase.offset(group),
+            clock=self.timebase.now,
+        )
+
+    def _stop_readers(self):
+        for reader in self.readers:
+            reader.stop()
+        # Stopping the tasks aborts any blocking read still in progress.
+        for t in self.tasks.values():
+            try:
+                t.stop()
+            except Exception:
+                pass
+        for reader in self.readers:
+            reader.join(timeout=2.0)
+        if self.readers:
+            self.reader_stats = {reader.group: reader.stats.as_dict() for reader in self.readers}
+            worst = max(stats["max_unread_interval"] for stats in self.reader_stats.values())
+            self.consumer_latency = max(0.25, worst)
+        self.readers = []
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._stop_readers()
+        # Log whatever the readers queued before they exited
+        try:
+            self._consume(self.block_queue.drain())
+        except Exception:
+            pass
+        self.close_log()
+        if self.capture is not None:
+            if self.capture.state == "armed":
+                self.capture = None
+            else:
+                self.capture.finish()
+
+    def disconnect(self):
+        self.stop()
+        self.stop_telemetry()
+        self._cleanup_tasks()
+
+    def _cleanup_tasks(self):
+        for t in list(self.tasks.values()) + list(self.serial_ports.values()):
+            try:
+                t.close()
+            except Exception:
+                pass
+        self.tasks = {}
+        self.serial_ports = {}
+
+    def open_log(self, mode, directory):
+        if self.logger:
+            return self.logger.path
+        os.makedirs(directory, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        if mode == "Binary":
+            path = os.path.join(directory, f"log_{timestamp}")
+        else:
+            path = os.path.join(directory, f"log_{timestamp}.csv")
+        calibration = {name: dict(entry) for name, entry in self.calibration.items()}
+        metadata = self.log_metadata()
+        if self.run_info:
+            metadata["run"] = dict(self.run_info)
+        offsets = dict(self.timebase.offsets)
+        timed = list(self.serial_ports)
+        if self.replay is not None:
+            # Replayed blocks carry the recorded timestamps
+            timed = [group for group, _ in self.channel_map.groups]
+        for group, home in self.derived.group_home.items():
+            offsets[group] = self.timebase.offset(home)
+            if home in timed:
+                timed.append(group)
+
+        def open_sink(part):
+            # Runs on the writer thread for rotation parts after the first
+            if mode == "Binary":
+                sink = BinaryLogger(
+                    part_path(path, part),
+                    self.groups,
+                    self.rates(),
+                    calibration=calibration,
+                    t0=self.timebase.wall_t0,
+                    offsets=offsets,
+                    timed=timed,
+                )
+            else:
+                sink = CsvLogger(part_path(path, part), self.groups, mode=mode, t0=self.timebase.wall_t0)
+                sink.update_meta("rates", self.rates())
+                sink.update_meta("calibration", calibration)
+            for key, value in metadata.items():
+                sink.update_meta(key, value)
+            if part:
+                sink.update_meta("part", part)
+            return sink
+
+        self.logger = AsyncLogWriter(open_sink, policy=self.flush_policy)
+        if self.logger.aligned:
+            self.aligner = StreamAligner(self._master_group(), [group for group, _ in self.groups])
+        self.run_stats = RunStats(self.groups)
+        self.last_run_id = None
+        self.catalog_error = None
+        self._log_mode = mode
+        self._log_directory = directory
+        return path
+
+    def close_log(self):
+        if self.logger:
+            if self.aligner is not None:
+                self._write_aligned(flush=True)
+            stats = self.stats()
+            self.logger.update_meta("stats", stats)
+            self.logger.close()
+            self.last_log_rows = self.logger.rows_written
+            if self.catalog_file:
+                self._record_run(self.logger.paths, stats)
+        self.logger = None
+        self.aligner = None
+        self.run_stats = None
+
+    def _record_run(self, paths, stats):
+        # A catalog problem must not cost the run: the log is already closed
+        try:
+            metadata = self.log_metadata()
+            metadata["stats"] = stats
+            with Catalog(os.path.join(self._log_directory, self.catalog_file)) as catalog:
+                self.last_run_id = catalog.record_run(
+                    paths,
+                    self.run_stats,
+                    started=self.timebase.wall_t0,
+                    mode=self._log_mode,
+                    operator=self.run_info.get("operator", ""),
+                    notes=self.run_info.get("notes", ""),
+                    rates=self.rates(),
+                    channel_config=self.channel_map.as_config(),
+                    calibration={name: dict(entry) for name, entry in self.calibration.items()},
+                    metadata=metadata,
+                )
+        except Exception as exc:
+            self.catalog_error = exc
+
+    def start_telemetry(self, port, host="0.0.0.0"):
+        # Serves calibrated blocks to network clients until disconnect
+        if self.telemetry is None:
+            server = TelemetryServer(host, port)
+            server.start()
+            self.telemetry = server
+            if self.running:
+                server.set_layout(self.groups, self.rates(), self.timebase.wall_t0)
+        return self.telemetry.port
+
+    def stop_telemetry(self):
+        if self.telemetry is not None:
+            self.telemetry.stop()
+            self.telemetry = None
+
+    def arm_capture(self, channel, mode, level, pre_s, post_s, directory):
+        # Replaces any previous capture; its file (if saved) is kept
+        if not self.running:
+            raise RuntimeError("Start acquisition before arming a capture.")
+        self.capture = TriggeredCapture(
+            self.groups,
+            self.rates(),
+            channel,
+            mode,
+            level,
+            pre_s=pre_s,
+            post_s=post_s,
+            directory=directory,
+            calibration={name: dict(entry) for name, entry in self.calibration.items()},
+            t0=self.timebase.wall_t0,
+            metadata=self.log_metadata(),
+        )
+        return self.capture
+
+    def fire_capture(self):
+        if self.capture is not None:
+            self.capture.fire()
+
+    def replay_finished(self):
+        # True once a replay has sent the whole recording (poll() drains the rest)
+        return self.replay is not None and self.running and not any(reader.is_alive() for reader in self.readers)
+
+    def poll(self):
+        # Called periodically by the consumer (Tk tick or CLI loop). Raises
+        # the first reader error so the caller can stop and report it.
+        for reader in self.readers:
+            if reader.error is not None:
+                raise reader.error
+        return self._consume(self.block_queue.drain())
+
+    def _consume(self, blocks):
+        # Calibrate each block once, then run the derived channels on it.
+        # Returns the acquired blocks followed by the derived ones, with
+        # their calibrated values in block.cal.
+        calibrated = []
+        for block in blocks:
+            cal = block.cal = self.cal_engine.apply(block.group, block.data)
+            calibrated.append((block, cal))
+            for out in self.derived.process(block, cal):
+                out.cal = out.data
+                calibrated.append((out, out.data))
+        if self.ring is not None:
+            for block, cal in calibrated:
+                self.ring.write(block, cal)
+        return self._deliver(calibrated)
+
+    def _deliver(self, calibrated):
+        # Bookkeeping, logging, run statistics, capture and telemetry of
+        # calibrated (block, cal) pairs
+        blocks = [block for block, _ in calibrated]
+
+        for block in blocks:
+            gap = block.start_index - self._next_index.get(block.group, 0)
+            if gap > 0:
+                self.gap_samples[block.group] = self.gap_samples.get(block.group, 0) + gap
+            self._next_index[block.group] = block.start_index + block.n_samples
+            self.samples[block.group] = self.samples.get(block.group, 0) + block.n_samples
+            # Display only needs the newest column of each block
+            self.latest_raw[block.group] = block.latest()
+            self.latest_time[block.group] = block.last_time()
+
+        if self.logger and blocks:
+            if self.aligner is not None:
+                for block, cal in calibrated:
+                    self.aligner.push(block.group, block.times(), block.data, cal)
+                self._write_aligned()
+            elif self.logger.full_rate:
+                for block, cal in calibrated:
+                    self.logger.write_block(block, cal if self.logger.calibrated else None)
+            else:
+                raw = [self.latest_raw[group] for group, _ in self.groups]
+                cal = [self.latest_calibrated(group) for group, _ in self.groups]
+                self.logger.write_latest(max(self.latest_time.values()), raw, cal)
+
+        if self.run_stats is not None:
+            for block, cal in calibrated:
+                self.run_stats.update(block.group, block.times(), cal)
+
+        if self.capture is not None:
+            for block, cal in calibrated:
+                self.capture.push(block, cal)
+        if self.telemetry is not None:
+            self.telemetry.publish(calibrated)
+        return blocks
+
+    def _write_aligned(self, flush=False):
+        aligned = self.aligner.pop(flush=flush)
+        if aligned is not None:
+            self.logger.write_aligned(*aligned)
+
+    def latest_calibrated(self, group):
+        return self.cal_engine.apply_latest(group, self.latest_raw[group])
+
+    def stats(self):
+        if self.readers:
+            readers = {reader.group: reader.stats.as_dict() for reader in self.readers}
+        else:
+            readers = dict(self.reader_stats)
+        return {
+            "elapsed": self.timebase.now(),
+            "samples": dict(self.samples),
+            "gap_samples": dict(self.gap_samples),
+            "dropped_blocks": self.block_queue.dropped,
+            "rows_written": self.logger.rows_written if self.logger else self.last_log_rows,
+            "log_dropped_items": self.logger.dropped_items if self.logger else 0,
+            "log_backlog": self.logger.backlog if self.logger else 0,
+            "log_max_items": self.logger.max_items if self.logger else 0,
+            "capture": self.capture.state if self.capture is not None else None,
+            "telemetry_clients": self.telemetry.client_count if self.telemetry is not None else 0,
+            "readers": readers,
+        }
+
+    def log_metadata(self):
+        metadata = {
+            "time_sync": "start trigger" if self.timebase.synchronized else "software start",
+            "buffers": dict(self.buffer_plan),
+        }
+        if self.replay is not None:
+            metadata["replay"] = {"source": self.replay.path, "speed": self.replay_speed}
+        return metadata
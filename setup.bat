@@ -24,6 +24,7 @@ IF ERRORLEVEL 1 goto error
 
 echo Installing required Python packages...
 python -m pip install nidaqmx
+python -m pip install numpy
 python -m pip install pyserial
 IF ERRORLEVEL 1 goto error
 
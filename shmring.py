@@ -0,0 +1,290 @@
+import argparse
+import json
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from acquisition import SampleBlock
+
+
+# Sample blocks in shared memory, written by the acquisition process and
+# read by any number of other processes without copies or locks. Each
+# block carries its raw values and, once the producer has calibrated it,
+# the calibrated values; derived-channel blocks are values only.
+#
+# Fixed-size slots, one block (or part of a block) per slot. The producer
+# numbers blocks 1, 2, 3, ... and writes block `seq` into slot seq % n_slots:
+# it zeroes the slot's seq, writes data and fields, stores seq, then
+# publishes it as write_seq. A reader remembers the next seq it wants; if
+# the producer is more than a ring ahead the missed blocks are counted as
+# an overrun (and show up as a sample gap downstream). Blocks are returned
+# as read-only views into the slots; the next read() re-checks the slot
+# seqs of the previous batch and counts any block that was overwritten
+# while the consumer still used it as torn.
+#
+# Memory: a control record and the JSON layout in the first HEADER_BYTES,
+# then n_slots slot records, then n_slots x slot_floats float64 values
+# (channel-major raw data, calibrated data when the slot's `cal` is
+# CAL_ROWS, then the times of software-timed groups).
+RING_MAGIC = 0x474E4952  # "RING"
+RING_VERSION = 2
+HEADER_BYTES = 16384
+LAYOUT_OFFSET = 1024
+CONTROL = np.dtype([
+    ("magic", "<u4"), ("version", "<u4"), ("n_slots", "<u4"), ("slot_floats", "<u4"),
+    ("write_seq", "<u8"), ("state", "<u4"), ("layout_bytes", "<u4"), ("error", "S256"),
+])
+SLOT = np.dtype([
+    ("seq", "<u8"), ("start_index", "<i8"), ("rate", "<f8"), ("t_offset", "<f8"),
+    ("group", "<u4"), ("n_channels", "<u4"), ("n_samples", "<u4"), ("timed", "<u4"),
+    ("cal", "<u4"), ("reserved", "<u4"),
+])
+# Slot `cal`: raw values only, calibrated rows after the raw ones, or data
+# that already are calibrated values (derived channels)
+CAL_NONE, CAL_ROWS, CAL_IS_DATA = range(3)
+# Producer state, so consumers can tell a quiet ring from a finished run
+IDLE, RUNNING, FINISHED, FAILED = range(4)
+# Slots a reader leaves between itself and the producer when it has been
+# lapped, so the blocks it resumes with are not overwritten right away
+RESUME_MARGIN = 8
+
+
+def _attach_untracked(name):
+    # Python < 3.13 registers every attached segment with the resource
+    # tracker, which unlinks it when this process exits; a consumer must
+    # not take the ring down with it.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class ShmRing:
+    def __init__(self, shm, owner=False, writable=True):
+        self.shm = shm
+        self.name = shm.name
+        self.owner = owner
+        buf = shm.buf
+        self.control = np.ndarray((), dtype=CONTROL, buffer=buf)
+        if int(self.control["magic"]) != RING_MAGIC or int(self.control["version"]) != RING_VERSION:
+            raise ValueError(f"{self.name} is not a sample ring")
+        self.n_slots = int(self.control["n_slots"])
+        self.slot_floats = int(self.control["slot_floats"])
+        layout = bytes(buf[LAYOUT_OFFSET:LAYOUT_OFFSET + int(self.control["layout_bytes"])])
+        self.groups = [(group, list(names)) for group, names in json.loads(layout.decode("utf-8"))["groups"]]
+        self.group_ids = {group: i for i, (group, _) in enumerate(self.groups)}
+        self.slots = np.ndarray((self.n_slots,), dtype=SLOT, buffer=buf, offset=HEADER_BYTES)
+        self.data = np.ndarray(
+            (self.n_slots, self.slot_floats), dtype=np.float64, buffer=buf,
+            offset=HEADER_BYTES + self.n_slots * SLOT.itemsize,
+        )
+        if not writable:
+            for array in (self.control, self.slots, self.data):
+                array.flags.writeable = False
+
+    @classmethod
+    def create(cls, groups, n_slots=256, slot_floats=16384):
+        # 256 x 128 KiB slots: several seconds of every group at full rate
+        widest = max((len(names) for _, names in groups), default=1)
+        if slot_floats < 2 * widest + 1:
+            raise ValueError(f"Ring slots of {slot_floats} values cannot hold {widest} channels")
+        layout = json.dumps({"groups": [[group, list(names)] for group, names in groups]}).encode("utf-8")
+        if LAYOUT_OFFSET + len(layout) > HEADER_BYTES:
+            raise ValueError("Too many channels for the ring header")
+        size = HEADER_BYTES + n_slots * (SLOT.itemsize + 8 * slot_floats)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        control = np.ndarray((), dtype=CONTROL, buffer=shm.buf)
+        control["magic"] = RING_MAGIC
+        control["version"] = RING_VERSION
+        control["n_slots"] = n_slots
+        control["slot_floats"] = slot_floats
+        control["write_seq"] = 0
+        control["state"] = IDLE
+        control["layout_bytes"] = len(layout)
+        shm.buf[LAYOUT_OFFSET:LAYOUT_OFFSET + len(layout)] = layout
+        del control
+        ring = cls(shm, owner=True)
+        ring.slots["seq"] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, writable=False, track=True):
+        # track=False for consumers that are not children of the creator
+        shm = shared_memory.SharedMemory(name=name) if track else _attach_untracked(name)
+        return cls(shm, writable=writable)
+
+    @property
+    def write_seq(self):
+        return int(self.control["write_seq"])
+
+    @property
+    def state(self):
+        return int(self.control["state"])
+
+    @property
+    def error(self):
+        return self.control["error"].tobytes().rstrip(b"\0").decode("utf-8", "replace")
+
+    def set_state(self, state, error=""):
+        self.control["error"] = error.encode("utf-8")[:255]
+        self.control["state"] = state
+
+    def write(self, block, cal=None):
+        # Producer only. Blocks wider than a slot are split by samples.
+        # cal: the block's calibrated values, or block.data itself when the
+        # block already holds calibrated values
+        group = self.group_ids.get(block.group)
+        if group is None or not block.n_samples:
+            return
+        data = block.data
+        n_channels, n = data.shape
+        timed = block.t is not None
+        mode = CAL_NONE if cal is None else CAL_IS_DATA if cal is data else CAL_ROWS
+        rows = n_channels * (2 if mode == CAL_ROWS else 1)
+        per_slot = self.slot_floats // (rows + timed)
+        slots = self.slots
+        for first in range(0, n, per_slot):
+            m = min(per_slot, n - first)
+            seq = int(self.control["write_seq"]) + 1
+            i = seq % self.n_slots
+            slots["seq"][i] = 0
+            row = self.data[i]
+            row[:n_channels * m].reshape(n_channels, m)[...] = data[:, first:first + m]
+            if mode == CAL_ROWS:
+                row[n_channels * m:rows * m].reshape(n_channels, m)[...] = cal[:, first:first + m]
+            if timed:
+                row[rows * m:(rows + 1) * m] = block.t[first:first + m]
+            slots["start_index"][i] = block.start_index + first
+            slots["rate"][i] = block.rate
+            slots["t_offset"][i] = block.t_offset
+            slots["group"][i] = group
+            slots["n_channels"][i] = n_channels
+            slots["n_samples"][i] = m
+            slots["timed"][i] = timed
+            slots["cal"][i] = mode
+            slots["seq"][i] = seq
+            self.control["write_seq"] = seq
+
+    def close(self):
+        # Views handed out by readers keep the mapping alive; let GC close it
+        self.control = self.slots = self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class RingReaderStats:
+    def __init__(self):
+        self.blocks = 0
+        self.overruns = 0
+        self.lost_blocks = 0
+        self.torn_blocks = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class RingReader:
+    # One consumer's position in a ring; starts at the newest block
+    def __init__(self, ring):
+        self.ring = ring
+        self.next_seq = ring.write_seq + 1
+        self.stats = RingReaderStats()
+        self._batch = []
+
+    def caught_up(self):
+        return self.next_seq > self.ring.write_seq
+
+    def _verify(self):
+        seqs = self.ring.slots["seq"]
+        for i, seq in self._batch:
+            if int(seqs[i]) != seq:
+                self.stats.torn_blocks += 1
+        self._batch = []
+
+    def read(self):
+        # -> SampleBlocks published since the last read, oldest first. Their
+        # data (and cal) are views into the ring, valid until the next read().
+        ring = self.ring
+        self._verify()
+        head = ring.write_seq
+        oldest = head - ring.n_slots + 1
+        if self.next_seq < oldest:
+            resume = min(head + 1, oldest + RESUME_MARGIN)
+            self.stats.overruns += 1
+            self.stats.lost_blocks += resume - self.next_seq
+            self.next_seq = resume
+        slots = ring.slots
+        blocks = []
+        for seq in range(self.next_seq, head + 1):
+            i = seq % ring.n_slots
+            slot = slots[i].copy()
+            n_channels, n = int(slot["n_channels"]), int(slot["n_samples"])
+            mode = int(slot["cal"])
+            rows = n_channels * (2 if mode == CAL_ROWS else 1)
+            t = None
+            if slot["timed"]:
+                t = ring.data[i, rows * n:(rows + 1) * n].copy()
+            if int(slots["seq"][i]) != seq or int(slot["seq"]) != seq:
+                # Overwritten before its header was read
+                self.stats.lost_blocks += 1
+                continue
+            data = ring.data[i, :n_channels * n].reshape(n_channels, n)
+            group = ring.groups[int(slot["group"])][0]
+            block = SampleBlock(group, data, int(slot["start_index"]), float(slot["rate"]), float(slot["t_offset"]), t=t)
+            if mode == CAL_ROWS:
+                block.cal = ring.data[i, n_channels * n:rows * n].reshape(n_channels, n)
+            elif mode == CAL_IS_DATA:
+                block.cal = data
+            blocks.append(block)
+            self._batch.append((i, seq))
+        self.next_seq = head + 1
+        self.stats.blocks += len(blocks)
+        return blocks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attach to an acquisition ring and print its sample rates.")
+    parser.add_argument("name", help="shared memory name (printed by headless.py --process)")
+    parser.add_argument("--seconds", type=float, default=0.0, help="stop after this many seconds (0: until Ctrl+C)")
+    args = parser.parse_args(argv)
+
+    ring = ShmRing.attach(args.name, track=False)
+    reader = RingReader(ring)
+    counts = {}
+    started = last_print = time.monotonic()
+    try:
+        while not args.seconds or time.monotonic() - started < args.seconds:
+            time.sleep(0.05)
+            for block in reader.read():
+                counts[block.group] = counts.get(block.group, 0) + block.n_samples
+            now = time.monotonic()
+            if now - last_print >= 1.0:
+                rates = ", ".join(f"{g} {n / (now - last_print):.0f}/s" for g, n in counts.items()) or "no data"
+                print(f"{rates} | state {ring.state} | {reader.stats.as_dict()}", flush=True)
+                counts = {}
+                last_print = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader = None
+        ring.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,360 @@
+import math
+import threading
+import time
+import weakref
+import zlib
+
+import numpy as np
+
+
+# Minimal stand-in for the parts of the nidaqmx API used by this project.
+# Samples are generated from the wall clock at the configured rate, so the
+# buffer fills (and overflows) exactly like a real continuous task.
+
+READ_ALL_AVAILABLE = -1
+OVERFLOW_ERROR = -200279
+TIMEOUT_ERROR = -200284
+TASK_STOPPED_ERROR = -200088
+
+
+class DaqError(Exception):
+    def __init__(self, message, error_code, task_name=""):
+        super().__init__(f"{message}\nTask Name: {task_name}\nStatus Code: {error_code}")
+        self.error_code = error_code
+        self.task_name = task_name
+
+
+class AcquisitionType:
+    FINITE = "finite"
+    CONTINUOUS = "continuous"
+
+
+class TemperatureUnits:
+    DEG_C = "degC"
+
+
+class ThermocoupleType:
+    J = "J"
+    K = "K"
+    T = "T"
+    E = "E"
+    N = "N"
+    R = "R"
+    S = "S"
+    B = "B"
+
+
+class _Channel:
+    def __init__(self, physical_channel, kind, index):
+        self.physical_channel = physical_channel
+        self.kind = kind
+        self.index = index
+        self.name = physical_channel
+
+
+def _channel_index(physical_channel):
+    tail = physical_channel.rsplit("/", 1)[-1]
+    digits = "".join(c for c in tail if c.isdigit())
+    return int(digits) if digits else 0
+
+
+class _AIChannels:
+    def __init__(self, task):
+        self._task = task
+
+    def add_ai_thrmcpl_chan(self, physical_channel, thermocouple_type=ThermocoupleType.K, units=TemperatureUnits.DEG_C, **kwargs):
+        ch = _Channel(physical_channel, "thermocouple", _channel_index(physical_channel))
+        self._task._channels.append(ch)
+        return ch
+
+    def add_ai_voltage_chan(self, physical_channel, **kwargs):
+        ch = _Channel(physical_channel, "voltage", _channel_index(physical_channel))
+        self._task._channels.append(ch)
+        return ch
+
+    def __len__(self):
+        return len(self._task._channels)
+
+    @property
+    def channel_names(self):
+        return [ch.name for ch in self._task._channels]
+
+
+class _Timing:
+    def __init__(self, task):
+        self._task = task
+        self.samp_clk_rate = 1000.0
+        self.samp_quant_samp_mode = AcquisitionType.FINITE
+        self.samp_quant_samp_per_chan = 1000
+
+    def cfg_samp_clk_timing(self, rate, source="", active_edge=None, sample_mode=AcquisitionType.FINITE, samps_per_chan=1000):
+        self.samp_clk_rate = float(rate)
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = int(samps_per_chan)
+
+
+class _InStream:
+    def __init__(self, task):
+        self._task = task
+        self.read_all_avail_samp = False
+
+    @property
+    def avail_samp_per_chan(self):
+        return max(0, self._task._acquired() - self._task._read_pos)
+
+    @property
+    def total_samp_per_chan_acquired(self):
+        return self._task._acquired()
+
+    @property
+    def input_buf_size(self):
+        return self._task._buffer_size()
+
+
+# Every live task, so a master can start the slaves armed on its trigger
+_TASKS = weakref.WeakSet()
+
+
+class _StartTrigger:
+    def __init__(self, task):
+        self._task = task
+        self.source = None
+
+    @property
+    def term(self):
+        return f"/{self._task.name}/ai/StartTrigger"
+
+    def cfg_dig_edge_start_trig(self, trigger_source, trigger_edge=None):
+        self.source = trigger_source
+
+    def disable_start_trig(self):
+        self.source = None
+
+
+class _Triggers:
+    def __init__(self, task):
+        self.start_trigger = _StartTrigger(task)
+
+
+class Task:
+    def __init__(self, new_task_name=""):
+        self.name = new_task_name
+        self._channels = []
+        self.ai_channels = _AIChannels(self)
+        self.timing = _Timing(self)
+        self.in_stream = _InStream(self)
+        self.triggers = _Triggers(self)
+        self._running = False
+        self._t_start = None
+        self._read_pos = 0
+        self._pending_error = None
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(zlib.crc32(new_task_name.encode()))
+        _TASKS.add(self)
+
+    # --- fault injection -------------------------------------------------
+
+    def inject_error(self, error_code, delay=0.0):
+        # The next read issued at least `delay` seconds from now raises.
+        self._pending_error = (error_code, time.perf_counter() + delay)
+
+    # --- task lifecycle ---------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            self._read_pos = 0
+            self._running = True
+            if self.triggers.start_trigger.source:
+                # Armed: the clock starts when the trigger source task starts
+                self._t_start = None
+                return
+            self._t_start = time.perf_counter()
+        for task in list(_TASKS):
+            if task._running and task._t_start is None and task.triggers.start_trigger.source == self.triggers.start_trigger.term:
+                task._t_start = self._t_start
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+
+    def close(self):
+        self.stop()
+        _TASKS.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _rate(self):
+        return self.timing.samp_clk_rate
+
+    def _buffer_size(self):
+        # DAQmx enforces a minimum buffer for continuous tasks
+        if self.timing.samp_quant_samp_mode == AcquisitionType.CONTINUOUS:
+            return max(self.timing.samp_quant_samp_per_chan, int(self._rate() * 0.1), 2)
+        return self.timing.samp_quant_samp_per_chan
+
+    def _acquired(self):
+        if self._t_start is None:
+            return 0
+        n = int((time.perf_counter() - self._t_start) * self._rate())
+        if self.timing.samp_quant_samp_mode == AcquisitionType.FINITE:
+            n = min(n, self.timing.samp_quant_samp_per_chan)
+        return n
+
+    def _check_errors(self):
+        if self._pending_error is not None:
+            code, due = self._pending_error
+            if time.perf_counter() >= due:
+                self._pending_error = None
+                raise DaqError(_error_message(code), code, self.name)
+        if self._acquired() - self._read_pos > self._buffer_size():
+            raise DaqError(_error_message(OVERFLOW_ERROR), OVERFLOW_ERROR, self.name)
+
+    def read(self, number_of_samples_per_channel=None, timeout=10.0):
+        if not self._running and self._t_start is None:
+            # Like DAQmx, a read on a never-started task starts it implicitly
+            self.start()
+        single = number_of_samples_per_channel is None
+        n = 1 if single else int(number_of_samples_per_channel)
+
+        if n == READ_ALL_AVAILABLE:
+            self._check_errors()
+            if not self.in_stream.read_all_avail_samp and self.timing.samp_quant_samp_mode == AcquisitionType.FINITE:
+                n = self.timing.samp_quant_samp_per_chan - self._read_pos
+            else:
+                n = self.in_stream.avail_samp_per_chan
+
+        deadline = None if timeout is None or timeout < 0 else time.perf_counter() + timeout
+        while True:
+            self._check_errors()
+            available = self.in_stream.avail_samp_per_chan
+            if available >= n:
+                break
+            if not self._running:
+                raise DaqError(_error_message(TASK_STOPPED_ERROR), TASK_STOPPED_ERROR, self.name)
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                raise DaqError(_error_message(TIMEOUT_ERROR), TIMEOUT_ERROR, self.name)
+            wait = (n - available) / self._rate()
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            time.sleep(max(0.0005, min(wait, 0.05)))
+
+        with self._lock:
+            start = self._read_pos
+            self._read_pos += n
+        data = self._generate(start, n)
+
+        if single:
+            values = data[:, 0].tolist()
+            return values[0] if len(values) == 1 else values
+        if data.shape[0] == 1:
+            return data[0].tolist()
+        return data.tolist()
+
+    # --- waveforms --------------------------------------------------------
+
+    def _generate(self, start, n):
+        t = (start + np.arange(n)) / self._rate()
+        out = np.empty((len(self._channels), n))
+        for row, ch in enumerate(self._channels):
+            j = ch.index
+            if ch.kind == "thermocouple":
+                # Ambient, then an EGT-like first-order rise after "ignition"
+                rise = np.where(t > 5.0, 1.0 - np.exp(-(t - 5.0) / 8.0), 0.0)
+                out[row] = 21.5 + j + (520.0 + 40.0 * j) * rise + self._rng.normal(0.0, 0.3, n)
+            else:
+                # Pressure step with a small combustion-like oscillation
+                step = np.where(t > 3.0, 1.0 - np.exp(-(t - 3.0) / 0.4), 0.0)
+                osc = 0.05 * np.sin(2.0 * math.pi * 37.0 * (j + 1) * t)
+                out[row] = 0.5 + 0.1 * j + 2.5 * step + osc + self._rng.normal(0.0, 0.005, n)
+        return out
+
+
+# What enumeration reports for the simulated chassis. Tasks accept any
+# module name, these are only what discovery offers.
+SIM_CHASSIS = "cDAQ9185-SIM"
+SIM_MODULES = (
+    ("Mod1", "NI 9212", "thermocouple", 8),
+    ("Mod2", "NI 9201", "voltage", 8),
+)
+
+
+def list_devices():
+    devices = [{"name": SIM_CHASSIS, "product_type": "cDAQ-9185", "chassis": None, "slot": None,
+                "kind": None, "channels": []}]
+    for slot, (suffix, product, kind, n_channels) in enumerate(SIM_MODULES, start=1):
+        name = SIM_CHASSIS + suffix
+        devices.append({
+            "name": name, "product_type": product, "chassis": SIM_CHASSIS, "slot": slot,
+            "kind": kind, "channels": [f"{name}/ai{i}" for i in range(n_channels)],
+        })
+    return devices
+
+
+class SerialLoadCell:
+    # Stand-in for a pyserial port with a streaming load-cell indicator on
+    # the other end: "ST,GS,+0012.34kg\r\n" frames at `rate` Hz, with thrust
+    # following the simulated ignition at t = 3 s.
+    def __init__(self, port="SIM", baudrate=9600, timeout=0.1, rate=80.0, n_channels=1):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.rate = float(rate)
+        self.n_channels = n_channels
+        self.is_open = True
+        self._t_start = time.perf_counter()
+        self._sent = 0
+        self._pending = b""
+        self._rng = np.random.default_rng(zlib.crc32(str(port).encode()))
+
+    def _produce(self):
+        due = int((time.perf_counter() - self._t_start) * self.rate)
+        n = due - self._sent
+        if n <= 0:
+            return
+        t = (self._sent + np.arange(n)) / self.rate
+        thrust = np.where(t > 3.0, 1.0 - np.exp(-(t - 3.0) / 0.6), 0.0)
+        values = 0.2 + 45.0 * thrust + self._rng.normal(0.0, 0.05, (self.n_channels, n))
+        fields = ",".join(["{:+09.2f}kg"] * self.n_channels)
+        frame = "ST,GS," + fields + "\r\n"
+        self._pending += "".join(frame.format(*column) for column in values.T).encode()
+        self._sent = due
+
+    @property
+    def in_waiting(self):
+        self._produce()
+        return len(self._pending)
+
+    def read(self, size=1):
+        deadline = time.perf_counter() + (self.timeout or 0.0)
+        while True:
+            self._produce()
+            if self._pending or not self.is_open or time.perf_counter() >= deadline:
+                break
+            time.sleep(min(0.01, 1.0 / self.rate))
+        out, self._pending = self._pending[:size], self._pending[size:]
+        return out
+
+    def reset_input_buffer(self):
+        self._produce()
+        self._pending = b""
+
+    def close(self):
+        self.is_open = False
+
+
+def _error_message(code):
+    if code == OVERFLOW_ERROR:
+        return ("The application is not able to keep up with the acquisition. "
+                "Increasing the buffer size, reading the data more frequently, "
+                "or specifying a fixed number of samples to read might correct the problem.")
+    if code == TIMEOUT_ERROR:
+        return ("Some or all of the samples requested have not yet been acquired. "
+                "To wait for the samples to become available use a longer read timeout.")
+    if code == TASK_STOPPED_ERROR:
+        return "The task was stopped while the read was waiting for samples."
+    return "Simulated DAQ error."
@@ -0,0 +1,134 @@
+import abc
+import math
+
+import numpy as np
+
+
+# Streaming spectral estimates for derived channels, e.g. the frequency of
+# a combustion instability on a chamber pressure channel. Samples are cut
+# into Hann-windowed segments of `segment` seconds (rounded to a power of
+# two) with 50 % overlap. All segments completed by a block go through one
+# rfft call, and each one yields a Welch estimate: the mean periodogram of
+# the segments in the last `average` seconds. Memory and work per sample
+# depend only on those settings, never on how long the run has been going.
+DEFAULT_SEGMENT_S = 0.25
+DEFAULT_AVERAGE_S = 1.0
+
+
+class WelchPsd:
+    def __init__(self, segment=DEFAULT_SEGMENT_S, average=DEFAULT_AVERAGE_S):
+        self.segment = float(segment)
+        self.average = float(average)
+        if self.segment <= 0.0 or self.average < 0.0:
+            raise ValueError("Spectral segment and averaging times must be positive")
+        self.reset()
+
+    def reset(self):
+        self.rate = None
+        self.freqs = np.empty(0)
+
+    def _configure(self, rate):
+        self.rate = rate
+        self.nfft = 1 << max(3, int(round(math.log2(max(8.0, self.segment * rate)))))
+        self.hop = self.nfft // 2
+        self.window = np.hanning(self.nfft)
+        # One-sided density in units^2/Hz: sum(psd) * df is the mean square
+        self.scale = 1.0 / (rate * np.sum(self.window ** 2))
+        self.freqs = np.fft.rfftfreq(self.nfft, 1.0 / rate)
+        self.df = rate / self.nfft
+        self.n_average = max(1, int(round(self.average * rate / self.hop)))
+        self.tail = np.empty(0)
+        self.recent = np.empty((0, len(self.freqs)))
+
+    def update(self, x, rate):
+        # -> (ends, psd): for every estimate completed by this block, the
+        # index in x of its last sample and its Welch PSD (estimates x bins)
+        if rate != self.rate:
+            self._configure(rate)
+        pending = np.concatenate([self.tail, x]) if len(self.tail) else np.asarray(x, dtype=np.float64)
+        n_segments = (len(pending) - self.nfft) // self.hop + 1 if len(pending) >= self.nfft else 0
+        ends = np.arange(n_segments) * self.hop + self.nfft - 1 - len(self.tail)
+        self.tail = pending[n_segments * self.hop:].copy()
+        if not n_segments:
+            return ends, np.empty((0, len(self.freqs)))
+
+        segments = np.lib.stride_tricks.sliding_window_view(pending, self.nfft)[::self.hop][:n_segments]
+        segments = (segments - segments.mean(axis=1, keepdims=True)) * self.window
+        power = np.abs(np.fft.rfft(segments, axis=1)) ** 2 * self.scale
+        power[:, 1:-1] *= 2.0
+
+        # Welch: average each periodogram with the ones before it
+        stack = np.concatenate([self.recent, power])
+        sums = np.concatenate([np.zeros((1, stack.shape[1])), np.cumsum(stack, axis=0)])
+        last = len(self.recent) + np.arange(1, n_segments + 1)
+        first = np.maximum(0, last - self.n_average)
+        psd = (sums[last] - sums[first]) / (last - first)[:, None]
+        self.recent = stack[max(0, len(stack) - self.n_average + 1):] if self.n_average > 1 else stack[:0]
+        return ends, psd
+
+    def band(self, fmin, fmax):
+        # Bin mask for fmin <= f <= fmax, without the DC bin
+        return (self.freqs >= max(fmin, self.df)) & (self.freqs <= fmax)
+
+
+class SpectralFilter(abc.ABC):
+    # Derived-channel filter: one value per Welch estimate, held until the
+    # next one (NaN before the first segment is complete). Subclasses reduce
+    # each estimate's band to that value in measure().
+    def __init__(self, fmin, fmax, segment=DEFAULT_SEGMENT_S, average=DEFAULT_AVERAGE_S):
+        self.fmin = float(fmin)
+        self.fmax = float(fmax)
+        if self.fmax <= self.fmin:
+            raise ValueError(f"Spectral band {self.fmin:g}-{self.fmax:g} Hz is empty")
+        self.psd = WelchPsd(segment, average)
+        self.reset()
+
+    def reset(self):
+        self.psd.reset()
+        self.value = np.nan
+
+    @abc.abstractmethod
+    def measure(self, psd, band):
+        # (estimates x bins) PSD, bin mask of the band -> one value per estimate
+        ...
+
+    def __call__(self, x, t, rate):
+        out = np.full(len(x), self.value)
+        ends, psd = self.psd.update(x, rate)
+        if not len(ends):
+            return out
+        band = self.psd.band(self.fmin, self.fmax)
+        if not band.any():
+            values = np.full(len(ends), np.nan)
+        else:
+            values = self.measure(psd, band)
+        latest = np.searchsorted(ends, np.arange(len(x)), side="right") - 1
+        done = latest >= 0
+        out[done] = values[latest[done]]
+        self.value = values[-1]
+        return out
+
+
+class PeakFrequency(SpectralFilter):
+    # Frequency (Hz) of the strongest PSD bin in the band, refined between
+    # bins by a parabola through the log power of its neighbours
+    def measure(self, psd, band):
+        bins = np.flatnonzero(band)
+        inside = psd[:, bins]
+        k = bins[np.argmax(np.where(np.isfinite(inside), inside, -np.inf), axis=1)]
+        rows = np.arange(len(psd))
+        lo = np.maximum(k - 1, 0)
+        hi = np.minimum(k + 1, psd.shape[1] - 1)
+        with np.errstate(all="ignore"):
+            a, b, c = (np.log(psd[rows, i]) for i in (lo, k, hi))
+            shift = 0.5 * (a - c) / (a - 2.0 * b + c)
+        shift = np.where(np.isfinite(shift) & (lo < k) & (k < hi), np.clip(shift, -0.5, 0.5), 0.0)
+        peak = (k + shift) * self.psd.df
+        return np.where(np.isfinite(psd[rows, k]), peak, np.nan)
+
+
+class BandPower(SpectralFilter):
+    # Mean-square value (units^2) of the signal within the band;
+    # sqrt(bandpower(...)) is the band's RMS
+    def measure(self, psd, band):
+        return psd[:, band].sum(axis=1) * self.psd.df
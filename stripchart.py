@@ -0,0 +1,142 @@
+import tkinter as tk
+
+import numpy as np
+
+from acquisition import FALLBACK_RATE, RingBuffer
+
+
+COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2", "#17becf")
+
+
+def minmax_decimate(times, data, t_start, t_end, n_bins):
+    # Per-pixel min/max envelope. Samples are time-sorted, so each pixel is a
+    # contiguous run and one reduceat per statistic covers the whole window.
+    edges = np.linspace(t_start, t_end, n_bins + 1)
+    starts = np.searchsorted(times, edges[:-1], side="left")
+    stops = np.searchsorted(times, edges[1:], side="left")
+    stops[-1] = len(times)
+    filled = stops > starts
+    lo = np.full((data.shape[0], n_bins), np.nan)
+    hi = np.full((data.shape[0], n_bins), np.nan)
+    if data.shape[1] == 0 or not filled.any():
+        return lo, hi
+    idx = np.minimum(starts, data.shape[1] - 1)
+    with np.errstate(invalid="ignore"):
+        lo[:, filled] = np.fmin.reduceat(data, idx, axis=1)[:, filled]
+        hi[:, filled] = np.fmax.reduceat(data, idx, axis=1)[:, filled]
+    return lo, hi
+
+
+class StripChart(tk.Canvas):
+    # Scrolling multi-channel plot. push() only copies into the ring buffer;
+    # the canvas is redrawn on its own timer, at most every redraw_ms, so the
+    # cost of drawing never feeds back into the acquisition path.
+    def __init__(self, master, names, title="", span_s=30.0, history_s=300.0, redraw_ms=200, **kwargs):
+        kwargs.setdefault("background", "white")
+        kwargs.setdefault("height", 160)
+        super().__init__(master, **kwargs)
+        self.names = list(names)
+        self.title = title
+        self.span_s = float(span_s)
+        self.history_s = float(history_s)
+        self.redraw_ms = redraw_ms
+        self.ring = None
+        self._dirty = False
+        self._after_id = None
+        self._lines = []
+        self._labels = []
+        self._axis_text = []
+        self.bind("<Configure>", lambda event: self._mark_dirty())
+
+    def reset(self, rate):
+        # rate is None for groups a replayed recording does not have
+        self.ring = RingBuffer(len(self.names), (rate or FALLBACK_RATE) * self.history_s)
+        self._mark_dirty()
+
+    def set_span(self, span_s):
+        self.span_s = max(1.0, min(float(span_s), self.history_s))
+        self._mark_dirty()
+
+    def push(self, t, data):
+        if self.ring is None:
+            return
+        self.ring.extend(t, data)
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self._after_id is None:
+            self._after_id = self.after(self.redraw_ms, self._redraw)
+
+    def _ensure_items(self):
+        if self._lines:
+            return
+        for i, name in enumerate(self.names):
+            color = COLORS[i % len(COLORS)]
+            self._lines.append(self.create_line(0, 0, 0, 0, fill=color, width=1))
+            self._labels.append(self.create_text(0, 0, text=name, fill=color, anchor="nw", font=("TkDefaultFont", 8)))
+        for _ in range(3):
+            self._axis_text.append(self.create_text(0, 0, text="", anchor="w", font=("TkDefaultFont", 8)))
+
+    def _redraw(self):
+        self._after_id = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._ensure_items()
+
+        width = max(10, self.winfo_width())
+        height = max(10, self.winfo_height())
+        left, right, top, bottom = 50, width - 60, 6, height - 16
+        plot_w = max(2, right - left)
+
+        for i, label in enumerate(self._labels):
+            self.coords(label, right + 6, top + 12 * i)
+
+        t_end = self.ring.last_time() if self.ring is not None else None
+        if t_end is None or np.isnan(t_end):
+            for line in self._lines:
+                self.coords(line, 0, 0, 0, 0)
+            self.itemconfigure(self._axis_text[2], text=self.title)
+            self.coords(self._axis_text[2], left, bottom + 8)
+            return
+        t_start = t_end - self.span_s
+
+        times, data = self.ring.window(t_start)
+        lo, hi = minmax_decimate(times, data, t_start, t_end, plot_w)
+
+        with np.errstate(invalid="ignore"):
+            y_min = np.nanmin(lo) if np.isfinite(lo).any() else 0.0
+            y_max = np.nanmax(hi) if np.isfinite(hi).any() else 1.0
+        if y_max - y_min < 1e-9:
+            y_min -= 0.5
+            y_max += 0.5
+        margin = 0.05 * (y_max - y_min)
+        y_min -= margin
+        y_max += margin
+        scale = (bottom - top) / (y_max - y_min)
+
+        xs = left + np.arange(plot_w, dtype=np.float64)
+        for row, line in enumerate(self._lines):
+            ok = np.isfinite(lo[row]) & np.isfinite(hi[row])
+            if not ok.any():
+                self.coords(line, 0, 0, 0, 0)
+                continue
+            x = xs[ok]
+            y_lo = bottom - (lo[row][ok] - y_min) * scale
+            y_hi = bottom - (hi[row][ok] - y_min) * scale
+            # Zig-zag through (x, min) and (x, max): one canvas item per
+            # channel with 4 coordinates per pixel column.
+            coords = np.empty((len(x), 4))
+            coords[:, 0] = x
+            coords[:, 1] = y_lo
+            coords[:, 2] = x
+            coords[:, 3] = y_hi
+            self.coords(line, *coords.ravel().tolist())
+
+        self.itemconfigure(self._axis_text[0], text=f"{y_max:.4g}")
+        self.coords(self._axis_text[0], 2, top + 6)
+        self.itemconfigure(self._axis_text[1], text=f"{y_min:.4g}")
+        self.coords(self._axis_text[1], 2, bottom - 6)
+        self.itemconfigure(self._axis_text[2], text=f"{self.title}   last {self.span_s:g} s   t = {t_end:.1f} s")
+        self.coords(self._axis_text[2], left, bottom + 8)
@@ -0,0 +1,339 @@
+import argparse
+import asyncio
+import json
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+
+# Live data for other PCs on the network: an asyncio TCP server on its own
+# thread, fed with calibrated blocks by the acquisition loop. Every frame is
+# a little-endian uint32 payload length followed by the payload, whose
+# first byte is the frame type:
+#   HELLO     (server) JSON: version, groups {group: names}, rates, t0
+#   DATA      (server) <BBHII type, group id, channels, samples, frames
+#             dropped so far; float64 times, then float32 values channel-major
+#   SUBSCRIBE (client) JSON: max_rate (Hz per group, 0 = full rate), groups
+TELEMETRY_PORT = 5700
+PROTOCOL_VERSION = 1
+HELLO = 1
+DATA = 2
+SUBSCRIBE = 16
+LENGTH = struct.Struct("<I")
+DATA_HEADER = struct.Struct("<BBHII")
+MAX_CLIENT_FRAME = 64 * 1024
+# A client whose queue overflows loses those frames and has its rate
+# halved (at most once per STEP_S), down to 1/64 of what it asked for; it
+# is disconnected if it still cannot keep up. The rate recovers one step
+# per RECOVER_S seconds without an overflow.
+MIN_RATE_SCALE = 1.0 / 64.0
+STEP_S = 0.5
+RECOVER_S = 2.0
+
+
+def encode_frame(kind, payload):
+    return LENGTH.pack(len(payload) + 1) + bytes([kind]) + payload
+
+
+def encode_data(group_id, t, values, dropped):
+    n_channels, n = values.shape
+    header = DATA_HEADER.pack(DATA, group_id, n_channels, n, dropped)
+    payload = header + t.astype("<f8").tobytes() + values.astype("<f4").tobytes()
+    return LENGTH.pack(len(payload)) + payload
+
+
+class _Client:
+    def __init__(self, writer, max_queue):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.max_rate = 0.0
+        self.groups = None
+        self.rate_scale = 1.0
+        self.dropped = 0
+        self.last_overflow = 0.0
+        self.last_step = 0.0
+        self._last_slot = {}
+
+    def pick(self, group, t, group_rate):
+        # Indices of the samples to send: at most one per 1 / rate slot of
+        # the run timebase, so decimation is even across block boundaries.
+        # None sends the whole block.
+        rate = self.max_rate or group_rate
+        if not rate or (rate >= group_rate and self.rate_scale >= 1.0):
+            return None
+        rate *= self.rate_scale
+        slots = np.floor(t * rate)
+        previous = self._last_slot.get(group, -np.inf)
+        keep = np.flatnonzero(np.diff(np.concatenate([[previous], slots])) > 0)
+        if len(slots):
+            self._last_slot[group] = max(previous, slots[-1])
+        return keep
+
+
+class TelemetryServer:
+    # publish() is called from the acquisition thread and only hands the
+    # blocks to the event loop; decimation, encoding and sending happen
+    # there. Each client has a bounded send queue, so a slow or stalled
+    # client loses frames (and then rate) instead of holding anyone up.
+    def __init__(self, host="0.0.0.0", port=TELEMETRY_PORT, max_queue=64):
+        self.host = host
+        self.port = port
+        self.max_queue = max_queue
+        self.layout = {"version": PROTOCOL_VERSION, "groups": {}, "rates": {}, "t0": None}
+        self.clients_served = 0
+        self._group_ids = {}
+        self._clients = set()
+        self._tasks = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="telemetry", daemon=True)
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._serve, self.host, self.port), self._loop
+        )
+        try:
+            self._server = future.result(timeout=5.0)
+        except Exception:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2.0)
+            raise
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        if self._loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            future.result(timeout=5.0)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5.0)
+        self._loop.close()
+        self._loop = None
+
+    async def _shutdown(self):
+        self._server.close()
+        # Aborting a connection ends its _serve task at the next read
+        for client in list(self._clients):
+            client.writer.transport.abort()
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=2.0)
+        await self._server.wait_closed()
+
+    def set_layout(self, groups, rates, t0=None):
+        # New run: (re)announce the channel layout to every client
+        self.layout = {
+            "version": PROTOCOL_VERSION,
+            "groups": {group: list(names) for group, names in groups},
+            "rates": dict(rates),
+            "t0": t0,
+        }
+        self._group_ids = {group: i for i, (group, _) in enumerate(groups)}
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._announce)
+
+    def publish(self, calibrated):
+        # calibrated: [(SampleBlock, calibrated values)] from the session
+        if not self._clients or self._loop is None:
+            return
+        items = [(block.group, block.times(), cal) for block, cal in calibrated if block.n_samples]
+        if items:
+            self._loop.call_soon_threadsafe(self._dispatch, items)
+
+    def _hello(self):
+        return encode_frame(HELLO, json.dumps(self.layout).encode("utf-8"))
+
+    def _announce(self):
+        frame = self._hello()
+        for client in list(self._clients):
+            self._enqueue(client, frame)
+
+    def _dispatch(self, items):
+        for client in list(self._clients):
+            for group, t, values in items:
+                group_id = self._group_ids.get(group)
+                if group_id is None or (client.groups is not None and group not in client.groups):
+                    continue
+                keep = client.pick(group, t, self.layout["rates"].get(group) or 0.0)
+                if keep is not None:
+                    if not len(keep):
+                        continue
+                    t, values = t[keep], values[:, keep]
+                self._enqueue(client, encode_data(group_id, t, np.asarray(values), client.dropped))
+
+    def _enqueue(self, client, frame):
+        try:
+            client.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            client.dropped += 1
+            now = time.monotonic()
+            client.last_overflow = now
+            if now - client.last_step >= STEP_S:
+                if client.rate_scale <= MIN_RATE_SCALE:
+                    # close() would wait to flush a full buffer; drop it
+                    client.writer.transport.abort()
+                    self._clients.discard(client)
+                    return
+                client.rate_scale = max(MIN_RATE_SCALE, client.rate_scale / 2.0)
+                client.last_step = now
+            return
+        now = time.monotonic()
+        if client.rate_scale < 1.0 and now - client.last_overflow > RECOVER_S and now - client.last_step > RECOVER_S:
+            client.rate_scale = min(1.0, client.rate_scale * 2.0)
+            client.last_step = now
+
+    async def _serve(self, reader, writer):
+        client = _Client(writer, self.max_queue)
+        self._tasks.add(asyncio.current_task())
+        self._clients.add(client)
+        self.clients_served += 1
+        try:
+            sock = writer.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+        self._enqueue(client, self._hello())
+        sender = asyncio.ensure_future(self._send(client))
+        try:
+            while True:
+                header = await reader.readexactly(LENGTH.size)
+                (length,) = LENGTH.unpack(header)
+                if not 0 < length <= MAX_CLIENT_FRAME:
+                    break
+                payload = await reader.readexactly(length)
+                if payload[0] == SUBSCRIBE:
+                    self._subscribe(client, json.loads(payload[1:].decode("utf-8")))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+            writer.close()
+            await asyncio.gather(sender, return_exceptions=True)
+            self._tasks.discard(asyncio.current_task())
+
+    def _subscribe(self, client, request):
+        client.max_rate = max(0.0, float(request.get("max_rate") or 0.0))
+        groups = request.get("groups")
+        client.groups = set(groups) if groups else None
+        client.rate_scale = 1.0
+        client._last_slot = {}
+
+    async def _send(self, client):
+        try:
+            while True:
+                frame = await client.queue.get()
+                client.writer.write(frame)
+                await client.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(client)
+
+
+class TelemetryClient:
+    # Blocking reference client. recv() returns ("hello", layout) or
+    # ("data", group, t, values, dropped) with values (channels x samples).
+    def __init__(self, host, port=TELEMETRY_PORT, max_rate=0.0, groups=None, timeout=10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rb")
+        self.layout = None
+        self.groups = []
+        self.subscribe(max_rate, groups)
+
+    def subscribe(self, max_rate=0.0, groups=None):
+        request = {"max_rate": max_rate, "groups": list(groups) if groups else None}
+        self.sock.sendall(encode_frame(SUBSCRIBE, json.dumps(request).encode("utf-8")))
+
+    def _read(self, n):
+        data = self.file.read(n)
+        if len(data) < n:
+            raise ConnectionError("Telemetry server closed the connection")
+        return data
+
+    def recv(self):
+        (length,) = LENGTH.unpack(self._read(LENGTH.size))
+        payload = self._read(length)
+        if payload[0] == HELLO:
+            self.layout = json.loads(payload[1:].decode("utf-8"))
+            self.groups = list(self.layout["groups"])
+            return ("hello", self.layout)
+        if payload[0] != DATA:
+            return ("unknown", payload)
+        _, group_id, n_channels, n, dropped = DATA_HEADER.unpack_from(payload)
+        offset = DATA_HEADER.size
+        t = np.frombuffer(payload, dtype="<f8", count=n, offset=offset)
+        values = np.frombuffer(payload, dtype="<f4", count=n_channels * n, offset=offset + 8 * n)
+        return ("data", self.groups[group_id], t, values.reshape(n_channels, n), dropped)
+
+    def close(self):
+        try:
+            self.file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _format_latest(layout, latest):
+    parts = []
+    for group, names in layout["groups"].items():
+        if group not in latest:
+            continue
+        values = latest[group]
+        parts.append(" ".join(f"{name}={value:.4g}" for name, value in zip(names, values)))
+    return " | ".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reference telemetry client: prints the newest values once per second.")
+    parser.add_argument("server", nargs="?", default="localhost", help="HOST or HOST:PORT of the DAQ PC")
+    parser.add_argument("--rate", type=float, default=20.0, help="max samples/s per group to receive (0: full rate)")
+    parser.add_argument("--groups", help="comma-separated groups to receive (default: all)")
+    parser.add_argument("--seconds", type=float, default=0.0, help="stop after this many seconds (0: until Ctrl+C)")
+    args = parser.parse_args(argv)
+    host, _, port = args.server.partition(":")
+    groups = [g.strip() for g in args.groups.split(",")] if args.groups else None
+
+    client = TelemetryClient(host, int(port or TELEMETRY_PORT), max_rate=args.rate, groups=groups)
+    started = last_print = time.monotonic()
+    latest, counts, dropped = {}, {}, 0
+    try:
+        while not args.seconds or time.monotonic() - started < args.seconds:
+            message = client.recv()
+            if message[0] == "hello":
+                print(f"Layout: {json.dumps(message[1]['groups'])}", flush=True)
+                continue
+            if message[0] != "data":
+                continue
+            _, group, t, values, dropped = message
+            latest[group] = values[:, -1].tolist()
+            counts[group] = counts.get(group, 0) + len(t)
+            now = time.monotonic()
+            if now - last_print >= 1.0:
+                rates = ", ".join(f"{g} {n / (now - last_print):.0f}/s" for g, n in counts.items())
+                print(f"t={t[-1]:8.2f}s  {_format_latest(client.layout, latest)}  [{rates}, dropped {dropped}]", flush=True)
+                counts = {}
+                last_print = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from acquisition import RingBuffer
+
+
+def reference_window(t_all, d_all, capacity, t_start):
+    # Straightforward chronological copy of the retained history
+    times, data = t_all[-capacity:], d_all[:, -capacity:]
+    keep = times >= t_start
+    return times[keep], data[:, keep]
+
+
+@pytest.mark.parametrize("written", [0, 5, 99, 100, 137, 250, 300])
+def test_window_matches_chronological_history(written):
+    capacity = 100
+    ring = RingBuffer(2, capacity)
+    t_all = np.arange(written) * 0.01
+    d_all = np.vstack([t_all * 10.0, -t_all])
+    for first in range(0, written, 13):
+        ring.extend(t_all[first:first + 13], d_all[:, first:first + 13])
+    for t_start in (-1.0, 0.0, 0.5, 1.004, 1.37, 2.0, 2.99, 5.0):
+        times, data = ring.window(t_start)
+        want_t, want_d = reference_window(t_all, d_all, capacity, t_start)
+        np.testing.assert_array_equal(times, want_t)
+        np.testing.assert_array_equal(data, want_d)
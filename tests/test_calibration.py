@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from calibration import (CalibrationEngine, PiecewiseLinear, Polynomial, compile_curve, load_calibration,
+                         parse_points, save_calibration)
+
+
+POINTS = [[0.5, 0.0], [1.0, 12.5], [2.5, 50.0], [4.5, 100.0]]
+
+
+def test_piecewise_linear_matches_interp_inside_the_table():
+    curve = PiecewiseLinear(POINTS)
+    x = np.linspace(0.5, 4.5, 1001)
+    np.testing.assert_allclose(curve(x), np.interp(x, *zip(*POINTS)), atol=1e-12)
+    # Breakpoints map exactly onto their engineering values
+    np.testing.assert_allclose(curve(np.array([p[0] for p in POINTS])), [p[1] for p in POINTS])
+
+
+def test_piecewise_linear_extrapolates_the_end_segments():
+    curve = PiecewiseLinear(POINTS)
+    np.testing.assert_allclose(curve(np.array([0.0, 5.5])), [-12.5, 125.0])
+    assert np.isnan(curve(np.array([np.nan]))[0])
+
+
+def test_polynomial_is_horner():
+    curve = Polynomial([-12.5, 25.0, 0.02])
+    x = np.linspace(-3.0, 3.0, 13)
+    np.testing.assert_allclose(curve(x), -12.5 + 25.0 * x + 0.02 * x ** 2)
+    np.testing.assert_allclose(Polynomial([3.0])(x), np.full_like(x, 3.0))
+
+
+def test_cubic_fit_reproduces_a_cubic():
+    raw = np.linspace(0.0, 10.0, 6)
+    points = [[r, 1.0 - 2.0 * r + 0.5 * r ** 3] for r in raw]
+    curve = compile_curve({"fit": "cubic", "points": points})
+    np.testing.assert_allclose(curve.coefficients, [1.0, -2.0, 0.0, 0.5], atol=1e-9)
+
+
+@pytest.mark.parametrize("entry, message", [
+    ({"points": "1:2"}, "at least 2 points"),
+    ({"points": "1:2, 1:3"}, "repeated raw value"),
+    ({"points": "1:2, x:3"}, "raw:eng pairs"),
+    ({"points": "1:2, 2:3", "fit": "spline"}, "Unknown calibration fit"),
+    ({"poly": "1, a"}, "must be numbers"),
+])
+def test_malformed_curves_are_rejected(entry, message):
+    with pytest.raises(ValueError, match=message):
+        compile_curve(entry)
+
+
+def test_engine_calibrates_a_block_per_channel():
+    calibration = {
+        "AI0": {"raw1": 0.0, "eng1": 10.0, "raw2": 1.0, "eng2": 30.0},
+        "AI1": {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 1.0, "points": POINTS},
+        "AI2": {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 1.0, "poly": [1.0, 2.0]},
+        "AI3": {"raw1": 2.0, "eng1": 5.0, "raw2": 2.0, "eng2": 9.0},
+    }
+    engine = CalibrationEngine(calibration, [("ai", ["AI0", "AI1", "AI2", "AI3", "AI4"])])
+    data = np.vstack([np.linspace(0.0, 5.0, 11)] * 5)
+    data[:, 3] = np.nan
+    out = engine.apply("ai", data)
+    x = data[0]
+    np.testing.assert_allclose(out[0], 10.0 + 20.0 * x)
+    np.testing.assert_allclose(out[1], PiecewiseLinear(POINTS)(x))
+    np.testing.assert_allclose(out[2], 1.0 + 2.0 * x)
+    assert np.all(out[3][~np.isnan(x)] == 5.0)
+    np.testing.assert_array_equal(out[4], x)
+    assert np.isnan(out[:, 3]).all()
+    # The input block is left as it was
+    np.testing.assert_array_equal(data[0], x)
+    assert engine.apply("tc", data) is data
+
+
+def test_engine_skips_malformed_curves_and_keeps_none():
+    calibration = {"AI0": {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 2.0, "points": "1:2"}}
+    engine = CalibrationEngine(calibration, [("ai", ["AI0", "AI1"])])
+    assert engine.apply_latest("ai", [1.5, None]) == [3.0, None]
+    assert engine.apply_latest("ai", [None, None]) == [None, None]
+
+
+def test_curves_round_trip_through_the_file(tmp_path):
+    names = ["AI0", "AI1", "AI2"]
+    calibration = {
+        "AI0": {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 2.0},
+        "AI1": {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 1.0, "fit": "cubic", "points": parse_points("0:0, 1:1, 2:8, 3:27")},
+        "AI2": {"raw1": 0.0, "eng1": 0.0, "raw2": 1.0, "eng2": 1.0, "poly": [0.1, 0.2, 0.3]},
+    }
+    path = tmp_path / "calibration.yaml"
+    save_calibration(path, calibration, names, derived={"P": "AI0 * 2"})
+    assert load_calibration(path, names) == calibration
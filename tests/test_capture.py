@@ -0,0 +1,68 @@
+import numpy as np
+
+from acquisition import SampleBlock
+from capture import LevelTrigger, TriggeredCapture
+from logreader import open_recording
+
+
+GROUPS = [("tc", ["TC0"]), ("ai", ["AI0", "AI1"])]
+RATES = {"tc": 10.0, "ai": 1000.0}
+
+
+def run(capture, seconds, step=0.1, ramp_at=3.0):
+    # Feeds both groups in step-second blocks; AI0 steps to 10 at ramp_at
+    for k in range(int(round(seconds / step))):
+        for group, names in GROUPS:
+            rate = RATES[group]
+            n = int(round(rate * step))
+            block = SampleBlock(group, np.zeros((len(names), n)), k * n, rate)
+            t = block.times()
+            block.data[0] = np.where(t >= ramp_at, 10.0, 0.0)
+            capture.push(block, block.data)
+            if capture.state not in ("armed", "triggered"):
+                return
+
+
+def test_level_trigger_edges_across_blocks():
+    trigger = LevelTrigger("Rising edge", 5.0)
+    assert trigger.find(np.array([0.0, 1.0, 4.0])) is None
+    assert trigger.find(np.array([6.0, 7.0])) == 0
+    assert trigger.find(np.array([7.0, 8.0])) is None
+    assert LevelTrigger("Below", 1.0).find(np.array([3.0, 2.0, 0.5])) == 2
+
+
+def test_pre_and_post_trigger_window(tmp_path):
+    capture = TriggeredCapture(GROUPS, RATES, "AI0", "Rising edge", 5.0, pre_s=0.5, post_s=1.0,
+                               directory=str(tmp_path))
+    run(capture, 10.0)
+    capture.wait(5.0)
+    assert capture.state == "saved", capture.error
+    assert capture.t_trigger == 3.0
+    recording = open_recording(capture.path)
+    t, raw = recording.read()["ai"]
+    assert t[0] == 2.5 and t[-1] == 4.0
+    assert len(t) == 1501
+    np.testing.assert_array_equal(raw[0], np.where(t >= 3.0, 10.0, 0.0))
+    t, _ = recording.read()["tc"]
+    assert t[0] >= 2.5 and t[-1] <= 4.0
+
+
+def test_memory_bounded_while_armed(tmp_path):
+    capture = TriggeredCapture(GROUPS, RATES, "AI0", "Above", 50.0, pre_s=0.5, directory=str(tmp_path))
+    capacity = {group: ring.capacity for group, ring in capture.rings.items()}
+    assert capacity["ai"] <= (0.5 + 1.0) * 1000 + 1
+    run(capture, 30.0)
+    assert capture.state == "armed"
+    assert {group: ring.capacity for group, ring in capture.rings.items()} == capacity
+
+
+def test_group_without_rate(tmp_path):
+    # e.g. a replayed group missing from the recording: sized from a
+    # fallback rate and done once it reaches t_end
+    rates = dict(RATES, tc=None)
+    capture = TriggeredCapture(GROUPS, rates, "AI0", "Rising edge", 5.0, pre_s=0.5, post_s=1.0,
+                               directory=str(tmp_path))
+    run(capture, 10.0)
+    capture.wait(5.0)
+    assert capture.state == "saved", capture.error
+    assert abs(open_recording(capture.path).rates["tc"] - 10.0) < 1e-6
@@ -0,0 +1,71 @@
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+from acquisition import SampleBlock
+from catalog import Catalog, _verify_archive, log_bytes, recording_stats, shuffle_floats, write_archive
+from datalog import BinaryLogger
+from logreader import BINARY_HEADER, open_recording, unshuffle_floats
+
+
+GROUPS = [("ai", ["AI0", "AI1"])]
+RATE = 1000.0
+
+
+def binary_log(path, seconds=25):
+    logger = BinaryLogger(str(path), GROUPS, {"ai": RATE}, chunk_seconds=7.0)
+    rng = np.random.default_rng(1)
+    for k in range(seconds):
+        data = rng.standard_normal((2, int(RATE)))
+        data[1, 10] = np.nan
+        logger.write_block(SampleBlock("ai", data, k * int(RATE), RATE))
+    logger.close()
+    return str(path)
+
+
+def tamper(archive_path):
+    # Rewrites the archive with one raw value changed, keeping sizes and NaNs
+    tampered = archive_path + ".new"
+    with zipfile.ZipFile(archive_path) as src, zipfile.ZipFile(tampered, "w") as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == "ai_00001.f8s":
+                values = unshuffle_floats(data, 2, len(data) // 16).copy()
+                values[0, 5] += 1e-9
+                data = shuffle_floats(values)
+            dst.writestr(item, data)
+    os.replace(tampered, archive_path)
+
+
+def test_archive_round_trip(tmp_path):
+    log = binary_log(tmp_path / "log_run")
+    archive_path = str(tmp_path / "log_run.zip")
+    write_archive([log], archive_path)
+    _verify_archive([log], archive_path)
+    a, b = open_recording(log).read(), open_recording(archive_path).read()
+    np.testing.assert_array_equal(a["ai"][0], b["ai"][0])
+    np.testing.assert_array_equal(a["ai"][1], b["ai"][1])
+
+
+def test_tampered_archive_keeps_source(tmp_path):
+    log = binary_log(tmp_path / "log_run")
+    with Catalog(str(tmp_path / "runs.sqlite")) as catalog:
+        run = catalog.record_run([log], recording_stats(open_recording(log)), mode="Binary")
+        archive_path, _, _ = catalog.archive(run)
+        tamper(archive_path)
+        with pytest.raises(ValueError, match="do not match"):
+            catalog.archive(run, delete_source=True)
+        assert os.path.exists(os.path.join(log, BINARY_HEADER))
+
+        os.remove(archive_path)
+        catalog.archive(run, delete_source=True)
+        assert not os.path.exists(log)
+
+
+def test_binary_log_bytes_counts_written_samples(tmp_path):
+    # Chunk files are preallocated to 7 s; only 25 s x 2 channels were written
+    log = binary_log(tmp_path / "log_run")
+    header = os.path.getsize(os.path.join(log, BINARY_HEADER))
+    assert log_bytes(log) == header + 25 * int(RATE) * 2 * 8
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from datalog import AsyncLogWriter, FlushPolicy
+
+
+class StalledSink:
+    # A logger whose disk hangs until `gate` is set
+    path = "stalled.csv"
+    calibrated = True
+    full_rate = True
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.rows_written = 0
+        self.flushes = 0
+        self.meta = {}
+
+    def write_block(self, block, cal=None):
+        self.gate.wait()
+        self.rows_written += 1
+
+    def update_meta(self, key, value):
+        self.meta[key] = value
+
+    def size(self):
+        return 0
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        pass
+
+
+def stall(writer, n=50):
+    # -> slowest write call while the sink is stalled
+    worst = 0.0
+    for i in range(n):
+        t_call = time.perf_counter()
+        writer.write_block(i)
+        worst = max(worst, time.perf_counter() - t_call)
+    return worst
+
+
+def test_stalled_disk_neither_blocks_nor_loses_rows():
+    sink = StalledSink()
+    writer = AsyncLogWriter(lambda part: sink, FlushPolicy(seconds=0), max_items=4)
+    assert stall(writer) < 0.05
+    writer.update_meta("stats", {"rows": 50})
+    assert writer.backlog > writer.max_items
+    writer.flush()
+
+    sink.gate.set()
+    writer.close()
+    assert sink.rows_written == 50
+    assert writer.dropped_items == 0 and writer.spilled_items > 0
+    assert sink.meta == {"stats": {"rows": 50}}
+    assert sink.flushes == 1
+
+
+def test_drop_policy_counts_what_it_loses():
+    sink = StalledSink()
+    writer = AsyncLogWriter(lambda part: sink, FlushPolicy(), max_items=4, when_full="drop")
+    assert stall(writer) < 0.05
+    writer.update_meta("stats", {"rows": 50})
+    sink.gate.set()
+    writer.close()
+    assert writer.dropped_items > 0
+    assert sink.rows_written + writer.dropped_items == 50
+    # Metadata is never dropped
+    assert sink.meta == {"stats": {"rows": 50}}
+
+
+def test_block_policy_waits_for_room():
+    sink = StalledSink()
+    writer = AsyncLogWriter(lambda part: sink, FlushPolicy(), max_items=2, when_full="block", put_timeout=5.0)
+    threading.Timer(0.2, sink.gate.set).start()
+    t_call = time.perf_counter()
+    stall(writer, 10)
+    assert time.perf_counter() - t_call >= 0.15
+    writer.close()
+    assert sink.rows_written == 10 and writer.dropped_items == 0
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        AsyncLogWriter(lambda part: StalledSink(), when_full="sometimes")
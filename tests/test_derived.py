@@ -0,0 +1,112 @@
+import re
+
+import numpy as np
+import pytest
+
+from acquisition import SampleBlock
+from derived import DerivedEngine, first_order, load_derived
+
+
+GROUPS = [("ai", ["AI0", "AI1"]), ("tc", ["TC0"])]
+RATE = 100.0
+
+
+def ai_block(start, n=50):
+    index = start + np.arange(n)
+    return SampleBlock("ai", np.vstack([index * 1.0, np.full(n, 2.0)]), start, RATE)
+
+
+def run(engine, block):
+    out = engine.process(block, block.data)
+    return {b.group: b for b in out}
+
+
+def test_expressions_compile_to_vectorised_blocks():
+    engine = DerivedEngine({"Sum": "AI0 + 2 * AI1", "Neg": "-abs(AI0 - AI1)", "Hi": "where(AI0 > 10, 1, 0)"}, GROUPS)
+    assert engine.groups == [("ai_derived", ["Sum", "Neg", "Hi"])]
+    block = ai_block(0)
+    out = run(engine, block)["ai_derived"]
+    x = block.data[0]
+    np.testing.assert_allclose(out.data[0], x + 4.0)
+    np.testing.assert_allclose(out.data[1], -np.abs(x - 2.0))
+    np.testing.assert_array_equal(out.data[2], (x > 10).astype(float))
+    np.testing.assert_array_equal(out.times(), block.times())
+
+
+def test_derived_channels_can_use_each_other_in_any_order():
+    engine = DerivedEngine({"B": "A * 2", "A": "AI0 + 1"}, GROUPS)
+    assert engine.order == ["A", "B"]
+    out = run(engine, ai_block(0))["ai_derived"]
+    # Rows keep definition order: B, then A
+    np.testing.assert_allclose(out.data[1], np.arange(50) + 1.0)
+    np.testing.assert_allclose(out.data[0], 2.0 * out.data[1])
+
+
+def test_filter_state_carries_across_blocks():
+    whole = DerivedEngine({"F": "ema(AI0, 0.1)"}, GROUPS)
+    split = DerivedEngine({"F": "ema(AI0, 0.1)"}, GROUPS)
+    data = np.vstack([np.sin(np.arange(200) / 7.0), np.zeros(200)])
+    expected = run(whole, SampleBlock("ai", data, 0, RATE))["ai_derived"].data[0]
+    parts = [run(split, SampleBlock("ai", data[:, k:k + 30], k, RATE))["ai_derived"].data[0].copy()
+             for k in range(0, 200, 30)]
+    np.testing.assert_allclose(np.concatenate(parts), expected)
+
+
+def test_slow_inputs_are_interpolated_and_held():
+    engine = DerivedEngine({"D": "AI0 - TC0"}, GROUPS)
+    assert engine.home["D"] == "ai"
+    tc = SampleBlock("tc", np.array([[0.0, 10.0]]), 0, 1.0)
+    assert engine.process(tc, tc.data) == []
+    block = ai_block(0, n=200)
+    out = run(engine, block)["ai_derived"].data[0]
+    t = block.times()
+    np.testing.assert_allclose(out, block.data[0] - np.interp(t, [0.0, 1.0], [0.0, 10.0]))
+    assert out[-1] == block.data[0][-1] - 10.0
+
+
+def test_first_order_matches_the_recursion():
+    x = np.random.default_rng(0).standard_normal(5000)
+    a, y = 0.99, 1.5
+    expected = np.empty_like(x)
+    for i, value in enumerate(x):
+        y = a * y + (1 - a) * value
+        expected[i] = y
+    np.testing.assert_allclose(first_order(x, a, 1.5), expected, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("expr, message", [
+    ("__import__('os')", "unknown function __import__()"),
+    ("__import__('os').system('true')", "Call is not allowed"),
+    ("AI0.__class__", "Attribute is not allowed"),
+    ("AI0[0]", "Subscript is not allowed"),
+    ("lambda: AI0", "Lambda is not allowed"),
+    ("[AI0 for AI0 in AI1]", "ListComp is not allowed"),
+    ("'text'", "Constant is not allowed"),
+    ("AI0 if AI1 else 0", "IfExp is not allowed"),
+    ("abs(x=AI0)", "Call is not allowed"),
+    ("AI0 and AI1", "BoolOp is not allowed"),
+    ("0 < AI0 < 1", "Compare is not allowed"),
+    ("open", "unknown channel 'open'"),
+    ("ema(AI0, AI1)", "filter parameters must be numbers"),
+    ("ema()", "ema() needs a signal"),
+    ("ema(AI0, 1, 2, 3)", "wrong number of arguments to ema()"),
+    ("AI0 +", "invalid syntax"),
+])
+def test_unsafe_or_invalid_expressions_are_rejected(expr, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        DerivedEngine({"X": expr}, GROUPS)
+
+
+def test_definition_errors():
+    with pytest.raises(ValueError, match="shadows an acquired channel"):
+        DerivedEngine({"AI0": "AI1"}, GROUPS)
+    with pytest.raises(ValueError, match="depends on itself"):
+        DerivedEngine({"A": "B + 1", "B": "A * 2"}, GROUPS)
+    with pytest.raises(ValueError, match="unknown channel 'A'"):
+        DerivedEngine({"A": "A + 1"}, GROUPS)
+
+
+def test_load_derived_reads_the_section():
+    assert load_derived({"derived": {"P": "AI0 * 2", "Q": None, 3: 4}}) == {"P": "AI0 * 2", "3": "4"}
+    assert load_derived({"derived": "AI0"}) == {}
+    assert load_derived(None) == {}
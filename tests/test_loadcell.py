@@ -0,0 +1,76 @@
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from acquisition import BlockQueue
+from loadcell import LineParser, SerialReader, open_serial_port
+
+
+def test_partial_lines_across_reads():
+    parser = LineParser(1)
+    assert parser.feed(b"+0012.3").shape == (1, 0)
+    np.testing.assert_array_equal(parser.feed(b"5kg\r\n-0001.50kg\r\n+00"), [[12.35, -1.5]])
+    np.testing.assert_array_equal(parser.feed(b"07.00kg\r\n"), [[7.0]])
+    assert parser.bad_frames == 0
+
+
+def test_banner_and_garbage_lines():
+    parser = LineParser(2, skip_first=True)
+    out = parser.feed(b"0,1.5\nSCALE v2.1 ready\n\n1.0,2.0\n#?!\n3.0\n4.0,5.0\n")
+    # The first (cut-off) line is skipped; the banner, "#?!" and the short
+    # "3.0" frame are bad, blank lines are not counted
+    np.testing.assert_array_equal(out, [[1.0, 4.0], [2.0, 5.0]])
+    assert parser.bad_frames == 3
+    # A stream without terminators does not grow the carry-over unbounded
+    parser.feed(b"x" * 10000)
+    assert len(parser._tail) == parser.max_line
+
+
+def test_multi_channel_frames():
+    parser = LineParser(3)
+    out = parser.feed(b"ST,GS,+1.0e1,-2.5,.5,99\n  -3.1e2 N 0 4\n")
+    np.testing.assert_array_equal(out, [[10.0, -310.0], [-2.5, 0.0], [0.5, 4.0]])
+
+
+def test_timestamps_spaced_back_from_read_time():
+    reader = SerialReader("lc", None, 1, 100.0, BlockQueue(), clock=time.perf_counter)
+    np.testing.assert_allclose(reader._timestamps(3, 5.0), [4.98, 4.99, 5.0])
+    # A burst that would overlap the previous one is spread since it
+    np.testing.assert_allclose(reader._timestamps(4, 5.02), [5.005, 5.01, 5.015, 5.02])
+
+
+def test_serial_reader_on_loopback():
+    pytest.importorskip("serial")
+    port = open_serial_port("loop://", timeout=0.05)
+    ticks = itertools.count()
+    queue = BlockQueue()
+    reader = SerialReader("lc", port, 2, 50.0, queue, clock=lambda: 100.0 + next(ticks))
+    reader.start()
+    try:
+        time.sleep(0.2)
+        frames = [f"{k}.5,{-k}\r\n".encode() for k in range(20)]
+        stream = b"ends mid-frame\r\nLOADCELL 2000 READY\r\n" + b"".join(frames)
+        for first in range(0, len(stream), 7):
+            port.write(stream[first:first + 7])
+            time.sleep(0.005)
+        deadline = time.monotonic() + 2.0
+        while reader.samples_read < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        reader.stop()
+        reader.join(timeout=2.0)
+        port.close()
+
+    assert reader.error is None
+    blocks = queue.drain()
+    data = np.concatenate([block.data for block in blocks], axis=1)
+    np.testing.assert_array_equal(data, [np.arange(20) + 0.5, -np.arange(20)])
+    assert reader.stats.bad_frames == 1
+    assert [block.start_index for block in blocks] == list(np.cumsum([0] + [b.n_samples for b in blocks[:-1]]))
+    t = np.concatenate([block.t for block in blocks])
+    assert (np.diff(t) > 0).all()
+    for block in blocks:
+        # The newest reading of a burst is stamped with the read time
+        assert block.t[-1] == int(block.t[-1]) and block.t[-1] >= 100.0
@@ -0,0 +1,34 @@
+import csv
+
+import numpy as np
+
+from logreader import open_recording
+
+
+def write_legacy_log(path, rows=60, per_second=10):
+    # The layout of the first GUI version's _open_log / _tick
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["timestamp"] + [f"tc{i}_raw" for i in range(3)] + [f"tc{i}_cal" for i in range(3)]
+                        + [f"ai{i}_raw" for i in range(4)] + [f"ai{i}_cal" for i in range(4)])
+        for k in range(rows):
+            tc = [None] * 3 if k == 0 else [20.0 + k, 21.0, 22.0]
+            writer.writerow([f"2024-05-01 12:00:{k // per_second:02d}"] + tc + tc
+                            + [1.0, 2.0, 3.0, 4.0] + [10.0, 20.0, 30.0, 40.0])
+
+
+def test_legacy_csv_log(tmp_path):
+    path = tmp_path / "log_20240501_120000.csv"
+    write_legacy_log(path)
+    recording = open_recording(str(path))
+    assert recording.groups == [("tc", ["TC0", "TC1", "TC2"]), ("ai", ["AI0", "AI1", "AI2", "AI3"])]
+    assert recording.time_range() == (0.0, 5.0)
+    assert abs(recording.rates["ai"] - 59 / 5.0) < 1e-9
+
+    window = recording.read(1.0, 3.0)
+    t, raw = window["ai"]
+    np.testing.assert_array_equal(t, np.repeat([1.0, 2.0], 10))
+    np.testing.assert_array_equal(raw[:, 0], [1.0, 2.0, 3.0, 4.0])
+    t, raw = recording.read(0.0, 1.0)["tc"]
+    # The first row has no TC reading yet
+    assert len(t) == 9 and raw[0, 0] == 21.0
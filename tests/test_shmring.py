@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from acquisition import SampleBlock
+from shmring import RESUME_MARGIN, RingReader, ShmRing
+
+
+GROUPS = [("ai", ["AI0", "AI1"]), ("ai_derived", ["Pc"])]
+
+
+@pytest.fixture
+def ring():
+    ring = ShmRing.create(GROUPS, n_slots=16, slot_floats=64)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def block(k, n=10):
+    data = np.vstack([np.arange(n) + k * n, -np.arange(n) - k * n]).astype(float)
+    return SampleBlock("ai", data, k * n, 1000.0)
+
+
+def test_blocks_carry_calibrated_and_derived_values(ring):
+    reader = RingReader(ShmRing.attach(ring.name))
+    raw = block(0)
+    ring.write(raw, raw.data * 2.0)
+    derived = SampleBlock("ai_derived", raw.data[:1] + 0.5, 0, 1000.0)
+    ring.write(derived, derived.data)
+    timed = SampleBlock("ai", raw.data, 10, 1000.0, t=np.linspace(1.0, 2.0, 10))
+    ring.write(timed)
+
+    first, second, third = reader.read()
+    np.testing.assert_array_equal(first.data, raw.data)
+    np.testing.assert_array_equal(first.cal, raw.data * 2.0)
+    assert second.group == "ai_derived" and second.cal is second.data
+    np.testing.assert_array_equal(second.data, raw.data[:1] + 0.5)
+    assert third.cal is None
+    np.testing.assert_array_equal(third.t, np.linspace(1.0, 2.0, 10))
+    # Views into shared memory: the consumer cannot write through them
+    assert not first.data.flags.writeable
+
+
+def test_wide_blocks_split_across_slots(ring):
+    reader = RingReader(ring)
+    wide = block(0, n=100)
+    ring.write(wide, wide.data + 1.0)
+    blocks = reader.read()
+    assert len(blocks) > 1
+    np.testing.assert_array_equal(np.concatenate([b.data for b in blocks], axis=1), wide.data)
+    np.testing.assert_array_equal(np.concatenate([b.cal for b in blocks], axis=1), wide.data + 1.0)
+    assert [b.start_index for b in blocks] == list(np.cumsum([0] + [b.n_samples for b in blocks[:-1]]))
+
+
+def test_overrun_skips_ahead_and_counts_lost_blocks(ring):
+    reader = RingReader(ring)
+    for k in range(40):
+        ring.write(block(k))
+    blocks = reader.read()
+    assert reader.stats.overruns == 1
+    assert reader.stats.lost_blocks + len(blocks) == 40
+    assert len(blocks) == ring.n_slots - RESUME_MARGIN
+    assert blocks[-1].start_index == 390
+
+
+def test_torn_blocks_are_detected_on_next_read(ring):
+    reader = RingReader(ring)
+    ring.write(block(0))
+    held = reader.read()
+    assert len(held) == 1
+    # The producer laps the consumer while it still holds the views
+    for k in range(1, ring.n_slots + 1):
+        ring.write(block(k))
+    reader.read()
+    assert reader.stats.torn_blocks == 1
+    # Blocks released before the producer moved on are not torn
+    reader.read()
+    assert reader.stats.torn_blocks == 1
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from spectral import BandPower, PeakFrequency, SpectralFilter, WelchPsd
+
+
+RATE = 1000.0
+
+
+def signal(seconds=20.0, seed=0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    x = np.sin(2 * np.pi * 50.0 * t) + 0.3 * np.random.default_rng(seed).standard_normal(len(t))
+    return x, t
+
+
+def feed(psd, x, block):
+    ends, columns = [], []
+    for first in range(0, len(x), block):
+        e, p = psd.update(x[first:first + block], RATE)
+        ends.append(e + first)
+        columns.append(p)
+    return np.concatenate(ends), np.concatenate(columns)
+
+
+@pytest.mark.parametrize("block", [1, 37, 100, 256, 1000])
+def test_psd_does_not_depend_on_block_size(block):
+    x, t = signal()
+    ends, psd = feed(WelchPsd(), x, len(x))
+    block_ends, block_psd = feed(WelchPsd(), x, block)
+    np.testing.assert_array_equal(block_ends, ends)
+    np.testing.assert_allclose(block_psd, psd, rtol=1e-9, atol=1e-15)
+
+
+@pytest.mark.parametrize("block", [37, 100])
+def test_filters_do_not_depend_on_block_size(block):
+    x, t = signal()
+    for make in (lambda: PeakFrequency(20.0, 200.0), lambda: BandPower(40.0, 60.0)):
+        whole = make()(x, t, RATE)
+        state = make()
+        parts = np.concatenate([state(x[i:i + block], t[i:i + block], RATE) for i in range(0, len(x), block)])
+        np.testing.assert_allclose(parts, whole, rtol=1e-9, equal_nan=True)
+
+
+def test_peak_frequency_finds_tone():
+    x, t = signal()
+    out = PeakFrequency(20.0, 200.0)(x, t, RATE)
+    assert np.isnan(out[0])
+    assert abs(out[-1] - 50.0) < 0.5
+
+
+def test_spectral_filter_is_abstract():
+    with pytest.raises(TypeError):
+        SpectralFilter(20.0, 200.0)
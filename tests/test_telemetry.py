@@ -0,0 +1,129 @@
+import time
+
+import numpy as np
+import pytest
+
+from acquisition import SampleBlock
+from telemetry import MIN_RATE_SCALE, TelemetryClient, TelemetryServer, _Client
+
+
+GROUPS = [("ai", ["AI0", "AI1"]), ("tc", ["TC0"])]
+RATES = {"ai": 1000.0, "tc": 10.0}
+
+
+@pytest.fixture
+def server():
+    server = TelemetryServer(host="127.0.0.1", port=0)
+    server.start()
+    server.set_layout(GROUPS, RATES, t0=0.0)
+    yield server
+    server.stop()
+
+
+def connect(server, **subscription):
+    client = TelemetryClient("127.0.0.1", server.port, timeout=5.0, **subscription)
+    assert client.recv() == ("hello", {"version": 1, "groups": {"ai": ["AI0", "AI1"], "tc": ["TC0"]},
+                                       "rates": RATES, "t0": 0.0})
+    # The subscription is read after the hello is sent; wait until it applies
+    groups = set(subscription.get("groups") or ()) or None
+    deadline = time.monotonic() + 5.0
+    while not any(c.max_rate == subscription.get("max_rate", 0.0) and c.groups == groups for c in server._clients):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return client
+
+
+def ai_block(k, n=100):
+    data = np.vstack([np.arange(n) + k * n, np.full(n, 0.5)]).astype(float)
+    return SampleBlock("ai", data, k * n, 1000.0)
+
+
+def test_blocks_arrive_at_full_rate(server):
+    client = connect(server)
+    try:
+        block = ai_block(0)
+        tc = SampleBlock("tc", np.array([[21.5, 22.0]]), 0, 10.0)
+        server.publish([(block, block.data * 2.0), (tc, tc.data)])
+        kind, group, t, values, dropped = client.recv()
+        assert (kind, group, dropped) == ("data", "ai", 0)
+        np.testing.assert_array_equal(t, block.times())
+        np.testing.assert_array_equal(values, (block.data * 2.0).astype(np.float32))
+        kind, group, t, values, dropped = client.recv()
+        assert group == "tc"
+        np.testing.assert_array_equal(values, [[21.5, 22.0]])
+    finally:
+        client.close()
+
+
+def test_decimation_and_group_selection(server):
+    client = connect(server, max_rate=10.0, groups=["ai"])
+    try:
+        for k in range(10):
+            block = ai_block(k)
+            server.publish([(SampleBlock("tc", np.array([[20.0]]), k, 10.0), np.array([[20.0]])),
+                            (block, block.data)])
+        times = []
+        while len(times) < 10:
+            kind, group, t, values, dropped = client.recv()
+            assert group == "ai"
+            times.extend(t)
+        # One sample per 0.1 s slot of the run timebase, across block edges
+        np.testing.assert_allclose(times, np.arange(10) * 0.1, atol=1.5e-3)
+    finally:
+        client.close()
+
+
+def test_stop_disconnects_clients(server):
+    client = connect(server)
+    try:
+        assert server.client_count == 1 and server.clients_served == 1
+        server.stop()
+        with pytest.raises((ConnectionError, OSError)):
+            client.recv()
+    finally:
+        client.close()
+
+
+def test_pick_keeps_one_sample_per_slot_across_blocks():
+    client = _Client(writer=None, max_queue=1)
+    client.max_rate = 100.0
+    t = np.arange(1000) / 1000.0
+    kept = np.concatenate([t[first:first + 37][client.pick("ai", t[first:first + 37], 1000.0)]
+                           for first in range(0, 1000, 37)])
+    # Slot edges are floored in float, so a kept sample may be one late
+    np.testing.assert_allclose(kept, np.arange(100) / 100.0, atol=1.5e-3)
+    client.max_rate = 0.0
+    assert client.pick("ai", t, 1000.0) is None
+
+
+class _Transport:
+    aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+class _Writer:
+    def __init__(self):
+        self.transport = _Transport()
+
+
+def test_slow_client_loses_frames_then_rate_then_connection(monkeypatch):
+    server = TelemetryServer()
+    client = _Client(_Writer(), max_queue=1)
+    server._clients.add(client)
+    now = [100.0]
+    monkeypatch.setattr("telemetry.time.monotonic", lambda: now[0])
+    server._enqueue(client, b"frame")
+    server._enqueue(client, b"frame")
+    assert (client.dropped, client.rate_scale) == (1, 0.5)
+    # At most one rate step per STEP_S
+    server._enqueue(client, b"frame")
+    assert (client.dropped, client.rate_scale) == (2, 0.5)
+    while client.rate_scale > MIN_RATE_SCALE:
+        now[0] += 1.0
+        server._enqueue(client, b"frame")
+    assert client in server._clients
+    now[0] += 1.0
+    server._enqueue(client, b"frame")
+    assert client.writer.transport.aborted and client not in server._clients
@@ -0,0 +1,74 @@
+import numpy as np
+
+from timebase import StreamAligner, Timebase
+
+
+def ai(start, n, rate=100.0):
+    t = (start + np.arange(n)) / rate
+    return t, np.vstack([t]), np.vstack([2.0 * t])
+
+
+def tc(t):
+    t = np.asarray(t, dtype=float)
+    return t, np.vstack([10.0 * t]), np.vstack([20.0 * t])
+
+
+def test_reference_samples_wait_for_slow_groups():
+    aligner = StreamAligner("ai", ["ai", "tc"])
+    aligner.push("ai", *ai(0, 100))
+    assert aligner.pop() is None
+    aligner.push("tc", *tc([0.0, 0.5]))
+    t, raw, cal = aligner.pop()
+    # Only up to the last slow sample, never extrapolated
+    np.testing.assert_array_equal(t, np.arange(51) / 100.0)
+    np.testing.assert_allclose(raw["tc"][0], 10.0 * t)
+    np.testing.assert_allclose(cal["tc"][0], 20.0 * t)
+    np.testing.assert_array_equal(raw["ai"][0], t)
+    np.testing.assert_array_equal(cal["ai"][0], 2.0 * t)
+    assert aligner.pop() is None
+
+
+def test_output_is_continuous_across_pops():
+    aligner = StreamAligner("ai", ["ai", "tc"])
+    pieces = []
+    for k in range(10):
+        aligner.push("ai", *ai(25 * k, 25))
+        aligner.push("tc", *tc([0.1 * k]))
+        out = aligner.pop()
+        if out is not None:
+            pieces.append(out)
+    t = np.concatenate([p[0] for p in pieces])
+    np.testing.assert_array_equal(t, np.arange(len(t)) / 100.0)
+    np.testing.assert_allclose(np.concatenate([p[1]["tc"][0] for p in pieces]), 10.0 * t, atol=1e-12)
+    assert t[-1] == 0.9
+    # The slow history keeps just one sample before the next output
+    assert len(aligner._hist["tc"][0]) == 1
+
+
+def test_flush_and_max_pending_release_without_slow_data():
+    aligner = StreamAligner("ai", ["ai", "tc"], max_pending=150)
+    aligner.push("ai", *ai(0, 100))
+    assert aligner.pop() is None
+    aligner.push("ai", *ai(100, 100))
+    t, raw, cal = aligner.pop()
+    assert len(t) == 200 and "tc" not in raw
+    aligner.push("ai", *ai(200, 10))
+    t, raw, cal = aligner.pop(flush=True)
+    np.testing.assert_array_equal(t, np.arange(200, 210) / 100.0)
+    assert aligner.pop(flush=True) is None
+
+
+def test_unknown_groups_are_ignored():
+    aligner = StreamAligner("ai", ["ai"])
+    aligner.push("serial", *tc([0.0, 1.0]))
+    aligner.push("ai", *ai(0, 5))
+    t, raw, cal = aligner.pop()
+    assert set(raw) == {"ai"} and len(t) == 5
+
+
+def test_sample_times_use_group_offsets():
+    timebase = Timebase()
+    timebase.mark_start()
+    timebase.set_offset("tc", 0.25)
+    np.testing.assert_allclose(timebase.sample_times("tc", 10, 3, 10.0), [1.25, 1.35, 1.45])
+    np.testing.assert_allclose(timebase.sample_times("ai", 0, 2, 100.0), [0.0, 0.01])
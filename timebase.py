@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+
+
+class Timebase:
+    # One clock for every stream of a run. t = 0 is the (shared) start
+    # trigger; each sample's time is offset[group] + index / rate, so
+    # timestamps are monotonic and as fine as the sample clock. The wall
+    # clock anchor is captured together with the monotonic one and is only
+    # used to print human-readable timestamps.
+    def __init__(self):
+        self.mono_t0 = None
+        self.wall_t0 = None
+        self.offsets = {}
+        self.synchronized = False
+
+    def mark_start(self):
+        self.mono_t0 = time.perf_counter()
+        self.wall_t0 = time.time()
+        self.offsets = {}
+
+    def set_offset(self, group, seconds):
+        self.offsets[group] = float(seconds)
+
+    def offset(self, group):
+        return self.offsets.get(group, 0.0)
+
+    def now(self):
+        # Seconds since t0 on the same monotonic clock, for software-timed sources
+        if self.mono_t0 is None:
+            return 0.0
+        return time.perf_counter() - self.mono_t0
+
+    def sample_times(self, group, start_index, n, rate):
+        return self.offset(group) + (start_index + np.arange(n)) / rate
+
+
+def share_start_trigger(master, slaves):
+    # Route the master task's start trigger to the other tasks so all sample
+    # clocks start on the same edge. Returns False when the chassis/modules
+    # cannot do it; callers then fall back to a software start.
+    try:
+        term = master.triggers.start_trigger.term
+        for task in slaves:
+            task.triggers.start_trigger.cfg_dig_edge_start_trig(term)
+        return True
+    except Exception:
+        for task in slaves:
+            try:
+                task.triggers.start_trigger.disable_start_trig()
+            except Exception:
+                pass
+        return False
+
+
+class StreamAligner:
+    # Resamples slow groups (e.g. TC at 10 Hz) onto the timeline of a
+    # reference group (AI) by linear interpolation. Reference samples are held
+    # back until every slow group has a sample at or after them, so values are
+    # interpolated rather than extrapolated. Memory is bounded by max_pending.
+    def __init__(self, reference, groups, max_pending=200000):
+        self.reference = reference
+        self.groups = [g for g in groups if g != reference]
+        self.max_pending = max_pending
+        self._pending = []
+        self._pending_n = 0
+        self._hist = {g: None for g in self.groups}
+
+    def push(self, group, t, raw, cal):
+        if group == self.reference:
+            self._pending.append((t, raw, cal))
+            self._pending_n += len(t)
+            return
+        if group not in self._hist:
+            return
+        prev = self._hist[group]
+        if prev is None:
+            self._hist[group] = (t, raw, cal)
+        else:
+            self._hist[group] = (
+                np.concatenate([prev[0], t]),
+                np.concatenate([prev[1], raw], axis=1),
+                np.concatenate([prev[2], cal], axis=1),
+            )
+
+    def pop(self, flush=False):
+        # -> (t, raw, cal) where raw/cal map group -> (channels x n), or None
+        if not self._pending:
+            return None
+        t = np.concatenate([p[0] for p in self._pending])
+        ready = len(t)
+        if not flush and self._pending_n <= self.max_pending:
+            for group in self.groups:
+                hist = self._hist[group]
+                if hist is None:
+                    return None
+                ready = min(ready, int(np.searchsorted(t, hist[0][-1], side="right")))
+        if ready == 0:
+            return None
+
+        raw_ref = np.concatenate([p[1] for p in self._pending], axis=1)
+        cal_ref = np.concatenate([p[2] for p in self._pending], axis=1)
+        out_t = t[:ready]
+        raw = {self.reference: raw_ref[:, :ready]}
+        cal = {self.reference: cal_ref[:, :ready]}
+        for group in self.groups:
+            hist = self._hist[group]
+            if hist is None:
+                continue
+            ht, hraw, hcal = hist
+            raw[group] = np.vstack([np.interp(out_t, ht, row) for row in hraw])
+            cal[group] = np.vstack([np.interp(out_t, ht, row) for row in hcal])
+            # Keep one sample before the next output time for interpolation
+            keep = max(0, int(np.searchsorted(ht, out_t[-1], side="right")) - 1)
+            self._hist[group] = (ht[keep:], hraw[:, keep:], hcal[:, keep:])
+
+        if ready < len(t):
+            self._pending = [(t[ready:], raw_ref[:, ready:], cal_ref[:, ready:])]
+        else:
+            self._pending = []
+        self._pending_n = len(t) - ready
+        return out_t, raw, cal